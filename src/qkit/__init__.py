@@ -20,9 +20,24 @@ cfg: 'ConfClass'  # Initialized by lazy-loading in __getattr__ (see below)
 instruments: 'Insttools'
 module_available: 'ModuleAvailable'  # Initialized in S16_available_modules
 
+import threading as _threading
+# services created on first access, e.g. qkit.fid, see register_lazy_service()
+_lazy_services = {}
+_lazy_lock = _threading.RLock()
+# default of cfg['lazy_services']
+LAZY_SERVICES = ('fid', 'visa', 'info')
+
+def register_lazy_service(name, factory):
+    """
+    Registers a service which is created by calling factory() on the first access of qkit.<name>.
+    """
+    with _lazy_lock:
+        globals().pop(name, None)
+        _lazy_services[name] = factory
+
 def __getattr__(name):
     """
-    Lazy Loading support for qkit configuration. Based on PEP 562: Module __getattr__ and __dir__
+    Lazy Loading support for qkit configuration and services. Based on PEP 562: Module __getattr__ and __dir__
     """
     global cfg
     if name == "cfg":
@@ -30,6 +45,16 @@ def __getattr__(name):
         from qkit.config.config_holder import ConfClass
         cfg = ConfClass()
         return cfg
+    if name in _lazy_services:
+        with _lazy_lock:
+            if name in globals():  # created by another thread in the meantime
+                return globals()[name]
+            import qkit.core.startup
+            with qkit.core.startup.timed(name + " (on first use)"):
+                service = _lazy_services[name]()
+            globals()[name] = service
+            del _lazy_services[name]
+            return service
     raise AttributeError("qkit has no attribute " + name)
 
 """
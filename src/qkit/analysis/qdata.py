@@ -26,6 +26,7 @@ import qkit.measure.measurement_class as mc
 from qkit.gui.plot import plot as qviewkit
 from qkit.storage import store as hdf
 from qkit.storage.hdf_constants import ds_types
+from qkit.storage.hdf_extent import valid_view
 import json
 from qkit.measure.json_handler import QkitJSONEncoder, QkitJSONDecoder
 
@@ -259,7 +260,7 @@ class qData(object):
             for group in self.df.hf.entry:
                 for dataset in self.df.hf.entry[group]:
                     path = '/'.join((group, dataset))
-                    data[i][path] = self.df.hf.entry[path][:][::order[i]]
+                    data[i][path] = valid_view(self.df.hf.entry[path])[:][::order[i]]
                     attrs[i][path] = self.df.hf.entry[path].attrs.items()
         ''' merge data '''
         if set(scan_dim) == {1}:
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Queries over many measurement files of the file info database (qkit.fid).
+
+Files are selected by their metadata (the info columns and analysis0
+attributes of the fid store), then only the requested datasets, or slices
+of them, are read from the selected files in the reader pool of the fid.
+The per-file results are cached with the mtime of the file, so repeating or
+refining a query only reads files which are new or changed.
+
+Usage:
+    from qkit.analysis.query import Query
+    result = (Query()
+              .where("run", value="COOLDOWN7")
+              .where("name", expression="IV")
+              .extract({"I": "/entry/data0/i_0",
+                        "T": ("/entry/data0/temperature", np.s_[-1])}))
+    result.stack("T")        # array with one row per file
+    result.to_dataframe()    # pandas, one row per file (needs pandas)
+    result.to_xarray()       # xarray.Dataset with the dimension 'uuid' (needs xarray)
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import h5py
+import numpy as np
+
+import qkit
+from qkit.storage.hdf_extent import valid_view
+from qkit.storage.hdf_file import file_kwargs
+
+
+def read_datasets(path, selections):
+    """
+    Reads the selections {name: (ds_url, key)} from the h5 file 'path', key indexes the dataset
+    (None for all of it). Runs in the reader pool of the fid.
+
+    Returns:
+        {name: array or None if the dataset does not exist or the key does not fit, e.g. the empty
+        or short datasets of aborted measurements}
+    """
+    results = {}
+    try:
+        with h5py.File(path, 'r', **file_kwargs) as hf:
+            for name, (ds_url, key) in selections.items():
+                if ds_url not in hf:
+                    results[name] = None
+                    continue
+                try:
+                    ds = valid_view(hf[ds_url])
+                    results[name] = np.asarray(ds[()] if key is None else ds[key])
+                except (IndexError, ValueError, KeyError, TypeError) as e:
+                    logging.info("query: Can not read {} of {}: {}".format(name, path, e))
+                    results[name] = None
+    except OSError as e:
+        logging.warning("query: Can not read {}: {}".format(path, e))
+        results = {name: None for name in selections}
+    return results
+
+
+class QueryCache(object):
+    """
+    Least recently used cache of per-file query results, keyed by (path, mtime, ds_url, key).
+
+    Args:
+        max_bytes: size limit of the cached arrays, default qkit.cfg['query_cache_bytes'] or 256 MB.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes if max_bytes is not None else qkit.cfg.get('query_cache_bytes', 2 ** 28)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        size = 0 if value is None else value.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                old = self._entries.pop(key)
+                self._bytes -= 0 if old is None else old.nbytes
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= 0 if old is None else old.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# shared by all queries of this process
+cache = QueryCache()
+
+
+def _cache_key(path, mtime, ds_url, key):
+    return path, mtime, ds_url, repr(key)
+
+
+class Query(object):
+    """
+    Selects measurement files of the fid by metadata and extracts datasets from them.
+
+    Args:
+        fid: file info database, default qkit.fid.
+        uuids: optional list of uuids to start from, default all h5 files.
+    """
+
+    def __init__(self, fid=None, uuids=None):
+        self._fid = fid if fid is not None else qkit.fid
+        self._uuids = None if uuids is None else list(uuids)
+        self._filters = []
+
+    def where(self, column, expression=None, value=None, bounds=None):
+        """
+        Restricts the query to files whose metadata 'column' matches the regular expression
+        'expression', equals 'value' or lies between the (exclusive) 'bounds'.
+        'column' can also be a function of the info dict (see qkit.fid.h5_info_db) returning True
+        for the files to keep. Returns the query, so calls can be chained.
+        """
+        if callable(column):
+            self._filters.append(column)
+        elif [expression, value, bounds].count(None) != 2:
+            logging.error("query: Pass exactly one of expression, value and bounds.")
+            raise ValueError
+        else:
+            self._filters.append((column, expression, value, bounds))
+        return self
+
+    def uuids(self):
+        """ returns the uuids of the selected files in chronological order """
+        from qkit.core.lib.file_service.file_info_database_lib import PATH_COLUMNS
+        fid = self._fid
+        fid.wait()
+        selected = set(fid.h5_db if self._uuids is None else self._uuids) & set(fid.h5_db)
+        for f in self._filters:
+            if callable(f):
+                selected = {uuid for uuid in selected if f(fid.h5_info_db.get(uuid, {}))}
+                continue
+            column, expression, value, bounds = f
+            if column not in PATH_COLUMNS:
+                # columns read lazily from the h5 files, see fid.extract_columns()
+                fid.extract_columns([column], uuids=selected)
+            selected &= set(fid._store.query(column, expression=expression, value=value, bounds=bounds))
+        return sorted(selected, key=lambda uuid: (fid.h5_info_db.get(uuid, {}).get('time') or 0, uuid))
+
+    def extract(self, datasets, columns=None, workers=None):
+        """
+        Reads datasets of the selected files.
+
+        Args:
+            datasets: {name: ds_url or (ds_url, key)}, key is an index like np.s_[-1] or np.s_[:, 10]
+                selecting a part of the dataset, only this part is read. A list of ds_urls
+                uses their last part as name.
+            columns: metadata columns added to the result, default: 'datetime' and 'name'.
+            workers: number of parallel readers, default qkit.cfg['fid_scan_workers'].
+        Returns:
+            QueryResult
+        """
+        if isinstance(datasets, (list, tuple)):
+            datasets = {ds_url.rstrip('/').split('/')[-1]: ds_url for ds_url in datasets}
+        selections = {name: (sel, None) if isinstance(sel, str) else tuple(sel) for name, sel in datasets.items()}
+        uuids = self.uuids()
+        fid = self._fid
+        data = {name: [None] * len(uuids) for name in selections}
+        todo = {}
+        for i, uuid in enumerate(uuids):
+            path = fid.h5_db[uuid]
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            missing = {}
+            for name, (ds_url, key) in selections.items():
+                found, value = cache.get(_cache_key(path, mtime, ds_url, key))
+                if found:
+                    data[name][i] = value
+                else:
+                    missing[name] = (ds_url, key)
+            if missing:
+                todo[i] = (path, mtime, missing)
+        if todo:
+            workers = min(len(todo), workers or qkit.cfg.get('fid_scan_workers', 8))
+            with fid._reader_pool(workers) as pool:
+                results = pool.map(read_datasets, [t[0] for t in todo.values()], [t[2] for t in todo.values()])
+                for (i, (path, mtime, missing)), result in zip(todo.items(), results):
+                    for name, value in result.items():
+                        cache.put(_cache_key(path, mtime, *missing[name]), value)
+                        data[name][i] = value
+        columns = ['datetime', 'name'] if columns is None else list(columns)
+        info = {c: [fid.h5_info_db.get(uuid, {}).get(c) for uuid in uuids] for c in columns}
+        return QueryResult(uuids, data, info)
+
+
+class QueryResult(object):
+    """
+    Datasets of several files: data[name] is a list with one array (or None) per file of 'uuids',
+    info[column] the list of the metadata values.
+    """
+
+    def __init__(self, uuids, data, info):
+        self.uuids = uuids
+        self.data = data
+        self.info = info
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def __repr__(self):
+        return "<QueryResult of {} files: {}>".format(len(self.uuids), ", ".join(self.data))
+
+    def stack(self, name, fill=np.nan):
+        """
+        Stacks the arrays of 'name' along a new first axis (one entry per file).
+        Smaller arrays and files missing the dataset are padded with 'fill'.
+        """
+        arrays = [None if a is None else np.asarray(a, dtype=float) for a in self.data[name]]
+        shapes = [a.shape for a in arrays if a is not None]
+        if not shapes:
+            return np.full((len(arrays),), fill)
+        ndim = max(len(s) for s in shapes)
+        shape = tuple(max(s[d] if d < len(s) else 1 for s in shapes) for d in range(ndim))
+        stacked = np.full((len(arrays),) + shape, fill)
+        for i, a in enumerate(arrays):
+            if a is not None:
+                a = a.reshape(a.shape + (1,) * (ndim - a.ndim))
+                stacked[(i,) + tuple(slice(0, n) for n in a.shape)] = a
+        return stacked
+
+    def to_dataframe(self):
+        """ pandas data frame with one row per uuid, the metadata columns and the data (scalars or arrays) """
+        if not qkit.module_available("pandas"):
+            raise ImportError("pandas not found.")
+        import pandas as pd
+        columns = dict(self.info)
+        for name, values in self.data.items():
+            columns[name] = [v.item() if v is not None and v.ndim == 0 else v for v in values]
+        return pd.DataFrame(columns, index=pd.Index(self.uuids, name='uuid'))
+
+    def to_xarray(self):
+        """ xarray Dataset with the stacked data along the dimension 'uuid' and the metadata as coordinates """
+        if not qkit.module_available("xarray"):
+            raise ImportError("xarray not found.")
+        import xarray as xr
+        variables = {}
+        for name in self.data:
+            stacked = self.stack(name)
+            variables[name] = (('uuid',) + tuple("{}_dim{}".format(name, d) for d in range(stacked.ndim - 1)), stacked)
+        coords = {'uuid': self.uuids}
+        coords.update({c: ('uuid', v) for c, v in self.info.items()})
+        return xr.Dataset(variables, coords=coords)
@@ -6,11 +6,8 @@ import logging
 
 import qkit
 from qkit.storage import store
-from qkit.analysis.circle_fit import circuit
 from qkit.storage.hdf_constants import ds_types
-from scipy.optimize import leastsq
-from scipy.ndimage import gaussian_filter1d
-from scipy.ndimage.filters import median_filter
+# scipy and the circle fit are imported in the fit functions, they are slow to import
 
 class Resonator(object):
     '''
@@ -107,6 +104,7 @@ class Resonator(object):
 
         #print gaussian, median
         if median:
+            from scipy.ndimage import median_filter
             self._prefilter = median_filter
             #print("median_filter")
             if params:
@@ -115,6 +113,7 @@ class Resonator(object):
                 self._prefilter_params = 6
 
         if gaussian:
+            from scipy.ndimage import gaussian_filter1d
             self._prefilter = gaussian_filter1d
             #print("gaussian_filter1d")
             if params:
@@ -232,6 +231,7 @@ class Resonator(object):
             self._prepare_circle()
             self._first_circle = False
 
+        from qkit.analysis.circle_fit import circuit
         if self._circle_reflection:
            self._circle_port = circuit.reflection_port(f_data = self._fit_frequency)
         elif self._circle_notch:
@@ -442,6 +442,7 @@ class Resonator(object):
                 s_k = .15*(self._fit_frequency[-1]-self._fit_frequency[0]) #try 15% of window
             p0=[s_f0, s_k, s_a, s_offs]
             try:
+                from scipy.optimize import leastsq
                 fit = leastsq(residuals,p0,args=(self._fit_frequency,amplitudes_sq))
             except:
                 self._lrnz_amp_gen.append(np.array([np.nan for f in self._fit_frequency]))
@@ -550,6 +551,7 @@ class Resonator(object):
             p0 = [0., 0., 1e3]
 
             try:
+                from scipy.optimize import leastsq
                 p_final = leastsq(residuals,p0,args=(self._fit_frequency,amplitudes_sq))
                 A2a, A4a, Qra = p_final[0]
 
@@ -770,6 +772,7 @@ class Resonator(object):
             err = amplitude_sq-self._fano_reflection(frequency,q,bw,fr=fr,a=a)
             return err
 
+        from scipy.optimize import leastsq
         p_fit = leastsq(fano_residuals,p0,args=(self._fit_frequency,np.array(amplitudes_sq)))
         #print(("q:%g bw:%g fr:%g a:%g")% (p_fit[0][0],p_fit[0][1],p_fit[0][2],p_fit[0][3]))
         return p_fit[0]
@@ -51,6 +51,32 @@ cfg['datafolder_structure'] = 2
 #fid_scan_datadir = True
 ## check also the content of hdf files (slow) ?
 #fid_scan_hdf     = False
+## columns read from every hdf file at startup, others are read when used in qkit.fid.show()/search()
+#fid_hdf_columns = () # e.g. ['comment', 'rating'], ['*'] for all
+## only directories modified since the last start are listed again, using
+## fid_scan_workers threads; changed hdf files are read in worker processes
+#fid_scan_workers = 8
+#fid_scan_processes = True
+## do not check directories unchanged for this many seconds at all (old runs)
+#fid_scan_skip_age = None
+## the database is kept in a SQLite file, default: logdir/fid.sqlite
+#fid_store_path = None
+## watch the datadir for new files of other processes or machines:
+## 'auto' (inotify, or polling on network mounts), 'inotify' or 'poll'
+#fid_watch = False
+#fid_watch_interval = 0.5 # seconds between two polls
+#fid_watch_poll_age = 24*3600 # only directories modified within this time are polled
+## attributes set with qkit.fid (e.g. ratings) are not written to files a measurement
+## still writes, they are retried every fid_attribute_retry seconds. Files of the old
+## hdf format count as written if modified within fid_attribute_defer_age seconds.
+#fid_attribute_retry = 5
+#fid_attribute_defer_age = 60
+## summarize the datasets (statistics and a thumbnail of fid_thumbnail_size points per axis)
+## when a file is closed, for qkit.fid.show(summaries=True) and qkit.fid.preview(uuid)
+#fid_summaries = False
+#fid_thumbnail_size = 64
+## results of qkit.analysis.query per file are cached up to this size (bytes)
+#query_cache_bytes = 2**28
 ## should the viewer object be created on startup (slow, needs pandas) ?
 #fid_init_viewer  = True
 
@@ -98,10 +124,58 @@ cfg['stdout_log_level'] = 'WARNING'
 #cfg['visa_backend'] = '@py' # Use pyvisa-py
 #cfg['visa_backend'] = '' # (default) use NI-VISA if available, otherwise pyvisa-py
 
+##
+## Write-behind buffer for hdf5 appends. Data is kept in memory and written
+## in bulk once one of the thresholds is reached, on flush() and on close.
+#cfg['hdf_write_buffer'] = False # default: False
+#cfg['hdf_flush_interval'] = 1.0 # seconds until readers (qviewkit) see new data
+#cfg['hdf_flush_bytes'] = 4*2**20 # staged bytes
+#cfg['hdf_flush_rows'] = None # staged appends
+
+##
+## Over-allocate growing hdf5 datasets by this factor instead of resizing
+## them for every append. Datasets are trimmed when the file is closed.
+#cfg['hdf_growth_factor'] = None # default: None (off), e.g. 2
+
+##
+## Chunk layout and lossless compression of the datasets (see qkit.storage.hdf_chunking),
+## can be set per dataset with the 'chunks' and 'compression' arguments of add_value_...
+## Compare the options with: python -m qkit.storage.hdf_benchmark
+#cfg['hdf_chunking'] = 'rows' # default: 'rows' (whole traces), 'balanced' for fast column reads
+#cfg['hdf_chunk_bytes'] = 2**16 # target chunk size in bytes
+#cfg['hdf_compression'] = None # default: None, 'gzip', 'lzf' or 'blosc' (needs hdf5plugin)
+
+##
+## Write measurement files of unified_measurements in single-writer/multiple-reader
+## mode, so qviewkit can keep them open. Requires HDF5 >= 1.10 to read the files.
+#cfg['hdf_swmr'] = False # default: False
+
+##
+## Build min/max/mean pyramids of large matrix and box datasets (sidecar file
+## '<name>.pyramid') in save_plots and qviewkit, which then display a level
+## matching the plot resolution. Axes longer than hdf_pyramid_min_size are reduced.
+#cfg['hdf_pyramid'] = False # default: False
+#cfg['hdf_pyramid_min_size'] = 1024
+
 ##
 ## Make png files at the end of the measurement
 ##
 #cfg['save_png'] = True
+## The plots are rendered by a pool of background workers (qkit.gui.plot.plot_service).
+#cfg['plot_workers'] = 2 # default: 2
+#cfg['plot_processes'] = True # default: True, False renders in threads of the kernel
+
+##
+## Pipelined 2D/3D VNA spectroscopy: traces are stored, fitted and the progress bar is updated
+## on a background thread while the next point is set and measured (see spectrum.set_pipelined).
+#cfg['spectroscopy_pipelined'] = False # default: False
+#cfg['measure_pipeline_depth'] = 4 # maximum number of traces waiting to be stored
+
+##
+## Call the log functions and the measurements of a sweep point on different instruments
+## concurrently (see qkit.core.lib.concurrent_io). Calls to the same instrument stay serialized.
+#cfg['instrument_io_concurrent'] = False # default: False
+#cfg['instrument_io_workers'] = 8 # size of the thread pool
 
 ##
 ## QT related options
@@ -114,6 +188,14 @@ cfg['qtlab'] = False
 ## This keeps only the latest 10 logfiles in your logdir.
 #cfg['maintain_logiles'] = True
 
+##
+## Services which are created on the first access of qkit.<name> instead of in qkit.start(),
+## any of 'fid', 'visa', 'info' and 'ris'. The ris is started eagerly by default, since
+## remote clients expect it to run.
+#cfg['lazy_services'] = ('fid', 'visa', 'info')
+## print how long each startup module (and lazy service) took, see qkit.core.startup.report()
+#cfg['startup_report'] = False
+
 #-----------------------------------------------------------
 # below this line, there can be system wide constants like 
 # cfg['ministry'] = 'silly walks'
@@ -24,7 +24,12 @@ import time
 import qkit
 from qkit.core.lib.misc import get_traceback
 
-AutoFormattedTB = get_traceback()
+
+def AutoFormattedTB(*args, **kwargs):
+    # IPython is imported on the first traceback only, it is slow to import
+    global AutoFormattedTB
+    AutoFormattedTB = get_traceback()
+    return AutoFormattedTB(*args, **kwargs)
 
 class FlowControl(object):
     '''
@@ -18,8 +18,10 @@
 from __future__ import print_function
 
 import copy
+import functools
 import inspect
 import logging
+import threading
 import time
 
 import numpy as np
@@ -72,6 +74,21 @@ class Instrument(object):
     def __str__(self):
         return "Instrument '%s'" % (self.get_name())
 
+    _io_locks_lock = threading.Lock()
+
+    @property
+    def io_lock(self):
+        '''
+        Lock serializing the communication with the instrument between threads,
+        held by get, set, the functions exposed with add_function and the calls
+        of qkit.core.lib.concurrent_io.
+        '''
+        lock = self.__dict__.get('_io_lock')
+        if lock is None:
+            with Instrument._io_locks_lock:
+                lock = self.__dict__.setdefault('_io_lock', threading.RLock())
+        return lock
+
 
     def get_name(self):
         '''
@@ -601,20 +618,33 @@ class Instrument(object):
         Output: Single value, or dictionary of parameter -> values
                 Type is whatever the instrument driver returns.
         '''
-        if type(name) in (list, tuple):
-            result = {}
-            for key in name:
-                val = self._get_value(key, query, **kwargs)
-                if val is not None:
-                    result[key] = val
-        else:
-            result = self._get_value(name, query, **kwargs)
+        with self.io_lock:
+            if type(name) in (list, tuple):
+                result = {}
+                for key in name:
+                    val = self._get_value(key, query, **kwargs)
+                    if val is not None:
+                        result[key] = val
+            else:
+                result = self._get_value(name, query, **kwargs)
         qkit.flow.sleep()
         return result
 
-    def get_threaded(self, *args, **kwargs):
-        logging.error('Using threading functions is not supported. Redirecting to normal get')
-        return self.get(*args, **kwargs)
+    def get_threaded(self, name, callback=None, **kwargs):
+        '''
+        Get one or more Instrument parameter values in the background, see get.
+        The calls are serialized with the other communication of the instrument.
+
+        Input:
+            name, kwargs: see get
+            callback (function): called with the value(s), when available
+        Output: concurrent.futures.Future of the value(s)
+        '''
+        from qkit.core.lib.concurrent_io import submit
+        future = submit(self.get, name, **kwargs)
+        if callback is not None:
+            future.add_done_callback(lambda f: f.exception() is None and callback(f.result()))
+        return future
 
     _CONVERT_MAP = {
             int: int,
@@ -728,21 +758,22 @@ class Instrument(object):
 
         result = True
         changed = {}
-        if type(name) == dict:
-            for key, val in name.items():
-                val = self._set_value(key, val, **kwargs)
+        with self.io_lock:
+            if type(name) == dict:
+                for key, val in name.items():
+                    val = self._set_value(key, val, **kwargs)
+                    if val is not None:
+                        changed[key] = val
+                    else:
+                        result = False
+
+            else:
+                val = self._set_value(name, value, **kwargs)
                 if val is not None:
-                    changed[key] = val
+                    changed[name] = val
                 else:
                     result = False
 
-        else:
-            val = self._set_value(name, value, **kwargs)
-            if val is not None:
-                changed[name] = val
-            else:
-                result = False
-
         qkit.flow.sleep()
         return result
 
@@ -768,6 +799,15 @@ class Instrument(object):
         options['argspec'] = self.get_argspec_dict(inspect.getfullargspec(f))
 
         self._functions[name] = options
+        # the exposed function holds the io_lock, like get and set
+        setattr(self, name, self._locked(f))
+
+    def _locked(self, f):
+        @functools.wraps(f)
+        def locked(*args, **kwargs):
+            with self.io_lock:
+                return f(*args, **kwargs)
+        return locked
 
     def get_function_options(self, name):
         '''
@@ -354,16 +354,19 @@ class ModernInstrument(Instrument):
 
     def get(self, name, query=True, fast=False, **kwargs):
         try:
-            return self._parameters[name].get(query=query, **kwargs)
+            with self.io_lock:
+                return self._parameters[name].get(query=query, **kwargs)
         except (AttributeError, TypeError, NameError, ValueError) as e:
             logging.error(f"Caught error while processing {name}(query={query}): e")
             raise e
     
     def set(self, name, value, **kwargs):
-        return self._parameters[name].set(value, **kwargs)
+        with self.io_lock:
+            return self._parameters[name].set(value, **kwargs)
 
     def call(self, name, *args, **kwargs):
-        return self._functions[name].call(*args, **kwargs)
+        with self.io_lock:
+            return self._functions[name].call(*args, **kwargs)
 
 def interval_check(lower, upper):
     """
@@ -28,7 +28,12 @@ import importlib
 
 
 from qkit.core.lib.misc import get_traceback
-TB = get_traceback()()
+
+def TB():
+    # IPython is imported on the first traceback only, it is slow to import
+    global TB
+    TB = get_traceback()()
+    TB()
 
 def _get_driver_module(name, do_reload=False):
 
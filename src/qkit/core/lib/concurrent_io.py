@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent I/O of independent instruments.
+
+Reading five thermometers, a lock-in and a multimeter at every sweep point
+takes the sum of their latencies when done one after the other. The calls
+here run on a shared thread pool instead, so the latencies overlap. Calls
+to the same instrument are serialized: they are grouped into one task, and
+every task holds the io_lock of its instrument, which Instrument.get/set and
+the functions exposed with add_function take as well. Calls whose instrument
+is not known are grouped into a single task, too. Raw driver calls from other
+threads that bypass the qkit instrument (e.g. to a VISA handle) are not locked.
+
+The drivers are blocking (VISA, sockets), so threads are used rather than
+an event loop. Concurrency is opt-in with cfg['instrument_io_concurrent'];
+without it, the calls run one after the other in the calling thread.
+
+Usage:
+    from qkit.core.lib.concurrent_io import call_concurrently
+    t_mxc, t_still, r = call_concurrently([ivd.get_T_MXC, ivd.get_T_still, dmm.get_resistance])
+"""
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import qkit
+
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()  # marks the threads of the pool
+
+
+def executor():
+    """ the shared thread pool, with qkit.cfg['instrument_io_workers'] (default 8) threads """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=qkit.cfg.get('instrument_io_workers', 8),
+                                           thread_name_prefix="instrument io")
+        return _executor
+
+
+def enabled():
+    return qkit.cfg.get('instrument_io_concurrent', False)
+
+
+def instrument_of(func):
+    """
+    Returns the instrument 'func' talks to, or None if unknown.
+    Recognizes bound methods, functools.partial and the get_<parameter>/set_<parameter> functions
+    of qkit instruments (closures over the instrument).
+    """
+    from qkit.core.instrument_base import Instrument
+    while isinstance(func, functools.partial):
+        func = func.func
+    owner = getattr(func, '__self__', None)
+    if isinstance(owner, Instrument):
+        return owner
+    instruments = {id(c.cell_contents): c.cell_contents for c in (getattr(func, '__closure__', None) or ())
+                   if isinstance(getattr(c, 'cell_contents', None), Instrument)}
+    if len(instruments) == 1:
+        return next(iter(instruments.values()))
+    return None
+
+
+def _call_locked(instrument, func, *args, **kwargs):
+    # runs in the threads of the pool
+    _local.worker = True
+    if instrument is None:
+        return func(*args, **kwargs)
+    with instrument.io_lock:
+        return func(*args, **kwargs)
+
+
+def submit(func, *args, **kwargs):
+    """ Calls func(*args, **kwargs) on the thread pool, holding the io_lock of its instrument. Returns a Future. """
+    return executor().submit(_call_locked, instrument_of(func), func, *args, **kwargs)
+
+
+def _call_group(calls):
+    # the calls of one instrument, one after the other
+    return [_call_locked(instrument, func) for instrument, func in calls]
+
+
+def call_concurrently(funcs, instruments=None, concurrent=None):
+    """
+    Calls the functions without arguments and returns their results in the same order.
+    Functions of the same instrument are called one after the other, those of different
+    instruments concurrently. Functions of unknown instruments (e.g. lambdas over a global
+    instrument) form one more group, called one after the other. If a call fails, the first exception is raised
+    after all calls have finished. Called from a task of the pool, the funcs are called
+    in that thread.
+
+    Args:
+        funcs: list of callables.
+        instruments: optional list of the instruments of the funcs, default instrument_of(func).
+        concurrent: default qkit.cfg['instrument_io_concurrent'], False calls the funcs in this thread.
+    """
+    funcs = list(funcs)
+    if concurrent is None:
+        concurrent = enabled()
+    if getattr(_local, 'worker', False):
+        concurrent = False  # nested in a task of the pool, which must not wait for the pool
+    if not concurrent or len(funcs) < 2:
+        return [func() for func in funcs]
+    if instruments is None:
+        instruments = [instrument_of(func) for func in funcs]
+    groups = {}
+    for i, (instrument, func) in enumerate(zip(instruments, funcs)):
+        # calls of unknown instruments may talk to any device, they are called one after the other
+        key = id(instrument) if instrument is not None else None
+        groups.setdefault(key, []).append((i, instrument, func))
+    pool = executor()
+    futures = [(group, pool.submit(_call_group, [(instrument, func) for _, instrument, func in group]))
+               for group in groups.values()]
+    results = [None] * len(funcs)
+    errors = []
+    for group, future in futures:
+        try:
+            for (i, _, _), result in zip(group, future.result()):
+                results[i] = result
+        except Exception as e:
+            logging.error("concurrent io: A call failed: {!r}".format(e))
+            errors.append(e)
+    if errors:
+        raise errors[0]
+    return results
@@ -15,19 +15,46 @@ The file contents are untrusted. (Who knows where they come from.) They thus may
 UUID=rel_path\n
 
 The UUID is 6 symbols long. It is followed by an `=` symbol. The rest of the line is the relative path.
+
+The breadcrumb file is a journal, entries are appended. Once the part appended since the last compaction
+grows too large, the writer compacts it: duplicate UUIDs are removed (the last entry wins) and an index
+`.{Node-UUID}.breadcrumb.idx` is written next to it. The index is a binary file, which is memory-mapped
+for lookups:
+    header: magic b'QKBC', version (uint16), reserved (uint16), count (uint32), journal size (uint64),
+        crc32 of the ends of the indexed journal (uint32)
+    count records sorted by UUID: UUID (6 bytes), offset (uint32) and length (uint16) of the path
+    the relative paths (utf-8)
+A UUID is found by a binary search in the records. Entries appended after the compaction, i.e. beyond the
+journal size of the header, are read from the journal directly. An index not matching its journal (the
+journal is shorter than the indexed size or its checksum differs, e.g. after the journal was deleted and
+written anew) is ignored and the whole journal is parsed.
 """
 import os
+import mmap
+import struct
+import zlib
 from pathlib import Path
 import qkit
 from os import PathLike
 import itertools
 from filelock import FileLock, Timeout
 import logging
+from typing import Optional
 
 log = logging.getLogger('breadcrumbs')
 
 FILE_END = ".breadcrumb"
 LOCK_EXTENSION = ".lock"
+INDEX_EXTENSION = ".idx"
+
+INDEX_MAGIC = b'QKBC'
+INDEX_VERSION = 2
+_HEADER = struct.Struct('<4sHHIQI')
+# bytes at the start and at the end of the indexed journal covered by the checksum
+_CHECKED_BYTES = 256
+_RECORD = struct.Struct('<6sIH')
+# compact once the journal beyond the index is larger than this or than 1/8 of the indexed part
+COMPACT_BYTES = 2 ** 16
 
 def derive_breadcrumb_filename(extension = FILE_END) -> Path:
     """
@@ -54,13 +81,15 @@ class BreadCrumbCreator():
 
     def __init__(self) -> None:
         self._breadcrumb_path = derive_breadcrumb_filename()
+        self._index_path = derive_breadcrumb_filename(extension=FILE_END + INDEX_EXTENSION)
         self._lock = FileLock(derive_breadcrumb_lock_file(), timeout=5)
 
     def clear_file(self):
         try:
             with self._lock:
-                if self._breadcrumb_path.exists():
-                    os.remove(self._breadcrumb_path)
+                for path in (self._index_path, self._breadcrumb_path):
+                    if path.exists():
+                        os.remove(path)
         except Timeout:
             log.error("Acquiring file lock timed out.")
             raise
@@ -69,17 +98,61 @@ class BreadCrumbCreator():
             raise
 
     def append_entry(self, uuid: str, path: PathLike):
-        rel_path = Path(path).relative_to(self._breadcrumb_path.parent)
+        self.append_entries([(uuid, path)])
+
+    def append_entries(self, entries: 'list[tuple[str, PathLike]]'):
+        """
+        Append many (uuid, path) entries at once, taking the file lock only once.
+        """
+        lines = [f"{uuid[:6]}={Path(path).relative_to(self._breadcrumb_path.parent)}\n" for uuid, path in entries] # Fails if uuid is not 6 digits
         try:
             with self._lock:
                 with open(self._breadcrumb_path, mode="a", encoding='utf-8') as breadcrumb_file:
-                    print(f"{uuid[:6]}={rel_path}", file=breadcrumb_file, flush=True) # Fails if uuid is not 6 digits
+                    breadcrumb_file.writelines(lines)
+                size = os.path.getsize(self._breadcrumb_path)
+                indexed = _indexed_size(self._index_path, self._breadcrumb_path)
+                if size - indexed > max(COMPACT_BYTES, indexed // 8):
+                    self._compact()
         except Timeout:
             log.error("Acquiring file lock timed out.")
             raise
         except OSError:
             log.error("Could not acquire lock file for writing breadcrumb.")
             raise
+
+    def compact(self):
+        """
+        Remove duplicate entries from the breadcrumb file and write its index.
+        """
+        try:
+            with self._lock:
+                self._compact()
+        except Timeout:
+            log.error("Acquiring file lock timed out.")
+            raise
+
+    def _compact(self):
+        if not self._breadcrumb_path.exists():
+            return
+        entries = {}
+        with open(self._breadcrumb_path, mode="r", encoding='utf-8') as f:
+            for line in f:
+                if len(line) > 7 and line[6] == '=':
+                    entries[line[:6]] = line[7:].strip()
+        journal = "".join(f"{uuid}={rel_path}\n" for uuid, rel_path in sorted(entries.items())).encode('utf-8')
+        records, blob = [], bytearray()
+        for uuid, rel_path in sorted(entries.items()):
+            encoded = rel_path.encode('utf-8')
+            records.append(_RECORD.pack(uuid.encode('ascii', errors='replace'), len(blob), len(encoded)))
+            blob += encoded
+        index = _HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, len(records), len(journal), _checksum(journal, len(journal))) \
+            + b"".join(records) + bytes(blob)
+        # the journal is replaced first: until the index is replaced, readers find the old one not matching and parse the journal
+        for path, content in ((self._breadcrumb_path, journal), (self._index_path, index)):
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, mode="wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
             
 
 def read_breadcrumb(path: Path) -> dict[str, Path]:
@@ -96,6 +169,110 @@ def read_breadcrumb(path: Path) -> dict[str, Path]:
                 uuid_map[uuid] = breadcrumb_parent / rel_path
     return uuid_map
 
+def _checksum(journal: bytes, size: int) -> int:
+    """
+    crc32 of the first and the last bytes of journal[:size].
+    """
+    return zlib.crc32(journal[:min(size, _CHECKED_BYTES)] + journal[max(0, size - _CHECKED_BYTES):size])
+
+def _journal_matches(journal_path: Path, journal_size: int, checksum: int) -> bool:
+    """
+    Checks that the journal still starts with the part written by the compaction of the index.
+    """
+    try:
+        with open(journal_path, mode="rb") as f:
+            if os.fstat(f.fileno()).st_size < journal_size:
+                return False
+            head = f.read(min(journal_size, _CHECKED_BYTES))
+            f.seek(max(0, journal_size - _CHECKED_BYTES))
+            tail = f.read(journal_size - max(0, journal_size - _CHECKED_BYTES))
+    except OSError:
+        return False
+    return zlib.crc32(head + tail) == checksum
+
+def _indexed_size(index_path: Path, journal_path: Path) -> int:
+    """
+    Size of the journal covered by the index, 0 if there is no valid index matching the journal.
+    """
+    try:
+        with open(index_path, mode="rb") as f:
+            header = f.read(_HEADER.size)
+    except OSError:
+        return 0
+    if len(header) != _HEADER.size:
+        return 0
+    magic, version, _, count, journal_size, checksum = _HEADER.unpack(header)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION or not _journal_matches(journal_path, journal_size, checksum):
+        return 0
+    return journal_size
+
+def _index_lookup(index_path: Path, journal_path: Path, uuid: str) -> 'tuple[Optional[str], int]':
+    """
+    Binary search of uuid in an index file. Returns the relative path (or None) and the indexed journal size,
+    which is 0 if the index does not match the journal.
+    """
+    try:
+        with open(index_path, mode="rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                return None, 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, version, _, count, journal_size, checksum = _HEADER.unpack_from(mm, 0)
+                blob = _HEADER.size + count * _RECORD.size
+                if magic != INDEX_MAGIC or version != INDEX_VERSION or blob > len(mm):
+                    return None, 0
+                if not _journal_matches(journal_path, journal_size, checksum):
+                    return None, 0
+                key = uuid.encode('ascii', errors='replace')
+                lo, hi = 0, count
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if mm[_HEADER.size + mid * _RECORD.size:_HEADER.size + mid * _RECORD.size + 6] < key:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                if lo < count:
+                    found, offset, length = _RECORD.unpack_from(mm, _HEADER.size + lo * _RECORD.size)
+                    if found == key and blob + offset + length <= len(mm):
+                        return mm[blob + offset:blob + offset + length].decode('utf-8', errors='replace'), journal_size
+                return None, journal_size
+    except (OSError, ValueError, struct.error):
+        return None, 0
+
+def lookup_breadcrumb(path: Path, uuid: str) -> Optional[Path]:
+    """
+    Look up a single UUID in a breadcrumb file, using its index if there is one.
+    Only the entries appended since the last compaction are parsed.
+    """
+    path = Path(path)
+    rel_path, indexed = _index_lookup(path.with_name(path.name + INDEX_EXTENSION), path, uuid)
+    try:
+        with open(path, mode="rb") as f:
+            f.seek(indexed)
+            tail = f.read()
+    except OSError:
+        tail = b""
+    # entries appended later win
+    for line in tail.decode('utf-8', errors='replace').splitlines():
+        if len(line) > 7 and line[6] == '=' and line[:6] == uuid:
+            rel_path = line[7:].strip()
+    if rel_path is None:
+        return None
+    return path.parent / rel_path
+
+def lookup_breadcrumbs(dir: Path, uuid: str) -> Optional[Path]:
+    """
+    Look up a UUID in the breadcrumb files of all machines in dir.
+    """
+    for breadcrumb in Path(dir).iterdir():
+        if breadcrumb.name.endswith(FILE_END) and breadcrumb.is_file():
+            result = lookup_breadcrumb(breadcrumb, uuid)
+            if result is not None:
+                return result
+    return None
+
+def has_breadcrumbs(dir: Path) -> bool:
+    return any(f.name.endswith(FILE_END) and f.is_file() for f in Path(dir).iterdir())
+
 def read_breadcrumbs(dir: Path) -> dict[str, Path]:
     assert dir.is_dir(), "Directory must be a directory!"
     breadcrumbs = [f for f in dir.iterdir() if f.is_file and f.name.endswith(FILE_END)]
@@ -113,6 +290,8 @@ def manual_index():
         import qkit.core.s_init.S16_available_modules
         from qkit.core.lib.file_service.file_info_database import fid
         fid = fid()
+        fid.wait()
+        fid._breadcrumb_creator.compact()
 
 if __name__ == "__main__":
     manual_index()
\ No newline at end of file
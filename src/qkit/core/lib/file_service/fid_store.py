@@ -0,0 +1,240 @@
+"""
+Persistent store of the file info database (qkit.fid) in a local SQLite file.
+
+The store replaces the pickled caches of the file paths, mtimes and h5 infos,
+which had to be read and written as a whole on every start. Single files are
+updated in place, queries of the info columns run in SQLite.
+
+Tables:
+    files: uuid, kind ('.h5', 'set' or 'ent'), path and mtime of every indexed file
+    info: one row per h5 file with the columns INFO_COLUMNS
+    attrs: all other info entries (the analysis0 attributes) as (uuid, key, value)
+    columns: the columns read from each h5 file, as (uuid, column)
+    dirs: cached directory listings of the datadir scan
+    summaries: one row per dataset of an h5 file with its statistics and thumbnail,
+               see qkit.storage.hdf_summary, and the mtime of the file it was made from
+
+The database is opened in WAL mode, so several qkit processes on one machine
+can share it; writers wait for each other up to 'timeout' seconds.
+The location is qkit.cfg['fid_store_path'], by default 'fid.sqlite' in the logdir.
+"""
+import json
+import logging
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+INFO_COLUMNS = ('time', 'datetime', 'run', 'user', 'name', 'rating', 'comment', 'fit_freq', 'fit_time')
+# always part of an info dict, the others only if they are set
+_BASE_COLUMNS = ('time', 'datetime', 'run', 'user', 'name')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (uuid TEXT NOT NULL, kind TEXT NOT NULL, path TEXT NOT NULL, mtime REAL,
+                                  PRIMARY KEY (uuid, kind));
+CREATE TABLE IF NOT EXISTS info (uuid TEXT PRIMARY KEY, {columns});
+CREATE TABLE IF NOT EXISTS attrs (uuid TEXT NOT NULL, key TEXT NOT NULL, value, PRIMARY KEY (uuid, key));
+CREATE INDEX IF NOT EXISTS attrs_key_value ON attrs (key, value);
+CREATE TABLE IF NOT EXISTS columns (uuid TEXT NOT NULL, column TEXT NOT NULL, PRIMARY KEY (uuid, column));
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime REAL, files TEXT, subdirs TEXT);
+CREATE TABLE IF NOT EXISTS summaries (uuid TEXT NOT NULL, ds_url TEXT NOT NULL, mtime REAL, ds_type INTEGER,
+                                      shape TEXT, dtype TEXT, fill TEXT, min REAL, max REAL, nan_fraction REAL,
+                                      thumbnail_shape TEXT, thumbnail BLOB, PRIMARY KEY (uuid, ds_url));
+""".format(columns=", ".join('"%s"' % c for c in INFO_COLUMNS)) + "".join(
+    'CREATE INDEX IF NOT EXISTS info_{0} ON info ("{0}");\n'.format(c) for c in INFO_COLUMNS)
+
+
+def _sql_value(value):
+    """Converts an info value (e.g. a numpy scalar or a bytes attribute) to a type SQLite can store."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    try:
+        return json.dumps(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _regexp(pattern, value):
+    return value is not None and re.search(pattern, str(value)) is not None
+
+
+class FidStore(object):
+    """
+    SQLite store of the file info database.
+
+    Args:
+        path: filepath of the database, ':memory:' for a temporary one.
+        timeout: seconds to wait for other processes writing the database.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._conn.create_function('REGEXP', 2, _regexp)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def clear(self):
+        """Deletes all entries."""
+        with self._lock, self._conn:
+            for table in ('files', 'info', 'attrs', 'columns', 'dirs', 'summaries'):
+                self._conn.execute("DELETE FROM %s" % table)
+
+    def files(self):
+        """Returns a dict {(uuid, kind): (path, mtime)} of all files."""
+        with self._lock:
+            rows = self._conn.execute("SELECT uuid, kind, path, mtime FROM files").fetchall()
+        return {(uuid, kind): (path, mtime) for uuid, kind, path, mtime in rows}
+
+    def put_files(self, rows):
+        """Inserts or updates files given as (uuid, kind, path, mtime)."""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO files (uuid, kind, path, mtime) VALUES (?, ?, ?, ?)", rows)
+
+    def delete_files(self, keys):
+        """Deletes the files given as (uuid, kind) and the infos of deleted h5 files."""
+        keys = list(keys)
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM files WHERE uuid = ? AND kind = ?", keys)
+            h5 = [(uuid,) for uuid, kind in keys if kind == '.h5']
+            self._conn.executemany("DELETE FROM info WHERE uuid = ?", h5)
+            self._conn.executemany("DELETE FROM attrs WHERE uuid = ?", h5)
+            self._conn.executemany("DELETE FROM columns WHERE uuid = ?", h5)
+            self._conn.executemany("DELETE FROM summaries WHERE uuid = ?", h5)
+
+    def infos(self):
+        """Returns a dict {uuid: info dict} of all h5 files."""
+        with self._lock:
+            rows = self._conn.execute("SELECT uuid, %s FROM info" % ", ".join('"%s"' % c for c in INFO_COLUMNS)).fetchall()
+            attrs = self._conn.execute("SELECT uuid, key, value FROM attrs").fetchall()
+        infos = {}
+        for row in rows:
+            infos[row[0]] = {c: v for c, v in zip(INFO_COLUMNS, row[1:]) if v is not None or c in _BASE_COLUMNS}
+        for uuid, key, value in attrs:
+            infos.setdefault(uuid, {})[key] = value
+        return infos
+
+    def columns(self):
+        """Returns a dict {uuid: set of the columns read from the h5 file}."""
+        with self._lock:
+            rows = self._conn.execute("SELECT uuid, column FROM columns").fetchall()
+        columns = {}
+        for uuid, column in rows:
+            columns.setdefault(uuid, set()).add(column)
+        return columns
+
+    def put_infos(self, infos, columns=None):
+        """
+        Inserts or replaces the info dicts of {uuid: info dict}
+        and the read columns of {uuid: columns}, if given.
+        """
+        rows, attrs = [], []
+        for uuid, info in infos.items():
+            rows.append((uuid,) + tuple(_sql_value(info.get(c)) for c in INFO_COLUMNS))
+            attrs.extend((uuid, str(k), _sql_value(v)) for k, v in info.items() if k not in INFO_COLUMNS)
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO info VALUES (%s)" % ", ".join("?" * (len(INFO_COLUMNS) + 1)), rows)
+            self._conn.executemany("DELETE FROM attrs WHERE uuid = ?", [(uuid,) for uuid in infos])
+            self._conn.executemany("INSERT INTO attrs (uuid, key, value) VALUES (?, ?, ?)", attrs)
+            if columns is not None:
+                self._conn.executemany("DELETE FROM columns WHERE uuid = ?", [(uuid,) for uuid in columns])
+                self._conn.executemany("INSERT INTO columns (uuid, column) VALUES (?, ?)",
+                                       [(uuid, c) for uuid, cols in columns.items() for c in cols])
+
+    def dirs(self):
+        """Returns the cached directory listings {path: (mtime, files, subdirs)}."""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, mtime, files, subdirs FROM dirs").fetchall()
+        return {path: (mtime, json.loads(files), json.loads(subdirs)) for path, mtime, files, subdirs in rows}
+
+    def put_dirs(self, listings):
+        """Inserts or updates directory listings {path: (mtime, files, subdirs)}."""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO dirs (path, mtime, files, subdirs) VALUES (?, ?, ?, ?)",
+                                   [(path, l[0], json.dumps(l[1]), json.dumps(l[2])) for path, l in listings.items()])
+
+    def delete_dirs(self, paths):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM dirs WHERE path = ?", [(p,) for p in paths])
+
+    def summaries(self, uuids=None):
+        """
+        Returns {uuid: (mtime, {ds_url: summary})} of the given or of all h5 files,
+        the summaries as made by qkit.storage.hdf_summary.summarize().
+        """
+        sql = ("SELECT uuid, ds_url, mtime, ds_type, shape, dtype, fill, min, max, nan_fraction, thumbnail_shape, thumbnail"
+               " FROM summaries")
+        with self._lock:
+            if uuids is None:
+                rows = self._conn.execute(sql).fetchall()
+            else:
+                rows = []
+                for uuid in uuids:
+                    rows += self._conn.execute(sql + " WHERE uuid = ?", (uuid,)).fetchall()
+        summaries = {}
+        for uuid, ds_url, mtime, ds_type, shape, dtype, fill, lo, hi, nan_fraction, thumbnail_shape, thumbnail in rows:
+            if thumbnail is not None:
+                thumbnail = np.frombuffer(thumbnail, dtype=np.float32).reshape(json.loads(thumbnail_shape))
+            summaries.setdefault(uuid, (mtime, {}))[1][ds_url] = {
+                'ds_type': ds_type, 'shape': tuple(json.loads(shape)), 'dtype': dtype, 'fill': json.loads(fill),
+                'min': lo, 'max': hi, 'nan_fraction': nan_fraction, 'thumbnail': thumbnail}
+        return summaries
+
+    def put_summaries(self, summaries):
+        """Replaces the summaries of the files given as {uuid: (mtime, {ds_url: summary})}."""
+        rows = []
+        for uuid, (mtime, datasets) in summaries.items():
+            for ds_url, summary in datasets.items():
+                thumbnail = summary['thumbnail']
+                if thumbnail is not None:
+                    thumbnail = np.ascontiguousarray(thumbnail, dtype=np.float32)
+                rows.append((uuid, ds_url, mtime, summary['ds_type'], json.dumps(list(summary['shape'])), summary['dtype'],
+                             json.dumps(summary['fill']), summary['min'], summary['max'], summary['nan_fraction'],
+                             None if thumbnail is None else json.dumps(thumbnail.shape),
+                             None if thumbnail is None else thumbnail.tobytes()))
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM summaries WHERE uuid = ?", [(uuid,) for uuid in summaries])
+            self._conn.executemany("INSERT INTO summaries VALUES (%s)" % ", ".join("?" * 12), rows)
+
+    def has_column(self, column):
+        """True if 'column' is an info column or an attribute of at least one file."""
+        if column in INFO_COLUMNS:
+            return True
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM attrs WHERE key = ? LIMIT 1", (column,)).fetchone() is not None
+
+    def query(self, column, expression=None, value=None, bounds=None):
+        """
+        Returns the uuids whose 'column' matches the regular expression 'expression',
+        equals 'value' or lies between the (exclusive) 'bounds'. Exactly one of them has to be given.
+        """
+        if [expression, value, bounds].count(None) != 2:
+            logging.error("fid store: Pass exactly one of expression, value and bounds.")
+            raise ValueError
+        if expression is not None:
+            condition, args = "{} REGEXP ?", (expression,)
+        elif value is not None:
+            condition, args = "{} = ?", (_sql_value(value),)
+        else:
+            condition, args = "{0} > ? AND {0} < ?", (_sql_value(bounds[0]), _sql_value(bounds[1]))
+        if column in INFO_COLUMNS:
+            sql = "SELECT uuid FROM info WHERE " + condition.format('"%s"' % column)
+        else:
+            sql = "SELECT uuid FROM attrs WHERE key = ? AND " + condition.format("value")
+            args = (column,) + args
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, args)]
@@ -16,7 +16,22 @@ fid configuration settings (defaults)
 fid_scan_datadir = True
     Indicates whether you want to scan your datadir for h5 files at startup.
 fid_scan_hdf     = False
-    This will open every h5 file found and extract attributes.
+    This will open h5 files and extract attributes. Only the columns in fid_hdf_columns
+    are read in the scan, all others when they are used in show(columns=...) or search().
+fid_hdf_columns = ()
+    Columns read from every h5 file in the scan, e.g. ['comment', 'rating'] or ['*'] for all.
+fid_scan_workers = 8
+    Number of threads listing the directories and of workers reading the h5 files.
+fid_scan_processes = True
+    Read the h5 files with fid_scan_hdf in worker processes instead of threads.
+fid_scan_skip_age = None
+    Directories not modified for this many seconds are not checked for new files
+    at startup, e.g. 30*24*3600 to skip old run and user folders.
+fid_store_path = <logdir>/fid.sqlite
+    SQLite file keeping the database between runs, see fid_store.py.
+fid_watch = False
+    Keep the database current with file system events after the scan ('auto', 'inotify'
+    or 'poll', see file_watcher.py), instead of adding only the files of this kernel.
 fid_init_viewer  = True
     Make a database out of the dictionary of h5 files.
 
@@ -30,6 +45,9 @@ This is the main database. It holds an index of UUID <-> h5-file path.
 usage: 
 qkit.fid.h5_db.get("UUID") or qkit.fid.get("UUID") returns the h5_file path
 
+All databases are kept in a SQLite store (fid_store.py), which is updated file by
+file and queried by qkit.fid.search().
+
 h5_info_db
 ----------
 This database is only populated when the qkit.cfg setting 'fid_scan_hdf' is True.
@@ -83,17 +101,28 @@ import numpy as np
 
 import qkit
 
-found_qgrid = False
-if qkit.module_available['pandas']:
-    import pandas as pd
-    if qkit.module_available['qgrid']:
-        import qgrid as qd
-        found_qgrid = True
+# pandas and qgrid are imported where they are used, they are slow to import
+found_qgrid = qkit.module_available['pandas'] and qkit.module_available['qgrid']
+
+from qkit.core.lib.file_service.file_info_database_lib import file_system_service, PATH_COLUMNS
+from qkit.storage.hdf_constants import ds_types
+
+_PREVIEW_TYPES = (ds_types['vector'], ds_types['matrix'], ds_types['box'])
 
-from qkit.core.lib.file_service.file_info_database_lib import file_system_service
 
-# display using qviewkit
-from qkit.gui.plot.plot import plot
+def summary_text(summaries):
+    """ short description of the value datasets of a file, e.g. 'amplitude 100x501 [0.012, 0.98]' """
+    parts = []
+    for ds_url, s in sorted(summaries.items()):
+        if s['ds_type'] not in _PREVIEW_TYPES:
+            continue
+        text = "{} {}".format(ds_url.split('/')[-1], "x".join(str(n) for n in s['shape']))
+        if s['min'] is not None:
+            text += " [{:.4g}, {:.4g}]".format(s['min'], s['max'])
+        if s['nan_fraction']:
+            text += " {:.0%} NaN".format(s['nan_fraction'])
+        parts.append(text)
+    return "; ".join(parts)
 
 class fid(file_system_service):
     def __init__(self):
@@ -105,6 +134,7 @@ class fid(file_system_service):
         # create initial database in the background. This can take a while...
         self.create_database()
         self._selected_df = []
+        self._search_uuids = None
         self.found_qgrid = found_qgrid
         
 
@@ -114,6 +144,9 @@ class fid(file_system_service):
         return sorted(self.h5_db.keys())[-1]
         
     def __getitem__(self, key):
+        if (type(key) == int or key not in self.h5_db) and self._updating():
+            # the uuid might not be found yet
+            self.wait()
         with self.lock:
             if type(key) == int:
                 return sorted(self.h5_db.keys())[key]
@@ -123,6 +156,8 @@ class fid(file_system_service):
                 raise KeyError("Can not find your UUID '{}' in qkit.fid database.".format(key))
 
     def get(self, key, args=None):
+        if key not in self.h5_db and self._updating():
+            self.wait()
         with self.lock:
             if key not in self.h5_db:
                 logging.error("Can not find your UUID '{}' in qkit.fid database.".format(key))
@@ -153,11 +188,15 @@ class fid(file_system_service):
             None
         """
 
+        # display using qviewkit
+        from qkit.gui.plot.plot import plot
+
         def plotif(filename):
             if filename:
                 plot(filename, live=False)
 
         if qkit.module_available['pandas']:
+            import pandas as pd
             if type(file_id) is pd.Index:
                 file_id = list(file_id)
         
@@ -173,6 +212,7 @@ class fid(file_system_service):
 
     def create_database(self,block=False):
         t1 = threading.Thread(name='creating_db', target=self.update_all)
+        self._update_threads = [t for t in self._update_threads if t.is_alive()] + [t1]
         t1.start()
         if block:
             t1.join()
@@ -182,11 +222,13 @@ class fid(file_system_service):
             Deletes all cached database files and rescans the whole directory tree.
             Use this if your database looks strange.
         '''
+        self.wait()
         self.h5_db = {}
         self.set_db = {}
         self.measure_db = {}
         self.h5_info_db = {}
         self._h5_n_mtime = {}
+        self._h5_columns = {}
         
         self._remove_cache_files()
         self._breadcrumb_creator.clear_file()
@@ -197,6 +239,8 @@ class fid(file_system_service):
         """
         self.update_file_db()
         self.update_grid_db()
+        if qkit.cfg.get('fid_watch', False):
+            self.start_watcher()
 
     def update_grid_db(self):
         with self.lock:
@@ -236,12 +280,16 @@ class fid(file_system_service):
         """
         If you want to rate your measurements, so that you can filter for good ones. You can add a rating into the analysis
         folder of the h5 file
-        :param uid: uid of the measurement file you wanna rate
-        :type str
+        :param uid: uid of the measurement file you wanna rate, or a list of uids which are rated in one batch
+        :type str, list
         :param rating: a simple value to rate your measurement. Default is 10, Rating <=0 is masked by default.
         :type int, float
         """
-        return self._set_hdf_attribute(uid, "rating", rating)
+        if isinstance(uid, str):
+            return self._set_hdf_attribute(uid, "rating", rating)
+        with self.attribute_batch():
+            for u in uid:
+                self._set_hdf_attribute(u, "rating", rating)
 
     if qkit.module_available['pandas']:
     
@@ -250,6 +298,7 @@ class fid(file_system_service):
             Creates a pandas data frame from your measurement
             data and allows to extract import values from h5-files
             """
+            import pandas as pd
         
             if len(self.h5_info_db) == 0:  # necessary if a data directory is chosen without any h5 file
                 self.df = pd.DataFrame(columns=['datetime', 'name', 'run', 'user'])
@@ -267,6 +316,7 @@ class fid(file_system_service):
             self.df.fillna("", inplace=True)  # Replace NAs with empty string to be able to detect changes
         
         def _get_settings_column(self, device, setting, uid=None, update_hdf=False):
+            import pandas as pd
             dfsetting = pd.DataFrame()
             if not isinstance(device, (tuple, list)):
                 device = [device]
@@ -276,14 +326,15 @@ class fid(file_system_service):
                 raise ValueError("Please specify 'device' and 'setting' as equally long lists, where teir individual entries correspond to each other.")
             if uid is None:
                 uid = self.df.index
-            for i in uid:
-                values = self._get_setting_from_set_file(self.h5_db[i].replace('.h5', '.set'), device, setting)
-                if update_hdf:
-                    for p, v in values.items():
-                        self._set_hdf_attribute(i, p, v)
-                dfsetting = pd.concat([dfsetting,
-                                       pd.DataFrame(values, index=[i])
-                                       ], sort=False)
+            with self.attribute_batch():
+                for i in uid:
+                    values = self._get_setting_from_set_file(self.h5_db[i].replace('.h5', '.set'), device, setting)
+                    if update_hdf:
+                        for p, v in values.items():
+                            self._set_hdf_attribute(i, p, v)
+                    dfsetting = pd.concat([dfsetting,
+                                           pd.DataFrame(values, index=[i])
+                                           ], sort=False)
             return dfsetting
     
         def add_settings_column(self, device, setting, measurement_id=None):
@@ -297,6 +348,7 @@ class fid(file_system_service):
             :param uid: measurement_id (list). If None (default), all are used
             :type str
             """
+            import pandas as pd
             settings_column = self._get_settings_column(device, setting, measurement_id, update_hdf=qkit.cfg.get('fid_scan_hdf', False))
             for key in settings_column.keys():
                 if key in self.df.keys():
@@ -348,14 +400,16 @@ class fid(file_system_service):
                 uuids = [i for i in list(changed_df.index) if i in self.df.index]
                 indices = np.where(self.df.loc[uuids, keys] != changed_df.loc[uuids, keys])
                 logging.debug("I found {} changes".format(len(indices[0])))
-                for i in range(len(indices[0])):
-                    index = uuids[indices[0][i]]
-                    key = keys[indices[1][i]]
-                    new_value = changed_df.loc[index, key]
-                    if self.df.loc[index, key] != new_value:
-                        self._set_hdf_attribute(index, key, new_value)
-                        logging.debug("{}[{}] '{}'-> '{}'".format(index, key, self.df.loc[index, key], new_value))
-                        self.df.loc[index, key] = new_value
+                # all edits of a batch change are written with one open per file
+                with self.attribute_batch():
+                    for i in range(len(indices[0])):
+                        index = uuids[indices[0][i]]
+                        key = keys[indices[1][i]]
+                        new_value = changed_df.loc[index, key]
+                        if self.df.loc[index, key] != new_value:
+                            self._set_hdf_attribute(index, key, new_value)
+                            logging.debug("{}[{}] '{}'-> '{}'".format(index, key, self.df.loc[index, key], new_value))
+                            self.df.loc[index, key] = new_value
             except(ValueError, KeyError):
                 logging.info("Updating the measurment database failed.")
                 self.debug = [self.df.copy(), changed_df, keys]
@@ -366,13 +420,49 @@ class fid(file_system_service):
             self._batch_update = True
             self.grid.df = tmp
     
-        def show(self, show_raw=False):
+        def _use_columns(self, columns):
+            """
+            With fid_scan_hdf, reads the columns not read from the h5 files yet and adds them to the data frame.
+            """
+            if not qkit.cfg.get('fid_scan_hdf', False):
+                return
+            columns = [c for c in columns if c not in PATH_COLUMNS]
+            if not self.extract_columns(columns) or self.df is None:
+                return
+            if '*' in columns:
+                self.update_grid_db()
+                return
+            import pandas as pd
+            for c in columns:
+                values = pd.Series({uuid: self.h5_info_db.get(uuid, {}).get(c, np.nan) for uuid in self.df.index}, dtype=object)
+                if c in ['rating', 'fit_time', 'fit_freq']:
+                    values = pd.to_numeric(values, errors='coerce')
+                self.df[c] = values.fillna("")
+
+        def _use_summaries(self):
+            """
+            Adds the column 'datasets' with the shape and range of the value datasets of each file
+            from the summaries in the store, computing the missing ones first.
+            """
+            import pandas as pd
+            self.extract_summaries(list(self.df.index))
+            summaries = self.summaries(list(self.df.index))
+            self.df['datasets'] = pd.Series({uuid: summary_text(summaries.get(uuid, {})) for uuid in self.df.index}, dtype=object)
+
+        def show(self, show_raw=False, columns=None, summaries=False):
             """
             used to show the data base as a qgrid object or if not installed pandas data frame
+            :param columns: list of additional columns read from the h5 files (with fid_scan_hdf), e.g. ['comment', 'fit_freq']
+            :param summaries: adds the column 'datasets' with the shape and range of the datasets, see preview()
             :return: data frame as qgrid object or pandas object
             """
             self.wait()
+            self._use_columns(['rating'] + list(qkit.cfg.get('fid_hdf_columns', None) or ()) + list(columns or ()))
+            if summaries:
+                self._use_summaries()
+            import pandas as pd
             if self.found_qgrid:
+                import qgrid as qd
                 if Version(qd.__version__) < Version("1.3.0") and Version(pd.__version__) >= Version("1.0"):
                     logging.warning("qgrid < v1.3 is incompatible with pandas > v1.0. Check for a new version of qgrid or downgrade pandas to v0.25.3")
                     self.found_qgrid = False
@@ -416,7 +506,7 @@ class fid(file_system_service):
             Otherwise, all measurements in the current view are given.
             This is especially handy if you did some filtering beforehand
             
-            This of course only works if qgrid is installed.
+            Without qgrid, the UUIDs found by the last search() are returned.
             
             :return: list of UUIDs
             """
@@ -425,8 +515,10 @@ class fid(file_system_service):
                     return list(self._selected_df.index)
                 else:
                     return list(self.grid.get_changed_df().index)
+            elif self._search_uuids is not None:
+                return list(self._search_uuids)
             else:
-                logging.warning("Module qgrid is not installed. Filtering the database is only supported with qgrid.")
+                logging.warning("Module qgrid is not installed. Filtering the database is only supported with qgrid or search().")
                 return False
         
         def search(self, column, expression=None, value=None, bounds=None):
@@ -443,6 +535,12 @@ class fid(file_system_service):
             :type int
             :return: pandas data frame where the values you are searching for are included
             """
+            self._use_columns([column])
+            if [expression, value, bounds].count(None) == 2 and self._store.has_column(column):
+                # the query runs in the fid store, columns added only to the data frame are searched with pandas
+                uuids = self._store.query(column, expression=expression, value=value, bounds=bounds)
+                self._search_uuids = self.df.index.intersection(uuids)
+                return self.df.loc[self._search_uuids]
             if expression is not None and value is None and bounds is None:
                 return self.df[self.df[column].str.contains(expression, na=False)]
             if value is not None and expression is None and bounds is None:
@@ -462,6 +560,7 @@ class fid(file_system_service):
             if colname in self.df:
                 raise ValueError("Column {} is already in your dataset. Can not be added twice".format(colname))
             else:
+                import pandas as pd
                 self.df.loc[:, colname] = pd.Series(value, index=self.df.index)
     else:
         # If pandas is not installed, raise an error if the public functions are called
@@ -471,6 +570,33 @@ class fid(file_system_service):
 
         add_settings_column = open_in_filemanager = remove_column = show = get_filtered_uuids = search = add_column = void_func
 
+    def preview(self, uuid, ds_urls=None):
+        """
+        Plots the thumbnails of the datasets of a measurement from the summaries in the store,
+        without opening the h5 file or qviewkit. Missing summaries are computed first.
+        :param uuid: uuid of the measurement
+        :param ds_urls: list of datasets, default: all vectors, matrices and boxes
+        :return: the matplotlib figure
+        """
+        if not qkit.module_available("matplotlib"):
+            raise ImportError("matplotlib not found.")
+        import matplotlib.pyplot as plt
+        self.extract_summaries([uuid])
+        summaries = self.summaries([uuid]).get(uuid, {})
+        if ds_urls is None:
+            ds_urls = [ds_url for ds_url, s in sorted(summaries.items()) if s['ds_type'] in _PREVIEW_TYPES]
+        ds_urls = [ds_url for ds_url in ds_urls if summaries.get(ds_url, {}).get('thumbnail') is not None]
+        fig, axes = plt.subplots(1, max(1, len(ds_urls)), figsize=(4 * max(1, len(ds_urls)), 3), squeeze=False)
+        for ax, ds_url in zip(axes[0], ds_urls):
+            thumbnail = summaries[ds_url]['thumbnail']
+            if thumbnail.ndim == 1:
+                ax.plot(thumbnail)
+            else:
+                ax.imshow(thumbnail.T, aspect='auto', origin='lower')
+            ax.set_title("{} {}".format(ds_url.split('/')[-1], "x".join(str(n) for n in summaries[ds_url]['shape'])))
+        fig.suptitle(uuid)
+        return fig
+
     def enlarge_notebook(self,width=100):
         from IPython.core.display import display, HTML
         display(HTML("<style>.container { width:%i%% !important; }</style>"%width))
\ No newline at end of file
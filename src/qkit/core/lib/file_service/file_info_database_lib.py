@@ -3,18 +3,19 @@ import qkit
 import os
 import threading
 import logging
+import multiprocessing
 import time
 import json
+import atexit
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 import numpy as np
 import qkit.storage.hdf_DateTimeGenerator as dtg
 from qkit.core.lib.file_service.breadcrumbs import BreadCrumbCreator
+from qkit.core.lib.file_service.fid_store import FidStore
+from qkit.core.lib.file_service.file_watcher import create_watcher
 import h5py
 
-try:
-    import cPickle as pickle
-except:
-    import pickle
-
 class UUID_base(object):
     _alphabet = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 
@@ -62,6 +63,237 @@ class UUID_base(object):
         return time.strftime("%Y-%m-%d %H:%M:%S",time.localtime(self.get_time(uuid)))
 
 
+_uuid_base = UUID_base()
+
+
+# columns derived from the path, all others are read from the h5 file
+PATH_COLUMNS = ('time', 'datetime', 'run', 'name', 'user')
+# columns of the measurement JSON in data0
+_MEASUREMENT_COLUMNS = ('run_id', 'rating', 'smt')
+
+
+def hdf_columns():
+    """ the columns read from the h5 files in the datadir scan, qkit.cfg['fid_hdf_columns'] if fid_scan_hdf is set """
+    if not qkit.cfg.get('fid_scan_hdf', False):
+        return None
+    return tuple(qkit.cfg.get('fid_hdf_columns', None) or ())
+
+
+def read_h5_info(uuid, path, columns=None):
+    """
+    Returns the info dict of the h5 file 'path' for the h5_info_db. Time, name, run and user
+    are derived from the path. Only the 'columns' are read from the file:
+        'comment': comment of data0
+        'fit_freq', 'fit_time': legacy fit results of analysis0/dr_values
+        'run_id', 'rating', 'smt': entries of the measurement JSON, 'rating' defaults to 10
+        any other name: the analysis0 attribute of this name
+        '*': all of them, including all analysis0 attributes
+    With 'columns' None, the file is not opened.
+    This is a module level function, so it can run in the worker processes of the datadir scan.
+    """
+    tm = ""
+    dt = ""
+    j_split = (path.replace('/', '\\')).split('\\')
+    name = j_split[-1][7:-3]
+    if ord(uuid[0]) > ord('L'):
+        try:
+            tm = _uuid_base.get_time(uuid)
+            dt = _uuid_base.get_date(uuid)
+            user = j_split[-3]
+            run = j_split[-4]
+        except ValueError as e:
+            user = None
+            run = None
+            logging.info(e)
+    else:
+        tm = uuid
+        try:
+            if j_split[-3][0:3] != 201:  # not really a measurement file then
+                dt = None
+            else:
+                dt = '{}-{}-{} {}:{}:{}'.format(j_split[-3][:4], j_split[-3][4:6], j_split[-3][6:], tm[:2], tm[2:4], tm[4:])
+        except IndexError:
+            dt = None
+        user = None
+        run = None
+    h5_info_db = {'time': tm, 'datetime': dt, 'run': run, 'name': name, 'user': user}
+    
+    if columns is not None:
+        columns = set(columns) - set(PATH_COLUMNS)
+        every = '*' in columns
+        if not columns:
+            return h5_info_db
+        if every or 'rating' in columns:
+            h5_info_db.update({'rating':10})
+        h5f = None
+        try:
+            h5f=h5py.File(path,'r')
+            if (every or 'comment' in columns) and "comment" in  h5f['/entry/data0'].attrs:
+                h5_info_db.update({'comment': h5f['/entry/data0'].attrs['comment']})
+            if (every or columns & {'fit_freq', 'fit_time'}) and "dr_values" in h5f['/entry/analysis0']:
+                try:
+                    # this is legacy and should be removed at some point
+                    # please use the entry/analysis0 attributes instead.
+                    fit_comment = h5f['/entry/analysis0/dr_values'].attrs.get('comment',"").split(', ')
+                    comm_begin = [i[0] for i in fit_comment]
+                    try:
+                        h5_info_db.update({'fit_freq': float(h5f['/entry/analysis0/dr_values'][comm_begin.index('f')])})
+                    except (ValueError, IndexError):
+                        pass
+                    try:
+                        h5_info_db.update({'fit_time': float(h5f['/entry/analysis0/dr_values'][comm_begin.index('T')])})
+                    except (ValueError, IndexError):
+                        pass
+                except (KeyError, AttributeError):
+                    pass
+            if (every or columns & set(_MEASUREMENT_COLUMNS)) and "measurement" in h5f['/entry/data0']:
+                try:
+                    mmt = json.loads(h5f['/entry/data0/measurement'][0])
+                    h5_info_db.update(
+                            {arg: mmt[arg] for arg in (_MEASUREMENT_COLUMNS + ('user',) if every else columns) if arg in mmt}
+                    )
+                except(AttributeError, KeyError, TypeError, ValueError):
+                    pass
+            try:
+                attrs = h5f['/entry/analysis0'].attrs
+                h5_info_db.update(dict(attrs) if every else {c: attrs[c] for c in columns if c in attrs})
+            except(AttributeError, KeyError):
+                pass
+        except KeyError as e:
+            logging.debug("fid could not index file {}, probably it is just new and empty. Original message: {}".format(path,e))
+        except IOError as e:
+            logging.error("fid {}:{}".format(path,e))
+        finally:
+            if h5f is not None:
+                h5f.close()
+
+    return h5_info_db
+
+
+def summarize_h5(path, size):
+    """
+    Summaries of the datasets of the h5 file (see qkit.storage.hdf_summary) for the fid store,
+    runs in the summary thread or the reader pool.
+
+    Returns:
+        (mtime, {ds_url: summary}) or None if the file changed while it was read.
+    """
+    from qkit.storage.hdf_summary import summarize
+    try:
+        mtime = os.stat(path).st_mtime
+        summaries = summarize(path, size)
+        if os.stat(path).st_mtime != mtime:
+            return None
+    except OSError:
+        return None
+    return mtime, summaries
+
+
+def _mtime(path):
+    """ mtime of 'path', None if it can not be read """
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _list_dir(path, cached, stat_h5):
+    """
+    Lists the h5, set and measurement files and the subdirectories of 'path',
+    runs in the worker threads of the datadir scan.
+
+    If the mtime of the directory equals the one of the 'cached' listing, the
+    directory is not listed again. With 'stat_h5', the mtimes of its h5 files
+    are still updated, as they change when a file is modified in place.
+
+    Returns:
+        (path, listing, changed), listing is (mtime, {filename: mtime of h5 files or None}, [subdirs])
+        or None if the directory can not be read.
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+        if cached is not None and cached[0] == mtime:
+            files = cached[1]
+            if stat_h5:
+                files = {f: (os.stat(os.path.join(path, f)).st_mtime if f[-3:] == '.h5' else None) for f in files}
+            return path, (mtime, files, cached[2]), False
+        files = {}
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    if not entry.is_symlink():  # like os.walk, do not follow links to directories
+                        subdirs.append(entry.name)
+                elif entry.name[-3:] == '.h5':
+                    files[entry.name] = entry.stat().st_mtime
+                elif entry.name[-3:] in ('set', 'ent'):
+                    files[entry.name] = None
+        return path, (mtime, files, subdirs), True
+    except OSError as e:
+        logging.warning("file info database: Could not read directory {}: {}".format(path, e))
+        return path, None, True
+
+
+def _is_empty(value):
+    """True for values which delete an attribute: "" and, with pandas, NaN/None/NaT."""
+    if isinstance(value, str):
+        return value == ""
+    if qkit.module_available['pandas']:
+        import pandas as pd
+        return bool(np.all(pd.isnull(value)))
+    return value is None
+
+
+def _open_in_process(path):
+    """True if this process has the h5 file 'path' open, e.g. in a running measurement."""
+    path = os.path.realpath(path)
+    for file_id in h5py.h5f.get_obj_ids(types=h5py.h5f.OBJ_FILE):
+        try:
+            if os.path.realpath(os.fsdecode(file_id.name)) == path:
+                return True
+        except (ValueError, OSError):
+            pass
+    return False
+
+
+def _writer_may_be_active(path, defer_age):
+    """
+    True if another writer could have the h5 file 'path' open.
+
+    Files in the latest format (superblock version >= 2, e.g. SWMR files) mark
+    an open writer in the superblock, opening them in 'r+' fails then.
+    Older files give no sign of a writer, they count as active if modified
+    within the last 'defer_age' seconds.
+    """
+    if _open_in_process(path):
+        return True
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(9)
+        if head[:8] == b'\x89HDF\r\n\x1a\n' and head[8] >= 2:
+            return False
+        return bool(defer_age) and time.time() - os.stat(path).st_mtime < defer_age
+    except OSError:
+        return False
+
+
+def write_hdf_attributes(h5_filepath, attributes):
+    """
+    Writes {attribute: value} to the analysis0 group of the h5 file in a single open,
+    empty values (see _is_empty) delete the attribute.
+    Raises OSError if the file can not be opened, e.g. while another process writes it.
+    """
+    from qkit.storage.hdf_file import file_kwargs
+    with h5py.File(h5_filepath, 'r+', **file_kwargs) as f:
+        analysis = f['entry'].require_group('analysis0')
+        for attribute, value in attributes.items():
+            if _is_empty(value):
+                if attribute in analysis.attrs:
+                    del analysis.attrs[attribute]
+            else:
+                analysis.attrs[attribute] = value
+
+
 class file_system_service(UUID_base):
     h5_db = {}
     set_db = {}
@@ -69,54 +301,62 @@ class file_system_service(UUID_base):
     h5_info_db = {}
 
     _h5_n_mtime = {}
+    _h5_columns = {}  # uuid -> columns read from the h5 file
     
-    _h5_mtime_db_path   = os.path.join(qkit.cfg['logdir'],"h5_mtime.db")
-    _h5_info_cache_path = os.path.join(qkit.cfg['logdir'],"h5_info_cache.db")
+    _store_path = os.path.join(qkit.cfg['logdir'],"fid.sqlite")
 
+    # lock guards the databases, it is only held for short updates. A running scan holds _scan_lock.
     lock = threading.Lock()
+    _scan_lock = threading.Lock()
+
+    # attribute edits {uuid: {attribute: value}} not yet written to the h5 files, see _set_hdf_attribute()
+    _attr_queue = {}
+    _attr_lock = threading.Lock()
+    _attr_flush_lock = threading.Lock()
+    _attr_batch_depth = 0
+    _attr_retry = None  # timer of the next try for files held by a writer
+    _attr_retry_interval = 0
+
+    _summary_thread = None  # computes the summaries of closed files, see summarize()
 
     def __init__(self):
         super().__init__()
         self._breadcrumb_creator = BreadCrumbCreator()
+        self._update_threads = []
+        self._watcher = None
+        store_path = qkit.cfg.get('fid_store_path') or self._store_path
+        if os.path.dirname(store_path):
+            os.makedirs(os.path.dirname(store_path), exist_ok=True)
+        self._store = FidStore(store_path)
 
     
     def _remove_cache_files(self):
         """
-            remove cached files to recreate the database
+            remove cached entries to recreate the database
         """
-        for f in [self._h5_mtime_db_path,self._h5_info_cache_path]:
-            if os.path.isfile(f):
-                os.remove(f)
+        self._store.clear()
 
     def _load_cache_files(self):
-        """ to speed up things, try to load the h5 
-            information from previous runs. 
+        """ to speed up things, load the h5 
+            information of previous runs from the store. 
         """
-        self._new_cache = False
-        self._h5_mtime_db = {}
-        self._h5_info_cache_db = {}
-        self._n_mtime = {}
-        try:
-            with open(self._h5_mtime_db_path,'rb') as f:
-                self._h5_mtime_db = pickle.load(f)
-            with open(self._h5_info_cache_path,'rb') as f:
-                self._h5_info_cache_db = pickle.load(f)
-        except IOError as e:
-            logging.info("m_time_db not found. Not using cached files for now. %s"%e)
-            self._new_cache = True
+        self._h5_file_cache_db = self._store.files()
+        self._h5_mtime_db = {uuid: mtime for (uuid, kind), (path, mtime) in self._h5_file_cache_db.items() if kind == '.h5'}
+        self._h5_info_cache_db = self._store.infos()
+        self._h5_columns = self._store.columns()
+        self._h5_dir_cache_db = self._store.dirs()
+        self._new_cache = not self._h5_dir_cache_db
 
-    def _store_cache_files(self):
-        """ writes the cached files on disk, 
-        qkit.cfg['logdir'] is used by default.
-
-        exeptions are not handled ... if something fails here 
-        there is a severe general problem, e.g. the disk is full.
-        """
-        write_protocol = 2 # For Python 2 compatibility 0=text, 1...x binary, -1 highest binary. 
-        with open(self._h5_mtime_db_path,'wb+') as f:
-            pickle.dump(self._h5_n_mtime,f,protocol=write_protocol)
-        with open(self._h5_info_cache_path,'wb+') as f:
-            pickle.dump(self.h5_info_db,f,protocol=write_protocol)
+    def _store_entries(self, uuid):
+        """ writes the files and the info of uuid to the store """
+        with self.lock:
+            rows = [(uuid, kind, db[uuid], self._h5_n_mtime.get(uuid) if kind == '.h5' else None)
+                    for kind, db in (('.h5', self.h5_db), ('set', self.set_db), ('ent', self.measure_db)) if uuid in db]
+            info = self.h5_info_db.get(uuid)
+            columns = self._h5_columns.get(uuid, ())
+        self._store.put_files(rows)
+        if info is not None:
+            self._store.put_infos({uuid: info}, columns={uuid: columns})
 
     def _get_datadir(self):
         if qkit.cfg.get('fid_restrict_to_userdir',False):
@@ -125,26 +365,150 @@ class file_system_service(UUID_base):
             return qkit.cfg['datadir']
 
     def update_file_db(self):
-        with self.lock:
+        with self._scan_lock:
             start_time = time.time()
             self._load_cache_files()
             if qkit.cfg.get('fid_scan_datadir',True):
                 qkit.cfg['fid_scan_datadir'] = True
                 logging.debug("file info database: Start to update database.")
-                for root, _ , files in os.walk(self._get_datadir()): # root, dirs, files
-                    for f in files:
-                        self._inspect_and_add_Leaf(f,root)
+                self._scan_datadir(os.fspath(self._get_datadir()))
                 logging.debug("file info database: Updating database done.")
-            self._store_cache_files()
             print ("Initialized the file info database (qkit.fid) in %.3f seconds."%(time.time()-start_time))
 
-    def _inspect_and_add_Leaf(self,fname,root):
+    def _cached_listings(self, root):
+        """ yields (directory, files) of the cached listings of root and its subdirectories """
+        dirs = [root]
+        while dirs:
+            path = dirs.pop()
+            listing = self._h5_dir_cache_db.get(path)
+            if listing is not None:
+                yield path, listing[1]
+                dirs.extend(os.path.join(path, d) for d in listing[2])
+
+    def _scan_datadir(self, datadir):
+        """
+        Walks the datadir and adds all files to the databases.
+
+        The files known from the last run are added first, so their uuids can be
+        looked up right away. Directories are then listed by a pool of threads, but
+        only if their mtime has changed, otherwise the cached listing is used.
+        Directories unchanged since the cached listing and older than
+        qkit.cfg['fid_scan_skip_age'] (seconds) are not listed, and neither are
+        their subdirectories.
+        Files are added as soon as their directory is listed. With fid_scan_hdf,
+        changed h5 files are read by a pool of worker processes (or threads, if
+        qkit.cfg['fid_scan_processes'] is False). Entries of files that are gone
+        are removed at the end, all changes are then written to the store.
+        """
+        workers = qkit.cfg.get('fid_scan_workers', 8)
+        columns = hdf_columns()
+        scan_hdf = bool(columns)
+        skip_age = qkit.cfg.get('fid_scan_skip_age', None)
+        now = time.time()
+
+        dbs = {'.h5': self.h5_db, 'set': self.set_db, 'ent': self.measure_db}
+        cached = {}
+        known_dirs = set()
+        with self.lock:
+            for path, files in self._cached_listings(datadir):
+                known_dirs.add(path)
+                for fname in files:
+                    fqpath = os.path.join(path, fname)
+                    if dbs[fname[-3:]].setdefault(fname[:6], fqpath) == fqpath:
+                        cached[fname[:6], fname[-3:]] = fqpath
+                    if fname[-3:] == '.h5' and fname[:6] in self._h5_info_cache_db:
+                        self.h5_info_db.setdefault(fname[:6], self._h5_info_cache_db[fname[:6]])
+
+        dir_cache = {}
+        collected = set()
+        breadcrumbs = []
+        jobs = {}  # future -> handler of its result
+        listers = ThreadPoolExecutor(workers, thread_name_prefix='qkit_fid_scan')
+        readers = []
+
+        def read_info(uuid, fqpath):
+            if not readers:
+                readers.append(self._reader_pool(workers))
+            jobs[readers[0].submit(read_h5_info, uuid, fqpath, columns)] = lambda info: self.h5_info_db.update({uuid: info})
+            self._h5_columns[uuid] = set(columns)
+            collected.add(uuid)
+
+        def collect_info(uuid, fqpath):
+            self._collect_info(uuid, fqpath)
+            collected.add(uuid)
+
+        def visit(path):
+            listing = self._h5_dir_cache_db.get(path)
+            if listing is not None and skip_age is not None and now - listing[0] > skip_age and _mtime(path) == listing[0]:
+                listed((path, listing, False))
+            else:
+                jobs[listers.submit(_list_dir, path, listing, scan_hdf)] = listed
+
+        def listed(result):
+            path, listing, changed = result
+            if listing is None:
+                return
+            dir_cache[path] = listing
+            for d in listing[2]:
+                visit(os.path.join(path, d))
+            for fname, mtime in listing[1].items():
+                fqpath = self._inspect_and_add_Leaf(fname, path, mtime, read_info if scan_hdf else collect_info)
+                cached.pop((fname[:6], fname[-3:]), None)
+                if changed and fname[-3:] == '.h5':
+                    breadcrumbs.append((fname[:6], fqpath))
+
+        try:
+            with self.lock:
+                visit(datadir)
+            while jobs:
+                done, _ = wait(list(jobs), return_when=FIRST_COMPLETED)
+                for future in done:
+                    handler = jobs.pop(future)
+                    try:
+                        with self.lock:
+                            handler(future.result())
+                    except Exception as e:
+                        logging.error("file info database: Scanning the datadir failed: {}".format(e))
+        finally:
+            listers.shutdown(wait=False)
+            for r in readers:
+                r.shutdown(wait=False)
+
+        with self.lock:
+            # files that were deleted since the last run
+            for (uuid, suffix), fqpath in cached.items():
+                if dbs[suffix].get(uuid) == fqpath:
+                    del dbs[suffix][uuid]
+                    if suffix == '.h5':
+                        self.h5_info_db.pop(uuid, None)
+                        self._h5_n_mtime.pop(uuid, None)
+            files = {}
+            for path, listing in dir_cache.items():
+                for fname, mtime in listing[1].items():
+                    files[fname[:6], fname[-3:]] = (os.path.join(path, fname), mtime)
+            infos = {uuid: self.h5_info_db[uuid] for uuid in collected if uuid in self.h5_info_db}
+            info_columns = {uuid: self._h5_columns.get(uuid, ()) for uuid in infos}
+
+        self._store.put_files([key + entry for key, entry in files.items() if self._h5_file_cache_db.get(key) != entry])
+        self._store.delete_files(key for key in cached if key not in files)
+        self._store.put_infos(infos, columns=info_columns)
+        self._store.put_dirs({path: listing for path, listing in dir_cache.items() if self._h5_dir_cache_db.get(path) != listing})
+        self._store.delete_dirs(known_dirs - set(dir_cache))
+        self._h5_dir_cache_db = dir_cache
+        if breadcrumbs:
+            self._breadcrumb_creator.append_entries(breadcrumbs)
+
+    def _inspect_and_add_Leaf(self,fname,root,mtime=None,collect_info=None):
         """
         inspect the filenames if .h5, .set or .measurement
 
         to speed up things, the files are only scanned 
         if something has changed (os.stat.m_time) on disk. 
+        'collect_info' replaces _collect_info(uuid, path), e.g. to read the file in a worker.
+
+        Returns the absolute path.
         """
+        collect_info = collect_info or self._collect_info
 
         # join to absolute path:
         fqpath = os.path.join(root, fname)
@@ -159,10 +523,10 @@ class file_system_service(UUID_base):
             # Note: All path entries with the same uuid are 
             # overwritten with the last found uuid indexed file
             self.h5_db[uuid] = fqpath
-            self._breadcrumb_creator.append_entry(uuid, fqpath)
 
             # we only care about the mtime of .h5 files 
-            mtime = os.stat(fqpath).st_mtime
+            if mtime is None:
+                mtime = os.stat(fqpath).st_mtime
 
             # store the file's modification time 
             self._h5_n_mtime[uuid] = mtime
@@ -171,87 +535,188 @@ class file_system_service(UUID_base):
                 if self._h5_info_cache_db.get(uuid,0):
                     self.h5_info_db[uuid] = self._h5_info_cache_db.get(uuid)
                 else:
-                    self._collect_info(uuid, fqpath) # collect_info is expensive.
+                    collect_info(uuid, fqpath) # collect_info is expensive.
             else:
-                self._collect_info(uuid, fqpath) # collect_info is expensive. 
+                collect_info(uuid, fqpath) # collect_info is expensive. 
 
         elif fqpath[-3:] == 'set':
             self.set_db[uuid] = fqpath
         elif fqpath[-3:] == 'ent':
             self.measure_db[uuid] = fqpath
+        return fqpath
 
     def _collect_info(self,uuid,path):
-            tm = ""
-            dt = ""
-            j_split = (path.replace('/', '\\')).split('\\')
-            name = j_split[-1][7:-3]
-            if ord(uuid[0]) > ord('L'):
-                try:
-                    tm = self.get_time(uuid)
-                    dt = self.get_date(uuid)
-                    user = j_split[-3]
-                    run = j_split[-4]
-                except ValueError as e:
-                    user = None
-                    run = None
-                    logging.info(e)
-            else:
-                tm = uuid
-                try:
-                    if j_split[-3][0:3] != 201:  # not really a measurement file then
-                        dt = None
-                    else:
-                        dt = '{}-{}-{} {}:{}:{}'.format(j_split[-3][:4], j_split[-3][4:6], j_split[-3][6:], tm[:2], tm[2:4], tm[4:])
-                except IndexError:
-                    dt = None
-                user = None
-                run = None
-            h5_info_db = {'time': tm, 'datetime': dt, 'run': run, 'name': name, 'user': user}
-            
-            if qkit.cfg.get('fid_scan_hdf', False):
-                h5_info_db.update({'rating':10})
-                try:
-                    h5f=h5py.File(path,'r')
-                    if "comment" in  h5f['/entry/data0'].attrs:
-                        h5_info_db.update({'comment': h5f['/entry/data0'].attrs['comment']})
-                    if "dr_values" in h5f['/entry/analysis0']:
-                        try:
-                            # this is legacy and should be removed at some point
-                            # please use the entry/analysis0 attributes instead.
-                            fit_comment = h5f['/entry/analysis0/dr_values'].attrs.get('comment',"").split(', ')
-                            comm_begin = [i[0] for i in fit_comment]
-                            try:
-                                h5_info_db.update({'fit_freq': float(h5f['/entry/analysis0/dr_values'][comm_begin.index('f')])})
-                            except (ValueError, IndexError):
-                                pass
-                            try:
-                                h5_info_db.update({'fit_time': float(h5f['/entry/analysis0/dr_values'][comm_begin.index('T')])})
-                            except (ValueError, IndexError):
-                                pass
-                        except (KeyError, AttributeError):
-                            pass
-                    if "measurement" in h5f['/entry/data0']:
-                        try:
-                            mmt = json.loads(h5f['/entry/data0/measurement'][0])
-                            h5_info_db.update(
-                                    {arg: mmt[arg] for arg in ['run_id', 'user', 'rating', 'smt'] if mmt.has_key(arg)}
-                            )
-                        except(AttributeError, KeyError):
-                            pass
+        columns = hdf_columns()
+        self.h5_info_db[uuid] = read_h5_info(uuid, path, columns)
+        self._h5_columns[uuid] = set(columns or ())
+
+    def _reader_pool(self, workers):
+        """ pool reading h5 files, processes unless qkit.cfg['fid_scan_processes'] is False """
+        if qkit.cfg.get('fid_scan_processes', True):
+            # spawn, as forking a kernel with open hdf5 files and threads is not safe
+            return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(workers, thread_name_prefix='qkit_fid_read')
+
+    def extract_columns(self, columns, uuids=None):
+        """
+        Reads the 'columns' (see read_h5_info) of the h5 files, which were not read for them yet.
+        The values are cached in the h5_info_db and the store until a file changes.
+
+        Args:
+            columns: list of column names.
+            uuids: Optional list of uuids, default: all h5 files.
+        Returns:
+            list of the uuids, which were read.
+        """
+        columns = set(columns) - set(PATH_COLUMNS)
+        with self.lock:
+            todo = {}
+            for uuid in (self.h5_db if uuids is None else uuids):
+                done = self._h5_columns.get(uuid, set())
+                if uuid in self.h5_db and '*' not in done and not columns <= done:
+                    todo[uuid] = self.h5_db[uuid]
+        if not todo:
+            return []
+        with self._reader_pool(min(len(todo), qkit.cfg.get('fid_scan_workers', 8))) as pool:
+            results = dict(zip(todo, pool.map(read_h5_info, todo.keys(), todo.values(), [columns] * len(todo))))
+        with self.lock:
+            for uuid, info in results.items():
+                self.h5_info_db.setdefault(uuid, {}).update({k: v for k, v in info.items() if k not in PATH_COLUMNS})
+                self._h5_columns.setdefault(uuid, set()).update(columns)
+            infos = {uuid: self.h5_info_db[uuid] for uuid in results}
+            info_columns = {uuid: self._h5_columns[uuid] for uuid in results}
+        self._store.put_infos(infos, columns=info_columns)
+        return list(results)
+
+    def summarize(self, h5_filename):
+        """
+        Computes the dataset summaries (statistics and thumbnails, see qkit.storage.hdf_summary)
+        of the closed h5 file in the background and keeps them in the store.
+        Called by store.Data.close() with qkit.cfg['fid_summaries'].
+
+        Returns:
+            Future of the summaries (mtime, {ds_url: summary})
+        """
+        if file_system_service._summary_thread is None:
+            file_system_service._summary_thread = ThreadPoolExecutor(1, thread_name_prefix='qkit_fid_summary')
+        uuid = os.path.basename(h5_filename)[:6]
+        return self._summary_thread.submit(self._summarize, uuid, h5_filename)
+
+    def _summarize(self, uuid, h5_filename):
+        result = summarize_h5(h5_filename, qkit.cfg.get('fid_thumbnail_size', 64))
+        if result is not None:
+            with self.lock:
+                # the file is closed, a scan may have seen it while it was written
+                if uuid in self._h5_n_mtime:
+                    self._h5_n_mtime[uuid] = max(self._h5_n_mtime[uuid], result[0])
+            self._store.put_summaries({uuid: result})
+        return result
+
+    def summaries(self, uuids=None):
+        """
+        Returns {uuid: {ds_url: summary}} of the given or of all h5 files from the store,
+        without opening them. Summaries of files changed since they were made are left out,
+        see extract_summaries().
+        """
+        summaries = {}
+        for uuid, (mtime, datasets) in self._store.summaries(uuids).items():
+            if self._h5_n_mtime.get(uuid, mtime) == mtime:
+                summaries[uuid] = datasets
+        return summaries
+
+    def extract_summaries(self, uuids=None):
+        """
+        Computes the missing or outdated summaries of the h5 files in the reader pool.
+
+        Args:
+            uuids: Optional list of uuids, default: all h5 files.
+        Returns:
+            list of the uuids, which were summarized.
+        """
+        done = self.summaries(uuids)
+        with self.lock:
+            todo = {uuid: self.h5_db[uuid] for uuid in (self.h5_db if uuids is None else uuids)
+                    if uuid in self.h5_db and uuid not in done}
+        if not todo:
+            return []
+        size = qkit.cfg.get('fid_thumbnail_size', 64)
+        with self._reader_pool(min(len(todo), qkit.cfg.get('fid_scan_workers', 8))) as pool:
+            results = dict(zip(todo, pool.map(summarize_h5, todo.values(), [size] * len(todo))))
+        results = {uuid: result for uuid, result in results.items() if result is not None}
+        self._store.put_summaries(results)
+        return list(results)
+
+    def start_watcher(self, mode=None):
+        """
+        Keeps the databases current with the changes in the datadir, see file_watcher.py.
+        mode: 'auto', 'inotify' or 'poll', default: qkit.cfg['fid_watch'] or 'auto'.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        if mode in (None, True):
+            mode = qkit.cfg.get('fid_watch', 'auto')
+        if mode in (None, True):
+            mode = 'auto'
+        self._watcher = create_watcher(os.fspath(self._get_datadir()), self._on_files_changed, mode=mode,
+                                       listings=getattr(self, '_h5_dir_cache_db', None),
+                                       interval=qkit.cfg.get('fid_watch_interval', 0.5),
+                                       poll_age=qkit.cfg.get('fid_watch_poll_age', 24 * 3600))
+        logging.info("file info database: Watching {} ({}).".format(self._get_datadir(), self._watcher.mode))
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def _on_files_changed(self, paths):
+        """
+        Called by the watcher with the created, modified or deleted files,
+        or with None if events were lost.
+        """
+        if paths is None:
+            logging.info("file info database: File events were lost, updating the database.")
+            self.update_file_db()
+            self.update_grid_db()
+            return
+        dbs = {'.h5': self.h5_db, 'set': self.set_db, 'ent': self.measure_db}
+        changed, removed, breadcrumbs = set(), [], []
+        new = False
+        for path in sorted(paths):
+            root, fname = os.path.split(path)
+            uuid, suffix = fname[:6], fname[-3:]
+            if os.path.isfile(path):
+                with self.lock:
+                    known = dbs[suffix].get(uuid) == path
                     try:
-                        h5_info_db.update(dict(h5f['/entry/analysis0'].attrs))
-                    except(AttributeError, KeyError):
-                        pass
-                except KeyError as e:
-                    logging.debug("fid could not index file {}, probably it is just new and empty. Original message: {}".format(path,e))
-                except IOError as e:
-                    logging.error("fid {}:{}".format(path,e))
-                finally:
-                    h5f.close()
-
-            self.h5_info_db[uuid] = h5_info_db
-    
+                        self._inspect_and_add_Leaf(fname, root)
+                    except OSError:  # deleted again
+                        continue
+                changed.add(uuid)
+                if not known:
+                    new = True
+                    if suffix == '.h5':
+                        breadcrumbs.append((uuid, path))
+            else:
+                with self.lock:
+                    if dbs[suffix].get(uuid) != path:
+                        continue
+                    del dbs[suffix][uuid]
+                    if suffix == '.h5':
+                        self.h5_info_db.pop(uuid, None)
+                        self._h5_n_mtime.pop(uuid, None)
+                removed.append((uuid, suffix))
+                new = True
+        for uuid in changed:
+            self._store_entries(uuid)
+        self._store.delete_files(removed)
+        if breadcrumbs:
+            self._breadcrumb_creator.append_entries(breadcrumbs)
+        if new:
+            self.update_grid_db()
+
     def add_h5_file(self, h5_filename):
+        if self._watcher is not None and self._watcher.is_alive():
+            return  # the watcher adds the file
         if qkit.cfg['fid_scan_datadir']:
             threading.Timer(20, function=self._add, kwargs={'h5_filename':h5_filename}).start()
         
@@ -277,36 +742,131 @@ class file_system_service(UUID_base):
             if os.path.isfile(h5_filename[:-2] + 'measurement'):
                 logging.debug("Store_db: Adding manually measurement: " + basename + 'measurement')
                 self._inspect_and_add_Leaf(basename + 'measurement', dirname)
+        self._store_entries(uuid)
         self.update_grid_db()
 
 
     def _set_hdf_attribute(self,UUID,attribute,value):
-        h5_filepath = self.h5_db[UUID]
-        h = h5py.File(h5_filepath,'r+')['entry']
+        """
+        Sets the attribute in the analysis0 group of the h5 file, an empty value deletes it.
+        The edit is queued and written by flush_attributes(), right away or at the end of attribute_batch().
+        """
+        if UUID not in self.h5_db:
+            logging.error("file info database: Unknown UUID '{}'.".format(UUID))
+            raise ValueError
+        with self._attr_lock:
+            self._attr_queue.setdefault(UUID, {})[attribute] = value
+            batch = self._attr_batch_depth > 0
+        self.h5_info_db.setdefault(UUID, {}).update({attribute:value})
+        self._h5_columns.setdefault(UUID, set()).add(attribute)
+        if not batch:
+            self.flush_attributes()
+
+    @contextmanager
+    def attribute_batch(self):
+        """
+        Collects the attribute edits made inside the with block and writes them
+        at its end, opening every h5 file once:
+            with qkit.fid.attribute_batch():
+                for uuid in uuids:
+                    qkit.fid.set_rating(uuid, 0)
+        """
+        with self._attr_lock:
+            file_system_service._attr_batch_depth += 1
         try:
-            if not 'analysis0' in h:
-                h.create_group('analysis0')
-            if value=="":
-                if attribute in h['analysis0'].attrs:
-                    del h['analysis0'].attrs[attribute]
-            else:
-                if qkit.module_available['pandas']:
-                    import pandas as pd
-                    if pd.isnull(value):
-                        if attribute in h['analysis0'].attrs:
-                            del h['analysis0'].attrs[attribute]
-                    else:
-                        h['analysis0'].attrs[attribute] = value
-                else:
-                    h['analysis0'].attrs[attribute] = value
+            yield self
         finally:
-            h.file.close()
-        self.h5_info_db[UUID].update({attribute:value})
+            with self._attr_lock:
+                file_system_service._attr_batch_depth -= 1
+                flush = self._attr_batch_depth == 0
+            if flush:
+                self.flush_attributes()
+
+    def pending_attributes(self):
+        """ returns {uuid: {attribute: value}} of the edits waiting for a writer to close its file """
+        with self._attr_lock:
+            return {uuid: dict(attrs) for uuid, attrs in self._attr_queue.items()}
+
+    def flush_attributes(self):
+        """
+        Writes the queued attribute edits, one open/close per h5 file, and updates the store in one transaction.
+
+        Files written by a measurement of this process, in the latest format opened by another
+        writer, or of the old format and modified within cfg['fid_attribute_defer_age'] seconds
+        are not touched. They stay queued and are tried again later.
+
+        Returns:
+            list of the UUIDs still pending
+        """
+        with self._attr_flush_lock:
+            with self._attr_lock:
+                queue = dict(self._attr_queue)
+                self._attr_queue.clear()
+            defer_age = qkit.cfg.get('fid_attribute_defer_age', 60)
+            written, deferred = [], {}
+            for uuid, attributes in queue.items():
+                path = self.h5_db.get(uuid)
+                if path is None or not os.path.isfile(path):
+                    logging.error("file info database: Can not set {} of '{}', the file does not exist.".format(list(attributes), uuid))
+                    continue
+                if _writer_may_be_active(path, defer_age):
+                    deferred[uuid] = attributes
+                    continue
+                try:
+                    write_hdf_attributes(path, attributes)
+                    written.append(uuid)
+                except OSError as e:
+                    logging.debug("file info database: {} is busy: {}".format(path, e))
+                    deferred[uuid] = attributes
+            if written:
+                self._store.put_infos({uuid: self.h5_info_db[uuid] for uuid in written},
+                                      columns={uuid: self._h5_columns[uuid] for uuid in written})
+            with self._attr_lock:
+                for uuid, attributes in deferred.items():
+                    # edits queued in the meantime are newer
+                    attributes.update(self._attr_queue.get(uuid, {}))
+                    self._attr_queue[uuid] = attributes
+                pending = list(self._attr_queue)
+            if deferred:
+                self._schedule_attribute_retry(deferred)
+            else:
+                file_system_service._attr_retry_interval = 0
+            return pending
+
+    def _schedule_attribute_retry(self, deferred):
+        retry_interval = qkit.cfg.get('fid_attribute_retry', 5)
+        if not self._attr_retry_interval:
+            logging.warning("file info database: {} file(s) are written by a measurement, the attributes are set "
+                            "when they are closed ({}).".format(len(deferred), ", ".join(sorted(deferred))))
+            interval = retry_interval
+        else:
+            interval = min(2 * self._attr_retry_interval, max(60, retry_interval))
+        file_system_service._attr_retry_interval = interval
+        with self._attr_lock:
+            if self._attr_retry is not None and self._attr_retry.is_alive() \
+                    and self._attr_retry is not threading.current_thread():
+                return
+            timer = threading.Timer(interval, self.flush_attributes)
+            timer.daemon = True
+            file_system_service._attr_retry = timer
+        timer.start()
+
+    @classmethod
+    def _warn_pending_attributes(cls):
+        if cls._attr_queue:
+            logging.warning("file info database: The attributes of {} could not be written, "
+                            "the files are still open.".format(", ".join(sorted(cls._attr_queue))))
         
+    def _updating(self):
+        return any(t.is_alive() for t in self._update_threads)
+
     def wait(self):
+        """ blocks until the database updates running in the background are done """
+        for t in list(self._update_threads):
+            if t is not threading.current_thread():
+                t.join()
         with self.lock:
             pass
-        qkit.flow.sleep(.1) #to prevent timing issues
-        if self.lock.locked():
-            self.wait()
-        return True
\ No newline at end of file
+        return True
+
+atexit.register(file_system_service._warn_pending_attributes)
@@ -0,0 +1,356 @@
+"""
+Watches the datadir for created, modified and deleted measurement files, so the
+file info database (qkit.fid) stays current without rescanning the datadir.
+
+Two backends are available:
+    inotify: Linux kernel events (through ctypes, no extra package needed). One
+        watch is added per directory, new directories are watched as they appear.
+    poll: checks the mtimes of the directories in regular intervals. This also
+        works on network mounts, where inotify does not see the changes of other
+        machines. Only the top levels of the datadir (RUN_ID/USERNAME) and the
+        directories modified within 'poll_age' seconds are checked.
+With mode 'auto', inotify is used on Linux for local file systems, else polling.
+
+Events are collected and reported in bursts: the callback is called with the set
+of changed filepaths once no further event arrived within 'debounce' seconds,
+or after 'max_delay' seconds at the latest. If events were lost (inotify queue
+overflow), the callback is called with None and the caller has to rescan.
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+SUFFIXES = ('.h5', '.set', '.measurement')
+NETWORK_FS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'afs', '9p', 'fuse.sshfs', 'fuse.gvfsd-fuse', 'davfs')
+
+# inotify constants, see inotify(7)
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CLOSE_WRITE = 0x8
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_CREATE | IN_CLOSE_WRITE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+_EVENT = struct.Struct('iIII')
+
+
+def _relevant(name):
+    return name.endswith(SUFFIXES)
+
+
+def _walk(path):
+    """Yields (dirpath, relevant filenames, subdirs) of path and all its subdirectories."""
+    dirs = [path]
+    while dirs:
+        d = dirs.pop()
+        try:
+            with os.scandir(d) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        files = [e.name for e in entries if _relevant(e.name) and not e.is_dir()]
+        subdirs = [e.name for e in entries if e.is_dir() and not e.is_symlink()]
+        dirs.extend(os.path.join(d, s) for s in subdirs)
+        yield d, files, subdirs
+
+
+def _cached_dirs(root, listings):
+    """Yields the directories below root known from the listings of the fid scan."""
+    dirs = [root]
+    while dirs:
+        d = dirs.pop()
+        listing = listings.get(d)
+        if listing is not None:
+            yield d, listing
+            dirs.extend(os.path.join(d, s) for s in listing[2])
+
+
+def is_network_mount(path):
+    """True if path lies on a network file system (only detected on Linux)."""
+    try:
+        with open('/proc/mounts') as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+    path = os.path.realpath(path)
+    best, fstype = '', None
+    for mountpoint, fs in mounts:
+        mountpoint = mountpoint.replace('\\040', ' ')
+        if (path == mountpoint or path.startswith(mountpoint.rstrip('/') + '/')) and len(mountpoint) > len(best):
+            best, fstype = mountpoint, fs
+    return fstype in NETWORK_FS
+
+
+class FileWatcher(object):
+    """
+    Base class of the watcher backends, runs the watching thread and debounces the events.
+
+    Args:
+        root: directory to watch, including all subdirectories.
+        callback: function called with the set of changed filepaths, or None if events were lost.
+        debounce: seconds without events until the collected events are reported.
+        max_delay: seconds after the first event until the events are reported at the latest.
+    """
+    mode = None
+
+    def __init__(self, root, callback, debounce=0.1, max_delay=0.5):
+        self.root = os.fspath(root)
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._setup()
+        self._thread = threading.Thread(name='qkit_fid_watcher', target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._close()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _setup(self):
+        pass
+
+    def _close(self):
+        pass
+
+    def _read(self, timeout):
+        """Returns the changed filepaths within 'timeout' seconds, None if events were lost."""
+        raise NotImplementedError
+
+    def _run(self):
+        changed, first, lost = set(), None, False
+        while not self._stop.is_set():
+            paths = self._read(self.debounce)
+            now = time.monotonic()
+            if paths is None:
+                lost = True
+            elif paths:
+                changed.update(paths)
+                first = first or now
+            if (changed or lost) and (not paths or now - first >= self.max_delay):
+                try:
+                    self.callback(None if lost else changed)
+                except Exception as e:
+                    logging.error("file watcher: Handling the changes of {} failed: {}".format(self.root, e))
+                changed, first, lost = set(), None, False
+
+
+class InotifyWatcher(FileWatcher):
+    """Watcher using the inotify events of the Linux kernel."""
+    mode = 'inotify'
+
+    def __init__(self, root, callback, listings=None, **kwargs):
+        super().__init__(root, callback, **kwargs)
+        self._listings = listings or {}
+        self._fd = None
+        self._wds = {}
+
+    def _setup(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch_fn = libc.inotify_add_watch
+        self._add_watch_fn.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            dirs = [d for d, listing in _cached_dirs(self.root, self._listings)]
+            if not dirs:
+                dirs = [d for d, files, subdirs in _walk(self.root)]
+            for d in dirs:
+                self._add_watch(d)
+        except OSError:
+            self._close()
+            raise
+
+    def _add_watch(self, path):
+        wd = self._add_watch_fn(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached, see /proc/sys/fs/inotify/max_user_watches")
+            if err != errno.ENOENT:  # the directory is already gone again
+                raise OSError(err, os.strerror(err), path)
+            return
+        self._wds[wd] = path
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _read(self, timeout):
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        buf = os.read(self._fd, 2 ** 16)
+        paths = set()
+        i = 0
+        while i < len(buf):
+            wd, mask, cookie, length = _EVENT.unpack_from(buf, i)
+            name = os.fsdecode(buf[i + _EVENT.size:i + _EVENT.size + length].rstrip(b'\0'))
+            i += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & IN_IGNORED:
+                self._wds.pop(wd, None)
+                continue
+            parent = self._wds.get(wd)
+            if parent is None:
+                continue
+            path = os.path.join(parent, name)
+            if mask & IN_ISDIR:
+                if mask & IN_MOVED_FROM:
+                    # the files moved away are not known here
+                    return None
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # files created before the watch was added are reported, too
+                    for d, files, subdirs in _walk(path):
+                        try:
+                            self._add_watch(d)
+                        except OSError as e:
+                            logging.error("file watcher: Can not watch {}: {}".format(d, e))
+                        paths.update(os.path.join(d, f) for f in files)
+            elif _relevant(name):
+                paths.add(path)
+        return paths
+
+
+class PollingWatcher(FileWatcher):
+    """
+    Watcher comparing the mtimes of the directories and h5 files in regular intervals.
+
+    Args:
+        interval: seconds between two checks.
+        poll_age: directories below the top 'levels' are only checked if they were modified within this many seconds.
+    """
+    mode = 'poll'
+
+    def __init__(self, root, callback, listings=None, interval=0.5, poll_age=24 * 3600, levels=2, **kwargs):
+        super().__init__(root, callback, **kwargs)
+        self.max_delay = 0  # a check is a burst already
+        self.interval = interval
+        self.poll_age = poll_age
+        self.levels = levels
+        self._listings = listings or {}
+        self._dirs = {}  # path -> [mtime, {filename: mtime}, subdirs, level]
+
+    def _setup(self):
+        cached = dict(_cached_dirs(self.root, self._listings))
+        if cached:
+            for d, (mtime, files, subdirs) in cached.items():
+                level = os.path.relpath(d, self.root).count(os.sep) + (d != self.root)
+                self._dirs[d] = [mtime, {f: m for f, m in files.items() if _relevant(f)}, list(subdirs), level]
+        else:
+            self._add_tree(self.root, 0)
+
+    def _add_tree(self, path, level):
+        """Starts to watch path and its subdirectories, returns the filepaths found."""
+        found = set()
+        for d, files, subdirs in _walk(path):
+            try:
+                mtime = os.stat(d).st_mtime
+            except OSError:
+                continue
+            level_d = level + (os.path.relpath(d, path).count(os.sep) + 1 if d != path else 0)
+            self._dirs[d] = [mtime, self._stat_files(d, files), subdirs, level_d]
+            found.update(os.path.join(d, f) for f in files)
+        return found
+
+    @staticmethod
+    def _stat_files(path, files):
+        mtimes = {}
+        for f in files:
+            try:
+                mtimes[f] = os.stat(os.path.join(path, f)).st_mtime if f.endswith('.h5') else None
+            except OSError:
+                pass
+        return mtimes
+
+    def _remove_tree(self, path):
+        """Stops to watch path and its subdirectories, returns the filepaths known there."""
+        gone = set()
+        for d in [d for d in self._dirs if d == path or d.startswith(path + os.sep)]:
+            gone.update(os.path.join(d, f) for f in self._dirs.pop(d)[1])
+        return gone
+
+    def _read(self, timeout):
+        if self._stop.wait(self.interval):
+            return set()
+        now = time.time()
+        paths = set()
+        for d in list(self._dirs):
+            entry = self._dirs.get(d)
+            if entry is None or (entry[3] > self.levels and now - entry[0] > self.poll_age):
+                continue
+            try:
+                mtime = os.stat(d).st_mtime
+            except OSError:
+                paths.update(self._remove_tree(d))
+                continue
+            if mtime != entry[0]:
+                try:
+                    with os.scandir(d) as it:
+                        entries = list(it)
+                except OSError:
+                    continue
+                files = [e.name for e in entries if _relevant(e.name) and not e.is_dir()]
+                subdirs = [e.name for e in entries if e.is_dir() and not e.is_symlink()]
+                for s in set(subdirs) - set(entry[2]):
+                    paths.update(self._add_tree(os.path.join(d, s), entry[3] + 1))
+                for s in set(entry[2]) - set(subdirs):
+                    paths.update(self._remove_tree(os.path.join(d, s)))
+                paths.update(os.path.join(d, f) for f in set(entry[1]) ^ set(files))
+                entry[0], entry[2] = mtime, subdirs
+                entry[1] = {f: entry[1].get(f) for f in files}
+            # h5 files are written in place, without changing the mtime of the directory
+            for f, old in list(entry[1].items()):
+                if f.endswith('.h5'):
+                    new = self._stat_files(d, [f]).get(f)
+                    if new != old:
+                        entry[1][f] = new
+                        paths.add(os.path.join(d, f))
+        return paths
+
+
+def create_watcher(root, callback, mode='auto', listings=None, **kwargs):
+    """
+    Creates and starts a watcher of root.
+
+    Args:
+        root: directory to watch.
+        callback: function called with the set of changed filepaths, or None if events were lost.
+        mode: 'auto', 'inotify' or 'poll'.
+        listings: Optional directory listings {path: (mtime, files, subdirs)} of the fid scan,
+            which saves walking the directory tree at the start.
+        kwargs: passed to the watcher, e.g. debounce or interval.
+    """
+    if mode in (True, 'auto'):
+        mode = 'inotify' if sys.platform.startswith('linux') and not is_network_mount(root) else 'poll'
+    if mode not in ('inotify', 'poll'):
+        logging.error("file watcher: Unknown mode '{}', use 'auto', 'inotify' or 'poll'.".format(mode))
+        raise ValueError
+    if mode == 'inotify':
+        try:
+            return InotifyWatcher(root, callback, listings=listings,
+                                  **{k: v for k, v in kwargs.items() if k in ('debounce', 'max_delay')}).start()
+        except (OSError, AttributeError) as e:
+            logging.warning("file watcher: inotify is not available ({}), polling {} instead.".format(e, root))
+    return PollingWatcher(root, callback, listings=listings, **kwargs).start()
@@ -10,6 +10,10 @@ def seconds_to_str(secs):
     return '%02d:%02d:%02d' % (hours, mins, secs)
 
 def get_ipython():
+    import sys
+    if 'IPython' not in sys.modules:
+        # not running in IPython, avoid the slow import
+        return None
     import IPython
     if ipython_is_newer((0, 11)):
         return IPython.get_ipython()
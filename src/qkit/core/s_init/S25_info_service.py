@@ -4,8 +4,7 @@ from __future__ import print_function
 # HR@KIT/2017
 import qkit
 
-if qkit.cfg.get('load_info_service',True):
-    qkit.cfg['load_info_service']=True
+def _load_info_service():
     try: 
         import zmq
     except ImportError:
@@ -13,7 +12,14 @@ if qkit.cfg.get('load_info_service',True):
         # we handle this exception again in the module
     
     from qkit.core.lib.com.info_service import info_service
-    qkit.info = info_service()
+    return info_service()
+
+if qkit.cfg.get('load_info_service',True):
+    qkit.cfg['load_info_service']=True
+    if 'info' in qkit.cfg.get('lazy_services', qkit.LAZY_SERVICES):
+        qkit.register_lazy_service('info', _load_info_service)
+    else:
+        qkit.info = _load_info_service()
 else:
     # dummy info service
     def info_service(msg): pass
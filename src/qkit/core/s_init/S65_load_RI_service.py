@@ -10,10 +10,13 @@ import logging
 def _load_ri_service():
     logging.info(__file__+": loading remote interface service")
     from qkit.core.lib.com.ri_service import RISThread
-    qkit.ris = RISThread()
+    return RISThread()
 
 if qkit.cfg.get('load_ri_service',False):
     qkit.cfg['load_ri_service']=True
-    _load_ri_service()
+    if 'ris' in qkit.cfg.get('lazy_services', qkit.LAZY_SERVICES):
+        qkit.register_lazy_service('ris', _load_ri_service)
+    else:
+        qkit.ris = _load_ri_service()
 else:
     qkit.cfg['load_ri_service']=False
\ No newline at end of file
@@ -21,37 +21,42 @@ def _load_visa():
         if LooseVersion(get_distribution('pyvisa').version) < LooseVersion("1.5.0"):
             logging.warning("Old pyvisa version loaded. Please update to a version > 1.5.x")
             # compatibility with old visa lib
-            qkit.visa = visa
-            qkit.visa.__version__ = get_distribution('pyvisa').version
-            qkit.visa.qkit_visa_version = 1 #This makes it just much easier to distinguish between the main versions
+            visa_lib = visa
+            visa_lib.__version__ = get_distribution('pyvisa').version
+            visa_lib.qkit_visa_version = 1 #This makes it just much easier to distinguish between the main versions
         else:
             # active py visa version
             logging.info("Modern pyvisa version loaded. Version %s" % visa.__version__)
             try:
                 rm = visa.ResourceManager(qkit.cfg.get('visa_backend',""))
-                qkit.visa = rm
-                qkit.visa.__version__ = visa.__version__
-                qkit.visa.qkit_visa_version = 2
-                qkit.visa.VisaIOError = visa.VisaIOError
+                visa_lib = rm
+                visa_lib.__version__ = visa.__version__
+                visa_lib.qkit_visa_version = 2
+                visa_lib.VisaIOError = visa.VisaIOError
                 
                 def instrument(resource_name, **kwargs):
                     return rm.open_resource(resource_name, **kwargs)
-                qkit.visa.instrument = instrument
+                visa_lib.instrument = instrument
                 # define data types:
-                qkit.visa.double = "d"
-                qkit.visa.single = "f"
-                qkit.visa.dtypes = {1:qkit.visa.single,
-                                    3:qkit.visa.double,
-                                    "d":"d","f":"f"}
+                visa_lib.double = "d"
+                visa_lib.single = "f"
+                visa_lib.dtypes = {1:visa_lib.single,
+                               3:visa_lib.double,
+                               "d":"d","f":"f"}
             except OSError:
                 raise OSError('Failed creating ResourceManager. Check if you have NI VISA or pyvisa-py installed.')
+    return visa_lib
 
 class DummyVisa(object):
     def __getattr__(self,name):
-        raise qkit.QkitCfgError("Please set qkit.cfg['load_visa'] = True if you need visa.")
+        from qkit.config.config_holder import QkitCfgError
+        raise QkitCfgError("Please set qkit.cfg['load_visa'] = True if you need visa.")
 
 if qkit.cfg.get('load_visa',False):
-    _load_visa()
+    if 'visa' in qkit.cfg.get('lazy_services', qkit.LAZY_SERVICES):
+        qkit.register_lazy_service('visa', _load_visa)
+    else:
+        qkit.visa = _load_visa()
 else:
     qkit.visa = DummyVisa()
 
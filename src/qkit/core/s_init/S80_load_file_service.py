@@ -4,13 +4,16 @@
 """
 import qkit
 import logging
-from qkit.core.lib.file_service.file_info_database import fid
 
 
 def _load_file_service():
     logging.info("loading service: file info database (fid)")
-    qkit.fid = fid()
+    from qkit.core.lib.file_service.file_info_database import fid
+    return fid()
     #info: qkit.store_db does not exist anymore: use qkit.fid instead.
 
 if qkit.cfg.get('fid_scan_datadir', True):
-    _load_file_service()
+    if 'fid' in qkit.cfg.get('lazy_services', qkit.LAZY_SERVICES):
+        qkit.register_lazy_service('fid', _load_file_service)
+    else:
+        qkit.fid = _load_file_service()
@@ -5,8 +5,31 @@ import qkit
 import os
 import importlib
 import logging
+from contextlib import contextmanager
 from time import time
 
+# (step, seconds) of the startup modules and of the services created on first use
+timings = []
+
+@contextmanager
+def timed(step):
+    starttime = time()
+    try:
+        yield
+    finally:
+        timings.append((step, time()-starttime))
+        logging.debug("Loading "+str(step)+" took  {:.3f}s.".format(time()-starttime))
+
+def report():
+    """
+    Prints how long each startup module and each service created on first use took.
+    """
+    total = sum(t for step, t in timings)
+    print("QKIT startup timing:")
+    for step, t in timings:
+        print("  {:<40s} {:7.3f}s {:5.1f}%".format(step, t, 100*t/total if total else 0))
+    print("  {:<40s} {:7.3f}s".format("total", total))
+
 def start(silent=False):
     #print('Starting the core of the Qkit framework...')
     initdir_name = 's_init'
@@ -16,12 +39,11 @@ def start(silent=False):
     
     # load all modules starting with a 'S' character
     for module in filelist:
-        starttime = time()
         if not module.startswith('S') or module[-3:] != '.py':
             continue
         if not silent:
             print("Loading module ... "+module)
-        importlib.import_module("."+module[:-3],package='qkit.core.'+initdir_name)
-        logging.debug("Loading module "+str(module)+" took  {:.1f}s.".format(time()-starttime))
-    del module,starttime
-    
\ No newline at end of file
+        with timed(module):
+            importlib.import_module("."+module[:-3],package='qkit.core.'+initdir_name)
+    if qkit.cfg.get('startup_report', False):
+        report()
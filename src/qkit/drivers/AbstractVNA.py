@@ -1,7 +1,83 @@
 from abc import ABC, abstractmethod
+import time
+import qkit
 from qkit.core.instrument_base import Instrument
 import numpy as np
 
+
+class ComplexTrace(object):
+    """
+    A VNA trace as one complex array, read with a single transfer from the device.
+    real and imag are views of the data, amplitude and phase are computed on first access,
+    both in one vectorised step.
+    """
+
+    def __init__(self, data, amp=None, pha=None):
+        self.data = data
+        self._amp = amp
+        self._pha = pha
+
+    @classmethod
+    def from_interleaved(cls, buffer, dtype=np.float32):
+        """
+        Wraps the interleaved (re, im, re, im, ...) floats of 'buffer' (bytes or a contiguous array,
+        e.g. from query_binary_values) without copying them.
+        """
+        values = np.frombuffer(buffer, dtype=dtype)
+        return cls(values.view(np.result_type(values.dtype, np.complex64)))
+
+    @classmethod
+    def from_real_imag(cls, real, imag):
+        return cls(np.asarray(real) + 1j * np.asarray(imag))
+
+    def _polar(self):
+        if self._amp is None or self._pha is None:
+            self._amp, self._pha = np.abs(self.data), np.angle(self.data)
+
+    @property
+    def real(self):
+        return self.data.real
+
+    @property
+    def imag(self):
+        return self.data.imag
+
+    @property
+    def amp(self):
+        self._polar()
+        return self._amp
+
+    @property
+    def pha(self):
+        self._polar()
+        return self._pha
+
+    def __len__(self):
+        return len(self.data)
+
+
+def read_trace(vna):
+    """
+    Reads the current trace of 'vna' as ComplexTrace. Drivers offering get_complex_trace transfer it once,
+    for the others amplitude/phase and real/imag are read separately as before.
+    """
+    if "get_complex_trace" in vna.get_function_names():
+        return vna.get_complex_trace()
+    amp, pha = vna.get_tracedata()
+    real, imag = vna.get_tracedata('RealImag')
+    return ComplexTrace(np.asarray(real) + 1j * np.asarray(imag), amp, pha)
+
+
+def wait_for_completion(vna, step=0.5):
+    """
+    Waits for the measurement started with vna.start_measurement() by the completion event of the driver
+    (see AbstractVNA.wait_for_completion) instead of polling ready(). Every 'step' seconds, qkit.flow.sleep()
+    is called to handle aborts.
+    """
+    while not vna.wait_for_completion(timeout=step):
+        qkit.flow.sleep()
+
+
 class AbstractVNA(ABC):
     """
     This Abstract Base Class defines all the methods required and optionally available for VNA measurements.
@@ -13,11 +89,15 @@ class AbstractVNA(ABC):
         assert isinstance(self, Instrument)
         self.add_function('get_freqpoints')
         self.add_function('get_tracedata')
+        self.add_function('get_complex_trace')
         self.add_function('get_sweeptime')
         self.add_function('get_sweeptime_averages')
         self.add_function('pre_measurement')
         self.add_function('start_measurement')
         self.add_function('ready')
+        if type(self).wait_for_completion is not AbstractVNA.wait_for_completion:
+            # only a real completion event is worth it, otherwise the spectroscopy polls ready() itself
+            self.add_function('wait_for_completion')
         self.add_function('post_measurement')
 
     @abstractmethod
@@ -45,6 +125,14 @@ class AbstractVNA(ABC):
         """
         pass
 
+    def get_complex_trace(self) -> ComplexTrace:
+        """
+        Returns the resulting data as ComplexTrace, with a single transfer from the device.
+        Drivers reading interleaved real/imag data should override this and wrap the received
+        buffer with ComplexTrace.from_interleaved.
+        """
+        return ComplexTrace.from_real_imag(*self.get_tracedata(RealImag=True))
+
     @abstractmethod
     def get_sweeptime(self, query=True):
         """
@@ -84,6 +172,21 @@ class AbstractVNA(ABC):
         """
         pass
 
+    def wait_for_completion(self, timeout=None) -> bool:
+        """
+        Blocks until the measurement started with start_measurement has completed, but at most 'timeout'
+        seconds (None: no limit). Returns True if the measurement has completed.
+        Drivers with a completion event (a blocking *OPC? query, a service request (SRQ) or a future of
+        an asynchronous API) should override this, the default checks ready() every few milliseconds.
+        Only overrides are registered by register_vna_functions, so the measurement scripts use them.
+        """
+        end = None if timeout is None else time.time() + timeout
+        while not self.ready():
+            if end is not None and time.time() >= end:
+                return False
+            time.sleep(0.005)
+        return True
+
     def post_measurement(self):
         """
         Optional hook to execute code after a measurement has completed.
@@ -17,6 +17,8 @@
 
 from qkit.core.instrument_base import Instrument
 import numpy as np
+import threading
+import time
 
 
 class DummyVNA(Instrument):
@@ -28,7 +30,10 @@ class DummyVNA(Instrument):
     No Docstrings. If you don't know what the functions do, you should go into the lab first and measure with a real
     VNA.
     """
-    def __init__(self, name):
+    def __init__(self, name, event_driven=True, latency=0., simulate_sweeps=False):
+        # with simulate_sweeps, a sweep lasts sweeptime_averages seconds, otherwise it is done right away. Each
+        # ready() query takes 'latency' seconds, like a VISA round trip. With event_driven, the end of the sweep is
+        # signalled like a service request of a real VNA.
         Instrument.__init__(self, name, tags=['virtual'])
         self.nop = 1001
         self.startfreq = 4e9
@@ -36,7 +41,11 @@ class DummyVNA(Instrument):
         self.sweeptime_averages = 1
         self.span = self.stopfreq - self.startfreq
         self.centerfreq = (self.startfreq + self.stopfreq) / 2
-        self._ready = False
+        self.latency = latency
+        self.simulate_sweeps = simulate_sweeps
+        self._done = threading.Event()
+        self._done.set()
+        self._sweep = None
         self.add_parameter('power', type=float, minval=-85, maxval=10, units='dBm',offset=True,flags=Instrument.FLAG_GET_AFTER_SET|Instrument.FLAG_GETSET)
         self.add_function('get_freqpoints')
         self.add_function('get_tracedata')
@@ -45,6 +54,8 @@ class DummyVNA(Instrument):
         self.add_function('start_measurement')
         self.add_function('ready')
         self.add_function('post_measurement')
+        if event_driven:
+            self.add_function('wait_for_completion')
         self.power = 0
         
     def do_get_power(self):
@@ -98,6 +109,9 @@ class DummyVNA(Instrument):
     def get_sweeptime_averages(self,query=True):
         return self.sweeptime_averages
 
+    def set_sweeptime_averages(self, sweeptime_averages):
+        self.sweeptime_averages = sweeptime_averages
+
     def get_sweeptime(self,query=True):
         return 1
 
@@ -137,11 +151,21 @@ class DummyVNA(Instrument):
         pass
 
     def start_measurement(self):
-        pass
+        if self._sweep is not None:
+            self._sweep.cancel()
+        if not self.simulate_sweeps:
+            return
+        self._done.clear()
+        self._sweep = threading.Timer(self.sweeptime_averages, self._done.set)
+        self._sweep.daemon = True
+        self._sweep.start()
 
     def ready(self):
-        self._ready = not self._ready
-        return self._ready
+        time.sleep(self.latency)
+        return self._done.is_set()
+
+    def wait_for_completion(self, timeout=None):
+        return self._done.wait(timeout)
 
     def avg_clear(self):
         pass
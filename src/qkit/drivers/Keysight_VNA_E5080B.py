@@ -18,6 +18,7 @@
 
 import qkit
 from qkit.core.instrument_base import Instrument
+from qkit.drivers.AbstractVNA import ComplexTrace
 from qkit import visa
 import logging
 import numpy
@@ -32,13 +33,15 @@ class Keysight_VNA_E5080B(Instrument):
 
     """
 
-    def __init__(self, name, address, channel_index=1):
+    def __init__(self, name, address, channel_index=1, srq=False):
         """
         Initializes
 
         Input:
             name (string)    : name of the instrument
             address (string) : GPIB address
+            srq (bool)       : signal the end of a measurement by a service request, which the spectroscopy
+                               waits for instead of polling ready(). Needs an interface supporting SRQs (GPIB, USB, VXI-11).
         """
         
         logging.info(__name__ + ' : Initializing instrument')
@@ -48,6 +51,7 @@ class Keysight_VNA_E5080B(Instrument):
         self.reconnect()
         self._freqpoints = 0
         self._ci = channel_index 
+        self._srq = srq
         self._pi = 2 # port_index, similar to self._ci
         self._start = 0
         self._stop = 0
@@ -164,6 +168,7 @@ class Keysight_VNA_E5080B(Instrument):
         # Implement functions
         self.add_function('get_freqpoints')
         self.add_function('get_tracedata')
+        self.add_function('get_complex_trace')
         self.add_function('avg_clear')
         self.add_function('avg_status')
         self.add_function('get_hold')
@@ -174,6 +179,8 @@ class Keysight_VNA_E5080B(Instrument):
         self.add_function('start_measurement')
         self.add_function('ready')
         self.add_function('post_measurement')
+        if srq:
+            self.add_function('wait_for_completion')
 
         self.do_set_active_trace(1)
         self.get_all()
@@ -241,29 +248,29 @@ class Keysight_VNA_E5080B(Instrument):
 
             print('Average parameter no longer supported.')
 
-        self._visainstrument.write('FORM:DATA REAL,32')
-        self._visainstrument.write('FORM:BORD SWAPPED') #SWAPPED
-        data = self._visainstrument.query_binary_values('CALC%i:MEAS%i:DATA:SDAT?' %( self._ci,self._active_trace))
-        data_size = numpy.size(data)
-        datareal = numpy.array(data[0:data_size:2])
-        dataimag = numpy.array(data[1:data_size:2])
-          
+        trace = self.get_complex_trace()
         if format == 'RealImag':
-            if self.get_cw():
-                return numpy.mean(datareal), numpy.mean(dataimag)
+            if self.get_cw(query=False):
+                return trace.real[0], trace.imag[0]
             else:
-                return datareal, dataimag
+                return trace.real, trace.imag
         elif format == 'AmpPha':
-            if self.get_cw():
-                datacomplex = [numpy.mean(datareal + 1j*dataimag)]
-                dataamp = numpy.abs(datacomplex)
-                datapha = numpy.angle(datacomplex)
-            else:
-                dataamp = numpy.sqrt(datareal*datareal+dataimag*dataimag)
-                datapha = numpy.arctan2(dataimag, datareal)
-            return dataamp, datapha
+            return trace.amp, trace.pha
         else:
             raise ValueError('get_tracedata(): Format must be AmpPha or RealImag')
+
+    def get_complex_trace(self):
+        """
+        Get the data of the current trace as ComplexTrace, with a single transfer.
+        In cw mode, the trace is averaged to a single point.
+        """
+        self._visainstrument.write('FORM:DATA REAL,32')
+        self._visainstrument.write('FORM:BORD SWAPPED') #SWAPPED
+        data = self._visainstrument.query_binary_values('CALC%i:MEAS%i:DATA:SDAT?' %( self._ci,self._active_trace), container=numpy.array)
+        trace = ComplexTrace.from_interleaved(data, dtype=data.dtype)
+        if self.get_cw(query=False):
+            trace = ComplexTrace(numpy.array([numpy.mean(trace.data)]))
+        return trace
     
     def get_segments(self):
         if self.get_sweep_type(query=False) == "SEGM":
@@ -922,7 +929,34 @@ class Keysight_VNA_E5080B(Instrument):
         Also, the averages need to be reset.
         """
         self.avg_clear()
+        if self._srq:
+            self.write('*CLS')
+            self.write('*ESE 1')  # operation complete sets the event status bit ...
+            self.write('*SRE 32')  # ... which requests service
+            # queue the service request from now on, it may come before wait_for_completion is called
+            from pyvisa import constants
+            self._visainstrument.discard_events(constants.EventType.service_request, constants.EventMechanism.queue)
+            self._visainstrument.enable_event(constants.EventType.service_request, constants.EventMechanism.queue)
         self.set_sweep_mode("group")
+        if self._srq:
+            self.write('*OPC')  # completes after the group of sweeps
+
+    def wait_for_completion(self, timeout=None):
+        """
+        Waits for the service request at the end of the sweeps started with start_measurement, but at most
+        timeout seconds (None: no limit). Only available with srq=True.
+        Returns True if the measurement has completed.
+        """
+        from pyvisa import constants
+        if not self._visainstrument.stb & 0x40:  # no service requested yet
+            try:
+                self._visainstrument.wait_on_event(constants.EventType.service_request,
+                                                   constants.VI_TMO_INFINITE if timeout is None else int(timeout * 1000))
+            except visa.VisaIOError:  # timeout
+                return False
+        self.query('*ESR?')  # clears the event status register and with it the service request
+        self._visainstrument.disable_event(constants.EventType.service_request, constants.EventMechanism.queue)
+        return True
 
     def ready(self):
         """
@@ -1,5 +1,5 @@
 from qkit.core.instrument_basev2 import ModernInstrument, QkitFunction
-from qkit.drivers.AbstractVNA import AbstractVNA
+from qkit.drivers.AbstractVNA import AbstractVNA, ComplexTrace
 from qkit.drivers.ZHInst_SHFSG import ZHInst_SHFSG
 from qkit.drivers.ZHInst_UHFQA import ZHInst_UHFQA
 
@@ -35,7 +35,7 @@ class ZHInst_Virtual_VNAv2(ModernInstrument, AbstractVNA):
         self.amplitude_factor = 1.0
 
         self._frequencies = np.ndarray([], dtype=float)
-        self._i_q_data = np.ndarray([], dtype=float)
+        self._i_q_data = np.ndarray([], dtype=complex)
 
     @QkitFunction
     def configure_frequency_range(self, lower_freq: float, upper_freq: float, steps: int):
@@ -66,11 +66,15 @@ class ZHInst_Virtual_VNAv2(ModernInstrument, AbstractVNA):
 
     @QkitFunction
     def get_tracedata(self, RealImag = None) -> tuple((np.ndarray, np.ndarray)):
+        trace = self.get_complex_trace()
         if not RealImag:
-            signal = (self._i_q_data[:, 0] + 1.0j * self._i_q_data[:, 1])
-            return np.abs(signal), np.angle(signal)
+            return trace.amp, trace.pha
         else:
-            return self._i_q_data[:, 0], self._i_q_data[:, 1]
+            return trace.real, trace.imag
+
+    @QkitFunction
+    def get_complex_trace(self) -> ComplexTrace:
+        return ComplexTrace(self._i_q_data)
 
     @QkitFunction
     def _get_shfsg_frequencies(self) -> tuple((float, float)):
@@ -114,7 +118,7 @@ class ZHInst_Virtual_VNAv2(ModernInstrument, AbstractVNA):
         self.uhfqa.nodetree.sigouts[1].on(1)
         self.uhfqa.nodetree.awg.outputs[1].amplitude(-1.0)
 
-        self._i_q_data = np.zeros(shape=(len(self.get_freqpoints()), 2), dtype=complex)
+        self._i_q_data = np.zeros(len(self.get_freqpoints()), dtype=complex)
 
     @QkitFunction
     def start_measurement(self):
@@ -131,6 +135,8 @@ class ZHInst_Virtual_VNAv2(ModernInstrument, AbstractVNA):
         self.uhfqa.arm(length=self.repetitions, averages=1)
 
         uhfqa_frequencies = self.get_freqpoints() - (self.get_freqpoints()[0] - MINIMUM_UHFQA_FREQUENCY)
+        # a new buffer for every sweep, the traces handed out by get_complex_trace stay valid
+        self._i_q_data = np.zeros(len(uhfqa_frequencies), dtype=complex)
 
         for i, f in enumerate(uhfqa_frequencies):
             self.uhfqa.nodetree.osc.freq(f)  # set modulation frequency
@@ -141,7 +147,7 @@ class ZHInst_Virtual_VNAv2(ModernInstrument, AbstractVNA):
             data = self.uhfqa.get_qubit_result()
             i_avg_result = np.mean(data[0]) # average the result vector
             q_avg_result = np.mean(data[1])
-            self._i_q_data[i, :] = [i_avg_result, q_avg_result]         # append to results
+            self._i_q_data[i] = i_avg_result + 1.0j * q_avg_result  # append to results
 
     @QkitFunction
     def ready(self) -> bool:
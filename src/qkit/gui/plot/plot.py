@@ -8,25 +8,19 @@ import json
 logging.basicConfig(level=logging.INFO)
 
 import qkit
-from qkit.storage import store
+from qkit.storage import store, hdf_pyramid
+from qkit.gui.plot import plot_service
 from qkit.storage.hdf_constants import ds_types
+from qkit.storage.hdf_extent import valid_view
 from qkit.core.lib.misc import str3,concat
 import sys
 
+# matplotlib is imported by h5plot only, which runs in the plot workers
 try:
-    if qkit.module_available("matplotlib"):
-        import matplotlib.pyplot as plt
-        from matplotlib.figure import Figure
-        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-        plot_enable = True
+    plot_enable = qkit.module_available("matplotlib")
 except AttributeError:
-    try:
-        import matplotlib.pyplot as plt
-        from matplotlib.figure import Figure
-        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-        plot_enable = True
-    except ImportError:
-        plot_enable = False
+    from importlib.util import find_spec
+    plot_enable = find_spec("matplotlib") is not None
 
 # this is for live-plots
 def plot(h5_filepath, datasets=[], refresh = 2, live = True, echo = False):
@@ -102,6 +96,27 @@ def save_plots(h5_filepath, comment='', save_pdf=False):
     h5plot(h5_filepath, comment=comment, save_pdf=save_pdf)
 
 
+def save_plots_background(h5_filepath, comment='', save_pdf=False, callback=None):
+    """
+    Queues save_plots() in the background plot service.
+
+    The plots are rendered by a persistent pool of worker processes (see
+    qkit.gui.plot.plot_service), so the measurement kernel is not blocked.
+    The file should be closed by the writer before.
+
+    Args:
+        h5_filepath: String, absolute filepath.
+        comment: Optional comment for the plots to be added to the filenames.
+            default : ''
+        save_pdf: Optional boolean setting for the output file type.
+            default: False
+        callback: Optional function called with the job's future when done.
+    Return:
+        concurrent.futures.Future of the job.
+    """
+    return plot_service.get_service().submit(h5_filepath, comment=comment, save_pdf=save_pdf, callback=callback)
+
+
 class h5plot(object):
     """
     h5plot class plots and saves all dataset in the h5 file.
@@ -143,7 +158,7 @@ class h5plot(object):
                 try:
                     # Use weird instance variable for argument passing, because reasons...
                     self.key = entry.name
-                    self.ds = entry
+                    self.ds = valid_view(entry)
                     self.plt()
                 except Exception as e:
                     print("Exception in qkit/gui/plot/plot.py while plotting")
@@ -175,6 +190,8 @@ class h5plot(object):
         self.y_ds_url = self.ds.attrs.get('y_ds_url','')
         self.z_ds_url = self.ds.attrs.get('z_ds_url','')
 
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
         self.fig = Figure(figsize=(20,10),tight_layout=True)
         self.ax = self.fig.gca()
         self.canvas = FigureCanvas(self.fig)
@@ -241,7 +258,7 @@ class h5plot(object):
         self.y_exp = self._get_exp(self.y_data)
         self.y_label = concat(self.ds.attrs.get('name','_name_'),' (',self._unit_prefixes[self.y_exp],self.ds.attrs.get('unit','_unit_'),')')
         try:
-            self.x_data = self.hf[self.x_ds_url]
+            self.x_data = valid_view(self.hf[self.x_ds_url])
             self.x_exp = self._get_exp(np.array(self.x_data))
             self.x_label = concat(self.x_data.attrs.get('name','_xname_'),' (', self._unit_prefixes[self.x_exp],self.x_data.attrs.get('unit','_xunit_'),')')
         except Exception:
@@ -268,13 +285,13 @@ class h5plot(object):
             No return variable. The function operates on the self- matplotlib 
             objects.
         """
-        self.x_ds = self.hf[self.x_ds_url]
+        self.x_ds = valid_view(self.hf[self.x_ds_url])
         self.x_exp = self._get_exp(np.array(self.x_ds))
         self.x_label = concat(self.x_ds.attrs.get('name', '_xname_'),' (',self._unit_prefixes[self.x_exp],self.x_ds.attrs.get('unit','_xunit_'),')')
-        self.y_ds = self.hf[self.y_ds_url]
+        self.y_ds = valid_view(self.hf[self.y_ds_url])
         self.y_exp = self._get_exp(np.array(self.y_ds))
         self.y_label = concat(self.y_ds.attrs.get('name', '_yname_'),' (', self._unit_prefixes[self.y_exp] ,self.y_ds.attrs.get('unit','_yunit_'),')')
-        self.ds_data = np.array(self.ds).T #transpose matrix to get x/y axis correct
+        self.ds_data = self._read_2D((slice(None), slice(None))).T #transpose matrix to get x/y axis correct
         self.ds_exp = self._get_exp(self.ds_data)
         self.ds_data *= 10.**-self.ds_exp
         self.ds_label = concat(self.ds.attrs.get('name', '_name_'),' (',self._unit_prefixes[self.ds_exp],self.ds.attrs.get('unit', '_unit_'),')')
@@ -321,16 +338,16 @@ class h5plot(object):
             No return variable. The function operates on the self- matplotlib
             objects.
         """
-        self.x_ds = self.hf[self.x_ds_url]
+        self.x_ds = valid_view(self.hf[self.x_ds_url])
         self.x_exp = self._get_exp(np.array(self.x_ds))
         self.x_label = concat(self.x_ds.attrs.get('name', '_xname_'),' (',self._unit_prefixes[self.x_exp],self.x_ds.attrs.get('unit','_xunit_'),')')
-        self.y_ds = self.hf[self.y_ds_url]
+        self.y_ds = valid_view(self.hf[self.y_ds_url])
         self.y_exp = self._get_exp(np.array(self.y_ds))
         self.y_label = concat(self.y_ds.attrs.get('name', '_yname_'),' (',self._unit_prefixes[self.y_exp],self.y_ds.attrs.get('unit', '_yunit_'),')')
-        self.z_ds = self.hf[self.z_ds_url]
+        self.z_ds = valid_view(self.hf[self.z_ds_url])
         self.z_exp = self._get_exp(np.array(self.z_ds))
         self.z_label = concat(self.z_ds.attrs.get('name', '_zname_'),' (',self._unit_prefixes[self.z_exp],self.z_ds.attrs.get('unit','_zunit_'), ')')
-        self.ds_data = np.array(self.ds)[:, :, self.ds.shape[2] // 2].T  # transpose matrix to get x/y axis correct
+        self.ds_data = self._read_2D((slice(None), slice(None), self.ds.shape[2] // 2)).T  # transpose matrix to get x/y axis correct
         self.ds_exp = self._get_exp(self.ds_data)
         self.ds_data *= 10.**-self.ds_exp
         self.ds_label = concat(self.ds.attrs.get('name', '_name_'),' (',self._unit_prefixes[self.ds_exp],self.ds.attrs.get('unit','_unit_'),')')
@@ -366,6 +383,31 @@ class h5plot(object):
         for i in self.cbar.ax.get_yticklabels():
             i.set_fontsize(16)
 
+    def _read_2D(self, key):
+        """
+        Reads the 2d selection 'key' of the dataset. Large datasets are read
+        from their pyramid level matching the figure size (see
+        qkit.storage.hdf_pyramid), which is built first if qkit.cfg['hdf_pyramid']
+        is set. If the pyramid can not be built or read, the full data is read.
+
+        Args:
+            self: Object of the h5plot class.
+            key: Tuple with an integer or slice(None) per axis, two slices.
+        Returns:
+            Numpy array with the data.
+        """
+        try:
+            if qkit.cfg.get('hdf_pyramid', False) and hdf_pyramid.level_steps(self.ds.shape) and not hdf_pyramid.has_pyramid(self.ds):
+                hdf_pyramid.build_pyramid(self.ds)
+            level = hdf_pyramid.read_level(self.ds, key, tuple(self.fig.get_size_inches() * self.fig.dpi))
+        except Exception as e:
+            # e.g. the pyramid file is locked by qviewkit building it at the same time
+            logging.warning("Could not use the pyramid of %s, reading the full data: %s" % (self.ds.name, e))
+            level = None
+        if level is None:
+            return np.array(self.ds[key])
+        return level[0]
+
     def plt_coord(self):
         # not (yet?) implemented. we'll see ...
         pass
@@ -408,12 +450,12 @@ class h5plot(object):
         self.ds_ys = []
         self.ds_errs = []
         for xy in overlay_urls:
-            self.ds_xs.append(self.hf[xy[0]])
-            self.ds_ys.append(self.hf[xy[1]])
+            self.ds_xs.append(valid_view(self.hf[xy[0]]))
+            self.ds_ys.append(valid_view(self.hf[xy[1]]))
             
         for err_url in err_urls:
             try:
-                self.ds_errs.append(self.hf[err_url])
+                self.ds_errs.append(valid_view(self.hf[err_url]))
             except:
                 self.ds_errs.append(0)
         
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Background rendering of the measurement plots (save_plots).
+
+Instead of starting a thread with save_plots for every measurement, which
+renders all datasets with matplotlib inside the measurement kernel, plot jobs
+are queued in a persistent pool of worker processes. Jobs for a file already
+waiting or being rendered are not queued again. Nothing is queued if
+qkit.cfg['save_png'] is False. If a worker process dies (e.g. killed when out
+of memory), the pool is replaced by a new one.
+
+Used qkit.cfg entries:
+    plot_workers (int): number of workers, default: 2
+    plot_processes (bool): render in worker processes (default: True) or,
+        if False, in worker threads of the measurement kernel.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import qkit
+
+# qkit.cfg entries needed by h5plot, passed to the worker processes
+_CFG_KEYS = ('save_png', 'hdf_pyramid', 'hdf_pyramid_min_size')
+
+
+def _render(h5_filepath, comment, save_pdf, cfg):
+    """Job function: renders all plots of a file, runs in the worker."""
+    qkit.cfg.update(cfg)
+    from qkit.gui.plot.plot import h5plot
+    h5plot(h5_filepath, comment=comment, save_pdf=save_pdf)
+    return h5_filepath
+
+
+class PlotService(object):
+    """Pool of plot workers with a deduplicating job queue.
+
+    Args:
+        workers: number of workers, default: qkit.cfg['plot_workers'] or 2.
+        processes: use worker processes instead of threads, default: qkit.cfg['plot_processes'] or True.
+    """
+
+    def __init__(self, workers=None, processes=None):
+        self.workers = workers if workers is not None else qkit.cfg.get('plot_workers', 2)
+        self.processes = processes if processes is not None else qkit.cfg.get('plot_processes', True)
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.processes:
+                # spawn, as forking the measurement kernel with open hdf5 files and threads is not safe
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='qkit_plots')
+        return self._executor
+
+    def submit(self, h5_filepath, comment='', save_pdf=False, callback=None):
+        """Queues the rendering of all plots of the file 'h5_filepath'.
+
+        If the same job is already waiting or running, it is not queued again.
+        With qkit.cfg['save_png'] False, nothing is rendered and a done future is returned.
+
+        Args:
+            h5_filepath: String, absolute filepath.
+            comment: Optional comment for the plots to be added to the filenames.
+            save_pdf: Optional boolean setting for the output file type.
+            callback: Optional function called with the future once the job is done.
+        Returns:
+            concurrent.futures.Future of the job; its result is the filepath.
+        """
+        key = (os.path.abspath(h5_filepath), comment, save_pdf)
+        if not qkit.cfg.get('save_png', True):
+            future = Future()
+            future.set_result(key[0])
+            if callback is not None:
+                callback(future)
+            return future
+        with self._lock:
+            future = self._jobs.get(key)
+            new = future is None or future.done()
+            if new:
+                cfg = {k: qkit.cfg[k] for k in _CFG_KEYS if k in qkit.cfg}
+                try:
+                    future = self._get_executor().submit(_render, key[0], comment, save_pdf, cfg)
+                except BrokenProcessPool:
+                    logging.warning("Plot service: A worker died, starting new workers.")
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+                    future = self._get_executor().submit(_render, key[0], comment, save_pdf, cfg)
+                self._jobs[key] = future
+        if new:
+            # outside the lock, the callback runs immediately if the job is already done
+            future.add_done_callback(lambda f: self._done(key, f))
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def _done(self, key, future):
+        with self._lock:
+            if self._jobs.get(key) is future:
+                del self._jobs[key]
+        if future.cancelled():
+            return
+        e = future.exception()
+        if e is not None:
+            logging.error("Plot service: Could not save plots of '%s': %s" % (key[0], e))
+        else:
+            logging.info("Plot service: Plots of '%s' saved." % key[0])
+
+    def pending(self):
+        """Returns the filepaths of all jobs waiting or running."""
+        with self._lock:
+            return [key[0] for key in self._jobs]
+
+    def shutdown(self, wait=True):
+        """Stops the workers, with 'wait' after all queued jobs are done."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_service = None
+
+
+def get_service():
+    """Returns the PlotService of this kernel, which is started on first use."""
+    global _service
+    if _service is None:
+        _service = PlotService()
+    return _service
@@ -74,10 +74,9 @@ def breadcrumb_search(directory: Path, target_uuid: str, max_bruteforce_depth: i
     Search based on breadcrumbs. Each backed-up computer creates a local index of known UUIDs. Applies to old
     files only in a limited fashion.
     """
-    local_known_uuids = breadcrumbs.read_breadcrumbs(directory)
-    if len(local_known_uuids.keys()) != 0:  # This is an indexed data_dir
-        if target_uuid in local_known_uuids:
-            path = local_known_uuids[target_uuid]
+    if breadcrumbs.has_breadcrumbs(directory):  # This is an indexed data_dir
+        path = breadcrumbs.lookup_breadcrumbs(directory, target_uuid)
+        if path is not None:
             return str(path)  # We found the file, return it.
         else:
             return None  # We do not expect any results below this point.
@@ -31,6 +31,7 @@ if not in_pyqt5:
 
 import h5py
 from qkit.gui.qviewkit.main_view import Ui_MainWindow
+from qkit.storage.hdf_file import file_kwargs
 from qkit.core.lib.misc import  str3
 
 class DatasetsWindow(QMainWindow, Ui_MainWindow):
@@ -66,6 +67,10 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
         self.refreshTime_value = 2000
         self.tree_refresh  = True
         self._force_live_plot = False
+        self.h5file = None
+        self._h5file_path = None
+        # (file handle, dataset paths) of the last tree walk, see populate_data_list()
+        self._tree_cache = None
         self._setup_signal_slots()        
         self.setup_timer()
         self.set_cmd_options()
@@ -73,7 +78,7 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
         
     def setup_timer(self):
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update_file)
+        self.timer.timeout.connect(self.update_changed)
         self.timer.timeout.connect(self.live_update_onoff)
             
     def set_cmd_options(self):
@@ -120,6 +125,7 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
 
         self.DATA._remove_plot_widgets( closeAll = True)
         self.DATA.set_info_thread_continue(False)
+        self._close_h5file()
         event.accept()
     
     @pyqtSlot()
@@ -144,7 +150,7 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
     def _refresh_time_handler(self,refreshTime):
         self.refreshTime_value = refreshTime*1000 # ms -> s
 
-    def _visit_h5_leaf(self, gui_tree_parent, current_entry: h5py.Dataset):
+    def _visit_h5_leaf(self, gui_tree_parent, current_entry: h5py.Dataset, changed: set):
         # Leaf node.
         path = current_entry.name
         leaf_name = path.split("/")[-1]
@@ -171,9 +177,12 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
         except ValueError as e:
             print("catch: populate data list:", e)
 
+        # shape and attributes are all in the info text
+        if self.DATA.dataset_info.get(path) != s:
+            changed.add(path)
         self.DATA.dataset_info[path] = s
 
-    def _visit_h5_group(self, gui_tree_parent, current_entry: h5py.Group, depth: int):
+    def _visit_h5_group(self, gui_tree_parent, current_entry: h5py.Group, depth: int, changed: set, leaves: list):
         path = current_entry.name
         group_name = path.split("/")[-1]
         if group_name == "entry" and depth == -1:
@@ -192,19 +201,40 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
         for index, subpath in enumerate(current_entry.keys()):
             child_entry = current_entry[subpath]
             if isinstance(child_entry, h5py.Dataset):
-                self._visit_h5_leaf(parent, child_entry)
+                if self.h5file.swmr_mode:
+                    child_entry.refresh()
+                self._visit_h5_leaf(parent, child_entry, changed)
+                leaves.append(child_entry.name)
             elif isinstance(child_entry, h5py.Group):
-                self._visit_h5_group(parent, child_entry, depth=depth + 1)
+                self._visit_h5_group(parent, child_entry, depth=depth + 1, changed=changed, leaves=leaves)
 
 
     def populate_data_list(self):
         """
         populate_data_list is called regularly withing the refresh cycle to
         update the data tree.
+
+        While the file handle is kept open (SWMR), no datasets can be added,
+        so the tree is only walked once and afterwards just the known
+        datasets are refreshed.
+
+        Returns:
+            Set of the paths of all datasets whose shape or attributes changed
+            since the last call (or which are new).
         """
+        changed = set()
+        if self._tree_cache is not None and self._tree_cache[0] is self.h5file:
+            for path in self._tree_cache[1]:
+                entry = self.h5file[path]
+                entry.refresh()
+                self._visit_h5_leaf(None, entry, changed)
+            return changed
         self.parent = self.treeWidget.invisibleRootItem()
         root_entry = self.h5file["entry"]
-        self._visit_h5_group(self.parent, root_entry, depth=-1)
+        leaves = []
+        self._visit_h5_group(self.parent, root_entry, depth=-1, changed=changed, leaves=leaves)
+        self._tree_cache = (self.h5file, leaves)
+        return changed
                
     def addParent(self, parent, column, title,data = ''):
         item = QtGui.QTreeWidgetItem(parent, [title])
@@ -255,41 +285,65 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
         self.Dataset_properties.clear()
         self.Dataset_properties.insertPlainText(self.DATA.dataset_info[ds])
 
-    def _read_file_and_update_content(self, handle_update=False, crash_reload=True):
+    def _open_h5file(self):
+        """Returns an open handle of the data file.
+
+        Files written in SWMR mode (see H5_file.start_swmr) are opened once as
+        SWMR reader and kept open, the datasets are refreshed on every update.
+        All other files are opened for each update, so new datasets of a
+        writer are found.
+        """
+        if self.h5file and self._h5file_path == self.DATA.DataFilePath:
+            return self.h5file
+        self._close_h5file()
+        try:
+            self.h5file = h5py.File(str(self.DATA.DataFilePath), mode='r', swmr=True, **file_kwargs)
+        except (IOError, ValueError):
+            # files written with HDF5 < 1.10
+            self.h5file = h5py.File(str(self.DATA.DataFilePath), mode='r', **file_kwargs)
+        self._h5file_path = self.DATA.DataFilePath
+        return self.h5file
+
+    def _keep_h5file_open(self):
+        "The handle can be kept if the writer is in SWMR mode, then no new datasets appear."
+        return self.h5file.swmr_mode and bool(self.h5file['entry'].attrs.get('swmr', False))
+
+    def _close_h5file(self):
+        if self.h5file:
+            self.h5file.close()
+        self.h5file = None
+        self._h5file_path = None
+        self._tree_cache = None
+
+    def _read_file_and_update_content(self, handle_update=False, only_changed=False):
         """
         Shared logic to read the h5 file and update the content of the tree.
         If handle_update is True, the update-specific part is run.
-        If crash_reload is True, the h5 file is reloaded if it crashes. This used to prevent infinite recursion.
+        If only_changed is True, only plots of datasets that changed are updated.
         """
+        keep_open = False
         try:
             # Try to read the file and populate data. This can go wrong if we are writing at the same time.
-            self.h5file = h5py.File(str(self.DATA.DataFilePath), mode='r')
+            self._open_h5file()
             self.DATA.filename = self.h5file.filename.split(os.path.sep)[-1]
-            self.populate_data_list()
+            changed = self.populate_data_list()
 
             if handle_update:
                 # If we're called in the update routing, update plots and configure signals.
-                self.update_plots()
+                if only_changed:
+                    self.update_plots(changed)
+                else:
+                    self.update_plots()
                 self._disable_live_update()
+            keep_open = self._keep_h5file_open()
 
         except IOError as ioe:
             print(ioe)
-            # Step 1: Get rid of the old file handle, if it exists.
-            if crash_reload:
-                print("Potential h5py crash, reloading.")
-                if self.h5file:
-                    self.h5file.close()
-                    self.h5file = None
-                # Step 2: Reload h5py to clear the internal state of the C library.
-                from importlib import reload
-                reload(h5py)
-                # Step 3: Try all of the above again but prevent infinite loops.
-                self._read_file_and_update_content(handle_update=handle_update, crash_reload=False)
         finally:
             # Common cleanup logic.
-            if self.h5file:
-                # If the file exists, close it.
-                self.h5file.close()
+            if not keep_open:
+                # reopened on the next update
+                self._close_h5file()
 
             # Use the file path data to update the title.
             s = (self.DATA.DataFilePath.split(os.path.sep)[-5:])
@@ -298,12 +352,14 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
             title = "Qviewkit: %s" % (self.DATA.DataFilePath.split(os.path.sep)[-1:][0][:6])
             self.setWindowTitle(title)
 
-
-
     def update_file(self):
-        "update_file is regularly called when _something_ has to be updated. open-> do something->close"
+        "update_file is called when _something_ has to be updated. open-> do something->close (unless SWMR)"
         self._read_file_and_update_content(handle_update=True)
 
+    def update_changed(self):
+        "update_changed is regularly called by the timer, it only updates plots of datasets that changed."
+        self._read_file_and_update_content(handle_update=True, only_changed=True)
+
     def open_file(self):
         if in_pyqt5:
             _DataFilePath=str(QFileDialog.getOpenFileName(filter="*.h5")[0])
@@ -314,5 +370,12 @@ class DatasetsWindow(QMainWindow, Ui_MainWindow):
             self.DATA.DataFilePath = _DataFilePath
             self._read_file_and_update_content(handle_update=False)
             
-    def update_plots(self):
-        self.refresh_signal.emit()
\ No newline at end of file
+    def update_plots(self, changed=None):
+        """Updates all plots or, if a set of 'changed' dataset paths is given,
+        only the plots displaying one of them."""
+        if changed is None:
+            self.refresh_signal.emit()
+            return
+        for window in list(self.DATA.open_plots.values()):
+            if window.dataset_urls() & changed:
+                window.update_plots()
\ No newline at end of file
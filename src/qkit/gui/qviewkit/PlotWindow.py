@@ -31,6 +31,7 @@ import numpy as np
 import qkit
 from qkit.gui.qviewkit.plot_view import Ui_Form
 from qkit.storage.hdf_constants import ds_types, view_types
+from qkit.storage.hdf_extent import valid_view
 from qkit.gui.qviewkit.PlotWindow_lib import _display_1D_view, _display_1D_data, _display_2D_data, _display_table, _display_text
 from qkit.gui.qviewkit.PlotWindow_lib import _get_ds, _get_ds_url, _get_name, _get_unit
 from qkit.core.lib.misc import str3
@@ -73,6 +74,29 @@ class PlotWindow(QWidget,Ui_Form):
         "connect update_plots to the DatasetWindow"
         self.obj_parent.refresh_signal.connect(self.update_plots)
 
+    def dataset_urls(self):
+        """Returns the set of urls of all datasets this window displays.
+
+        These are the dataset itself, its x/y/z coordinates and for views the
+        datasets of all overlays together with their coordinates. The
+        DatasetsWindow only updates the window if one of them changed.
+        """
+        urls = set()
+        todo = [self.dataset_url]
+        while todo:
+            url = todo.pop()
+            if url in urls:
+                continue
+            urls.add(url)
+            try:
+                attrs = self.obj_parent.h5file[url].attrs
+            except (KeyError, ValueError, TypeError):
+                continue
+            for key, value in attrs.items():
+                if key.endswith('_ds_url') or key.startswith('xy_'):
+                    todo += [u for u in str3(value).split(':') if u.startswith('/')]
+        return urls
+
     def closeEvent(self, event):
         "overwrite the closeEvent handler"
         self.DATA._toBe_deleted(self.dataset_url)
@@ -97,7 +121,7 @@ class PlotWindow(QWidget,Ui_Form):
         #print "PWL update_plots:", self.obj_parent.h5file
         
         try:
-            self.ds = self.obj_parent.h5file[self.dataset_url]
+            self.ds = valid_view(self.obj_parent.h5file[self.dataset_url])
         except ValueError as e:
             print(str(self.dataset_url)+": "+str(e))
             return
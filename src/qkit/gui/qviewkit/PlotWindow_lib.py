@@ -31,9 +31,13 @@ if not in_pyqt5:
 
 import numpy as np
 import json
+import logging
+import threading
 import pyqtgraph as pg
 import qkit
+from qkit.storage import hdf_pyramid
 from qkit.storage.hdf_constants import ds_types
+from qkit.storage.hdf_extent import valid_view
 import pprint
 from qkit.core.lib.misc import str3
 
@@ -124,9 +128,9 @@ def _display_1D_view(self, graphicsView):
                         self.VTraceYSelector.setEnabled(False)
                         
                         x_data = dss[0][()]
-                        y_data = dss[1][()][self.VTraceXNum]
+                        y_data = dss[1][self.VTraceXNum]
                         if err_url:
-                            err_data = dss[2][()][self.VTraceXNum]
+                            err_data = dss[2][self.VTraceXNum]
                     x_data_len = len(x_data)
                     y_data_len = len(y_data)
                     if x_data_len != y_data_len:
@@ -146,9 +150,9 @@ def _display_1D_view(self, graphicsView):
                     self.VTraceYValue.setText(self._getYValueFromTraceNum(dss[1], self.VTraceYNum))
                     
                     x_data = dss[0][()]
-                    y_data = dss[1][()][self.VTraceXNum, self.VTraceYNum, :]
+                    y_data = dss[1][self.VTraceXNum, self.VTraceYNum, :]
                     if err_url:
-                        err_data = dss[2][()][self.VTraceXNum, self.VTraceYNum, :]
+                        err_data = dss[2][self.VTraceXNum, self.VTraceYNum, :]
             
             ## This is in our case used so far only for IQ plots. The
             ## functionality derives from this application.
@@ -159,8 +163,8 @@ def _display_1D_view(self, graphicsView):
                 self.VTraceXValue.setText(self._getXValueFromTraceNum(dss[1], self.VTraceXNum))
                 self.VTraceYSelector.setEnabled(False)
                 
-                x_data = dss[0][()][self.VTraceXNum]
-                y_data = dss[1][()][self.VTraceXNum]
+                x_data = dss[0][self.VTraceXNum]
+                y_data = dss[1][self.VTraceXNum]
             
             elif x_ds_type == ds_types['box']:
                 self.VTraceXSelector.setEnabled(True)
@@ -172,8 +176,8 @@ def _display_1D_view(self, graphicsView):
                 self.VTraceYSelector.setRange(-1 * range_maxY, range_maxY - 1)
                 self.VTraceYValue.setText(self._getYValueFromTraceNum(dss[1], self.VTraceYNum))
                 
-                x_data = dss[0][()][self.VTraceXNum, self.VTraceYNum, :]
-                y_data = dss[1][()][self.VTraceXNum, self.VTraceYNum, :]
+                x_data = dss[0][self.VTraceXNum, self.VTraceYNum, :]
+                y_data = dss[1][self.VTraceXNum, self.VTraceYNum, :]
             
             else:
                 return
@@ -275,7 +279,7 @@ def _display_1D_data(self, graphicsView):
         # timestamps do (not?) have a x_ds_url in the 1d case. This is more a bug to be fixed in the
         # timstamp_ds part of qkit the resulting error is fixed here for now.
         try:
-            x_data = dss[0][()][:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if necessarry
+            x_data = dss[0][:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if necessarry
         except:
             x_data = [i for i in range(dss[1].shape[-1])]
             units[0] = "#"
@@ -314,8 +318,8 @@ def _display_1D_data(self, graphicsView):
                 self.TraceXSelector.setValue(self.TraceXNum)
                 self.TraceXValueChanged = False
             
-            y_data = dss[1][()][self.TraceXNum]
-            x_data = dss[0][()][:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if neccessary
+            y_data = dss[1][self.TraceXNum]
+            x_data = dss[0][:dss[1].shape[-1]]  # x_data gets truncated to y_data shape if neccessary
         
         if self.PlotTypeSelector.currentIndex() == 2:  # x_ds on x-axis
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['x_ds_url'])
@@ -333,8 +337,8 @@ def _display_1D_data(self, graphicsView):
                 self.TraceYSelector.setValue(self.TraceYNum)
                 self.TraceYValueChanged = False
             
-            y_data = dss[1][()][:, self.TraceYNum]
-            x_data = dss[0][()][:dss[1].shape[0]]  # x_data gets truncated to y_data shape if neccessary
+            y_data = _read_growing(self, dss[1], (self.TraceYNum,))
+            x_data = dss[0][:dss[1].shape[0]]  # x_data gets truncated to y_data shape if neccessary
         
         self.TraceXValue.setText(self._getXValueFromTraceNum(self.ds, self.TraceXNum))
         self.TraceYValue.setText(self._getYValueFromTraceNum(self.ds, self.TraceYNum))
@@ -391,16 +395,16 @@ def _display_1D_data(self, graphicsView):
 
         if self.PlotTypeSelector.currentIndex() == 5:
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['z_ds_url'])
-            x_data = dss[0][()][:dss[1].shape[2]]  # x_data gets truncated to y_data shape if neccessary
-            y_data = dss[1][()][self.TraceXNum, self.TraceYNum, :]
+            x_data = dss[0][:dss[1].shape[2]]  # x_data gets truncated to y_data shape if neccessary
+            y_data = dss[1][self.TraceXNum, self.TraceYNum, :]
         if self.PlotTypeSelector.currentIndex() == 4:
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['y_ds_url'])
-            x_data = dss[0][()][:dss[1].shape[1]]
-            y_data = dss[1][()][self.TraceXNum, :, self.TraceZNum]
+            x_data = dss[0][:dss[1].shape[1]]
+            y_data = dss[1][self.TraceXNum, :, self.TraceZNum]
         if self.PlotTypeSelector.currentIndex() == 3:
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['x_ds_url'])
-            x_data = dss[0][()][:dss[1].shape[0]]
-            y_data = dss[1][()][:, self.TraceYNum, self.TraceZNum]
+            x_data = dss[0][:dss[1].shape[0]]
+            y_data = _read_growing(self, dss[1], (self.TraceYNum, self.TraceZNum))
 
     
     ## Any data manipulation (dB <-> lin scale, etc) is done here
@@ -532,7 +536,7 @@ def _display_2D_data(self, graphicsView):
         """
         dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['x_ds_url', 'y_ds_url'])
         try:
-          data = dss[2][()]
+          data, steps = _read_2D(self, graphicsView, dss[2], (slice(None), slice(None)))
         except IOError as e:
               print("Could not open data file")
               print(e)
@@ -560,7 +564,7 @@ def _display_2D_data(self, graphicsView):
             
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['y_ds_url', 'z_ds_url'])
             try:
-              data = dss[2][()][self.TraceXNum, :, :]
+              data, steps = _read_2D(self, graphicsView, dss[2], (self.TraceXNum, slice(None), slice(None)))
             except IOError as e:
               print("Could not open data file")
               print(e)
@@ -579,7 +583,7 @@ def _display_2D_data(self, graphicsView):
             
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['x_ds_url', 'z_ds_url'])
             try:
-              data = dss[2][()][:, self.TraceYNum, :]
+              data, steps = _read_2D(self, graphicsView, dss[2], (slice(None), self.TraceYNum, slice(None)))
             except IOError as e:
               print("Could not open data file")
               print(e)
@@ -598,7 +602,7 @@ def _display_2D_data(self, graphicsView):
             
             dss, names, units, scales = _get_all_ds_names_units_scales(self.ds, ['x_ds_url', 'y_ds_url'])
             try:
-              data = dss[2][()][:, :, self.TraceZNum]
+              data, steps = _read_2D(self, graphicsView, dss[2], (slice(None), slice(None), self.TraceZNum))
             except IOError as e:
               print("Could not open data file")
               print(e)
@@ -625,7 +629,8 @@ def _display_2D_data(self, graphicsView):
     if np.all(np.isnan(data)):
         data[(0,) * len(data.shape)] = 0
         print("Your Data array is all NaN. I set the first value to not blow up graphics window.")
-    graphicsView.setImage(data, pos=(scales[0][0] - scales[0][1] / 2., scales[1][0] - scales[1][1] / 2.), scale=(scales[0][1], scales[1][1]))
+    # a pyramid level has one point per 'steps' points of the dataset
+    graphicsView.setImage(data, pos=(scales[0][0] - scales[0][1] / 2., scales[1][0] - scales[1][1] / 2.), scale=(scales[0][1] * steps[0], scales[1][1] * steps[1]))
     graphicsView.show()
     
     # Fixme roi ...
@@ -646,9 +651,9 @@ def _display_2D_data(self, graphicsView):
         x_index = int(mousePoint.x())
         y_index = int(mousePoint.y())
         
-        xval = scales[0][0] + x_index * scales[0][1]
-        yval = scales[1][0] + y_index * scales[1][1]
-        if 0<= x_index < fill_x and 0 <= y_index < fill_y:
+        xval = scales[0][0] + x_index * scales[0][1] * steps[0]
+        yval = scales[1][0] + y_index * scales[1][1] * steps[1]
+        if 0 <= x_index < data.shape[0] and 0 <= y_index < data.shape[1]:
             zval = data[x_index][y_index]
         else:
             zval = 0
@@ -677,8 +682,8 @@ def _display_2D_data(self, graphicsView):
         if mce.button() == 4:
             mce.accept()
             mousePoint = imIt.mapFromScene(mce.scenePos())
-            xval = scales[0][0] + int(mousePoint.x()) * scales[0][1]
-            yval = scales[1][0] + int(mousePoint.y()) * scales[1][1]
+            xval = scales[0][0] + int(mousePoint.x()) * scales[0][1] * steps[0]
+            yval = scales[1][0] + int(mousePoint.y()) * scales[1][1] * steps[1]
 
             if self.distance_measure[0] is False:
                 roi = pg.RectROI((xval, yval), (0,0))
@@ -750,7 +755,7 @@ def _display_text(self, graphicsView):
         PlotWindow class.
     """
     try:
-        json_dict = json.loads(self.ds[()][0])
+        json_dict = json.loads(self.ds[0])
     except ValueError:
         txt = _display_string(self.ds)
     else:
@@ -808,14 +813,94 @@ def _get_ds(ds, ds_url):
         ds_url: absolute ds_url
 
     Returns:
-        Object of hdf_dataset class.
+        Object of hdf_dataset class, clipped to its logical shape.
     """
     try:
-        return ds.file[ds_url]
+        return valid_view(ds.file[ds_url])
     except:
         return None
 
 
+def _read_growing(self, ds, key=()):
+    """Reads ds[:, *key], i.e. the selection 'key' on all but the first axis,
+    along which measurement data grows.
+
+    Only the rows appended since the last call (plus the last known row, which
+    may have been incomplete or overwritten) are read from the file. The
+    previous result is kept in the PlotWindow object, one selection at a time.
+    Indexed datasets are always read completely.
+    
+    Args:
+        self: Object of the PlotWindow class.
+        ds: hdf_dataset.
+        key: Tuple of integers and slices for the remaining axes.
+
+    Returns:
+        Numpy array, which can be modified by the caller.
+    """
+    cached = self.__dict__.get('_growing_cache')
+    if 'mask_ds_url' in ds.attrs:
+        # indexed datasets are written at arbitrary rows, see hdf_dataset.write_at
+        cached = None
+    if cached is not None and cached[:3] == (ds.name, key, ds.shape[1:]) and 0 < len(cached[3]) <= ds.shape[0]:
+        start = len(cached[3]) - 1
+        data = np.concatenate([cached[3][:start], ds[(slice(start, None),) + key]])
+    else:
+        data = ds[(slice(None),) + key]
+    self._growing_cache = (ds.name, key, ds.shape[1:], data)
+    return data.copy()
+
+
+def _read_2D(self, graphicsView, ds, key):
+    """Reads the 2d selection 'key' of 'ds' for a color plot.
+
+    If the dataset has an up to date pyramid (see qkit.storage.hdf_pyramid),
+    the coarsest level with at least one point per pixel of the graphicsView
+    is read. Otherwise the selection is read from the dataset itself and, if
+    enabled, the pyramid is built in the background.
+    
+    Args:
+        self: Object of the PlotWindow class.
+        graphicsView: Modified object of pyqtgraph's ImageView class.
+        ds: hdf_dataset.
+        key: Tuple with an integer or slice(None) per axis, two slices.
+
+    Returns:
+        Numpy array and a tuple with the number of dataset points per array
+        point along the two displayed axes.
+    """
+    level = hdf_pyramid.read_level(ds, key, (graphicsView.width(), graphicsView.height()))
+    if level is not None:
+        return level
+    _build_pyramid_in_background(self, ds)
+    if isinstance(key[0], slice):
+        return _read_growing(self, ds, key[1:]), (1, 1)
+    return ds[key], (1, 1)
+
+
+def _build_pyramid_in_background(self, ds):
+    """Builds the pyramid of a large dataset in a thread, if qkit.cfg['hdf_pyramid'] is set.
+
+    Only done for finished files, a growing dataset would outdate it
+    immediately. The plots get refreshed once the pyramid is available.
+    """
+    if not qkit.cfg.get('hdf_pyramid', False) or not hdf_pyramid.level_steps(ds.shape):
+        return
+    if ds.file['entry'].attrs.get('updating', True):
+        return
+    if self.__dict__.get('_pyramid_built', None) == (ds.name, ds.shape):
+        return
+    self._pyramid_built = (ds.name, ds.shape)
+
+    def build(h5_path, ds_url):
+        try:
+            if hdf_pyramid.build_pyramids(h5_path, [ds_url]):
+                self.obj_parent.pw_refresh_signal.emit()
+        except Exception as e:
+            logging.warning("Qviewkit: Could not build pyramid of %s: %s" % (ds_url, e))
+    threading.Thread(target=build, args=(ds.file.filename, ds.name), daemon=True).start()
+
+
 def _get_axis_scale(ds):
     """Returns the scale of a coordinate, x0 and dx at an assumed linear 
     scaling.
@@ -17,7 +17,6 @@
 
 
 import logging
-import threading
 
 import numpy as np
 
@@ -26,6 +25,7 @@ import qkit.measure.write_additional_files as waf
 from qkit.gui.notebook.Progress_Bar import Progress_Bar
 from qkit.gui.plot import plot as qviewkit
 from qkit.measure.measurement_class import Measurement
+from qkit.measure.utils.log_sampler import LogSampler
 from qkit.storage import store as hdf
 
 
@@ -51,6 +51,8 @@ class MeasureBase(object):
         self._file_name = ""
         
         self.log_functions = []
+        self.log_sampling = {}  # name: (rate, max_age) of the log functions sampled in the background
+        self._log_samplers = []
         
         self.open_qviewkit = True
         self.qviewkit_singleInstance = False
@@ -75,7 +77,7 @@ class MeasureBase(object):
             raise ValueError(__name__ + ": The given sample '{!s}' is not a qkit sample object.".format(sample))
         self._sample = sample
     
-    def add_log_function(self, func, name, unit="", log_dtype=float):
+    def add_log_function(self, func, name, unit="", log_dtype=float, rate=None, max_age=None):
         """
         A function (object) can be passed to the measurement loop which is excecuted before every x iteration
         but after executing the x_object setter in 2D measurements and before every line (but after setting
@@ -84,10 +86,16 @@ class MeasureBase(object):
         
         To add multiple log functions, execute this function multiple times.
 
+        Slow log functions (e.g. fridge thermometers) can be sampled in a background thread instead, at
+        most 'rate' times per second (see qkit.measure.utils.log_sampler). The samples are stored with their
+        time stamps in '<name>_samples' over '<name>_time', and interpolated onto the sweep points in '<name>'.
+
         func: function object
         name: name of logging parameter appearing in h5 file
         unit: unit of logging parameter, default: ''
         log_dtype: h5 data type, default: float
+        rate: samples per second, default: None (called at every sweep point)
+        max_age: maximum distance in s of a sweep point to the samples used for its value, default: 2/rate
         """
         
         if not callable(func):
@@ -97,7 +105,14 @@ class MeasureBase(object):
         if type(unit) is not str:
             raise ValueError('{:s}: Cannot set {!s} as log-unit: string needed'.format(__name__, unit))
         
+        if rate is not None and rate <= 0:
+            raise ValueError('{:s}: Cannot set {!s} as log-rate: positive number needed'.format(__name__, rate))
+        
         self.log_functions.append([func, name, unit, log_dtype])
+        if rate is not None:
+            self.log_sampling[name] = (rate, max_age)
+        else:
+            self.log_sampling.pop(name, None)
     
     def remove_log_function(self, index=None):
         """
@@ -106,8 +121,9 @@ class MeasureBase(object):
         """
         if index is None:
             self.log_functions = []
+            self.log_sampling = {}
         else:
-            self.log_functions.pop(index)
+            self.log_sampling.pop(self.log_functions.pop(index)[1], None)
     
     class Coordinate:
         def __init__(self, name, unit="", values=None, set_function=None, wait_time=0):
@@ -318,11 +334,19 @@ class MeasureBase(object):
         self._settings.append(settings)
         self._log = waf.open_log_file(self._data_file.get_filepath())
 
+        self._log_datasets = []
+        self._log_samplers = []
         if self._dim > 1:
-            self._log_datasets = []
             for [func, name, unit, log_dtype] in self.log_functions:
-                self._log_datasets.append([self._data_file.add_value_vector(name, x=data[0].coordinates[0].create_dataset(self._data_file), unit=unit,
-                                                                            dtype=log_dtype), func])
+                log_dtype = np.dtype(log_dtype).str  # the file stores the dtype as string attribute
+                ds = self._data_file.add_value_vector(name, x=data[0].coordinates[0].create_dataset(self._data_file), unit=unit, dtype=log_dtype)
+                if name in self.log_sampling:
+                    rate, max_age = self.log_sampling[name]
+                    t = self._data_file.add_coordinate(name + '_time', unit='s')
+                    samples = self._data_file.add_value_vector(name + '_samples', x=t, unit=unit, dtype=log_dtype)
+                    self._log_samplers.append([ds, t, samples, LogSampler(func, rate, max_age, name=name).start()])
+                else:
+                    self._log_datasets.append([ds, func])
         
         if self.comment:
             self._data_file.add_comment(self.comment)
@@ -345,17 +369,51 @@ class MeasureBase(object):
         if self.open_qviewkit:
             self._qvk_process = qviewkit.plot(self._data_file.get_filepath(), datasets=datasets)
     
-    def _acquire_log_functions(self):
-        for [ds, func] in self._log_datasets:
-            ds.append([func()])
+    def _acquire_log_functions(self, pipe=None):
+        """
+        Calls the log functions (concurrently, see qkit.core.lib.concurrent_io) and appends their values,
+        through 'pipe' (see qkit.measure.utils.pipeline) if given.
+        """
+        from qkit.core.lib.concurrent_io import call_concurrently
+        values = call_concurrently([func for [ds, func] in self._log_datasets])
+        for [ds, func], value in zip(self._log_datasets, values):
+            if pipe is None:
+                ds.append([value])
+            else:
+                pipe.put(ds.append, [value])
+        for [ds, t, samples, sampler] in self._log_samplers:
+            # never waits for the instrument, the values of the points are written once they can be interpolated
+            self._store_log_samples(ds, t, samples, *sampler.update(), pipe=pipe)
+    
+    @staticmethod
+    def _store_log_samples(ds, t, samples, new, values, pipe=None):
+        writes = []
+        if new:
+            writes += [(t.append, np.array([s[0] for s in new])), (samples.append, np.array([s[1] for s in new]))]
+        if values:
+            writes.append((ds.append, np.array(values)))
+        for write, data in writes:
+            if pipe is None:
+                write(data)
+            else:
+                pipe.put(write, data)
+    
+    def _finish_log_samplers(self):
+        """
+        Stops the background log samplers and writes their remaining samples and values.
+        """
+        for [ds, t, samples, sampler] in self._log_samplers:
+            self._store_log_samples(ds, t, samples, *sampler.finish())
+        self._log_samplers = []
     
     def _end_measurement(self):
         """
         the data file is closed and filepath is printed
         """
         print(self._data_file.get_filepath())
-        threading.Thread(target=qviewkit.save_plots, args=[self._data_file.get_filepath()]).start()
+        self._finish_log_samplers()
         self._data_file.close_file()
+        qviewkit.save_plots_background(self._data_file.get_filepath())
         waf.close_log_file(self._log)
         self.measurement_name = None
         qkit.flow.end()
@@ -21,7 +21,6 @@ import numpy as np
 import logging
 from time import sleep,time
 import sys
-import threading
 
 import qkit
 if qkit.module_available("matplotlib"):
@@ -33,6 +32,7 @@ from qkit.gui.plot import plot as qviewkit
 from qkit.gui.notebook.Progress_Bar import Progress_Bar
 from qkit.measure.measurement_class import Measurement
 import qkit.measure.write_additional_files as waf
+from qkit.core.lib.concurrent_io import call_concurrently
 
 
 class spectrum(object):
@@ -477,8 +477,8 @@ class spectrum(object):
                 sleep(self.tdx)
 
                 if self.log_function != None:
-                    for i, f in enumerate(self.log_function):
-                        self._log_value[i].append(float(f()))
+                    for i, value in enumerate(call_concurrently(self.log_function)):
+                        self._log_value[i].append(float(value))
 
                 #### not tested
                 if self._scan_3D:
@@ -547,9 +547,8 @@ class spectrum(object):
         '''
         print(self._data_file.get_filepath())
         # qviewkit.save_plots(self._data_file.get_filepath(),comment=self._plot_comment) #old version where we have to wait for the plots
-        t = threading.Thread(target=qviewkit.save_plots, args=[self._data_file.get_filepath(), self._plot_comment])
-        t.start()
         self._data_file.close_file()
+        qviewkit.save_plots_background(self._data_file.get_filepath(), self._plot_comment)
         waf.close_log_file(self._log)
         self.dirname = None
         if self.averaging_start_ready: self.sig_analyzer.post_measurement()
@@ -20,7 +20,6 @@ import numpy as np
 import logging
 from time import sleep, time
 import sys
-import threading
 
 import qkit
 if qkit.module_available("matplotlib"):
@@ -33,6 +32,9 @@ from qkit.analysis.resonator import Resonator as resonator
 from qkit.gui.plot import plot as qviewkit
 from qkit.gui.notebook.Progress_Bar import Progress_Bar
 from qkit.measure.measurement_class import Measurement
+from qkit.measure.utils.pipeline import Pipeline, Immediate
+from qkit.drivers.AbstractVNA import read_trace, wait_for_completion
+from qkit.core.lib.concurrent_io import call_concurrently
 import qkit.measure.write_additional_files as waf
 
 
@@ -66,6 +68,9 @@ class spectrum(object):
         self.tdy = 0.002  # [s]
 
         self.vna_poll_interval = 0.1 # interval in seconds in which the vna is queried to be ready.
+        # wait for the completion event of the driver instead of polling ready(), if it offers one
+        self.vna_event_driven = self.averaging_start_ready and "wait_for_completion" in self.vna.get_function_names()
+        self.set_pipelined(qkit.cfg.get('spectroscopy_pipelined', False))
 
         self.comment = ''
         self.dirname = None
@@ -316,11 +321,14 @@ class spectrum(object):
                 self._data_pha = self._data_file.add_value_matrix('phase', x=self._data_x, y=self._data_y, unit='rad',
                                                                   save_timestamp=False)
             else:
+                # xy landscape scans write only the points of interest, at their indices. Not for live fits, which read the latest trace.
+                indexed = dict(expected_shape=(len(self.x_vec), len(self.y_vec), len(self._freqpoints)), indexed=2) \
+                    if self.landscape.xylandscapes and not self._fit_resonator else {}
                 self._data_amp = self._data_file.add_value_box('amplitude', x=self._data_x, y=self._data_y,
                                                                z=sweep_vector, unit='arb. unit',
-                                                               save_timestamp=False)
+                                                               save_timestamp=False, **indexed)
                 self._data_pha = self._data_file.add_value_box('phase', x=self._data_x, y=self._data_y,
-                                                               z=sweep_vector, unit='rad', save_timestamp=False)
+                                                               z=sweep_vector, unit='rad', save_timestamp=False, **indexed)
 
             if self.log_function != None:  # use logging
                 self._log_value = []
@@ -418,13 +426,12 @@ class spectrum(object):
                             qkit.flow.sleep(self.vna.get_sweeptime())  # wait single sweep time
                             if self.progress_bar: self._p.iterate()
 
-        data_amp, data_pha = self.vna.get_tracedata()
-        data_real, data_imag = self.vna.get_tracedata('RealImag')
+        trace = read_trace(self.vna)  # a single transfer, if the driver supports it
 
-        self._data_amp.append(data_amp)
-        self._data_pha.append(data_pha)
-        self._data_real.append(data_real)
-        self._data_imag.append(data_imag)
+        self._data_amp.append(trace.amp)
+        self._data_pha.append(trace.pha)
+        self._data_real.append(trace.real)
+        self._data_imag.append(trace.imag)
         if self._fit_resonator:
             self._do_fit_resonator()
 
@@ -563,116 +570,124 @@ class spectrum(object):
         '''
         measures and plots the data depending on the measurement type.
         the measurement loops feature the setting of the objects and saving the data in the .h5 file.
+        In pipelined mode (see set_pipelined), storing, fitting and the progress bar run on a
+        consumer thread, while the next point is already set and triggered.
         '''
         qkit.flow.start()
+        pipe = Pipeline(self.pipeline_depth) if self.pipelined else Immediate()
         try:
-            """
-            loop: x_obj with parameters from x_vec
-            """
-            for ix, x in enumerate(self.x_vec):
-                self.x_set_obj(x)
-                sleep(self.tdx)
-
-                if self.log_function != None:
-                    for i, f in enumerate(self.log_function):
-                        self._log_value[i].append(float(f()))
-
-                if self.log_function_2D != None:
-                    for i, f in enumerate(self.log_function_2D):
-                        self._log_value_2D[i].append(f())
-
-                if self._scan_dim == 3:
-                    for y in self.y_vec:
-                        # loop: y_obj with parameters from y_vec (only 3D measurement)
-                        if self.landscape.xylandscapes and not self.landscape.perform_measurement_at_point(x, y, ix):
-                            # if point is not of interest (not close to one of the functions)
-                            data_amp = np.full(int(self._nop), np.NaN, dtype=np.float16)
-                            data_pha = np.full(int(self._nop), np.NaN, dtype=np.float16)  # fill with NaNs
-                        else:
-                            self.y_set_obj(y)
-                            sleep(self.tdy)
-                            if self.averaging_start_ready:
-                                self.vna.start_measurement()
-                                # Check if the VNA is STILL in ready state, then add some delay.
-                                # If you manually decrease the poll_inveral, I guess you know what you are doing and will disable this safety query.
-                                if self.vna_poll_interval >= 0.1 and self.vna.ready():
-                                    logging.debug("VNA STILL ready... Adding delay")
-                                    qkit.flow.sleep(
-                                        .2)  # just to make sure, the ready command does not *still* show ready
-
-                                while not self.vna.ready():
-                                    qkit.flow.sleep(min(self.vna.get_sweeptime_averages(query=False) / 11., self.vna_poll_interval))
-                            else:
-                                self.vna.avg_clear()
-                                qkit.flow.sleep(self._sweeptime_averages)
-
-                            # if "avg_status" in self.vna.get_function_names():
-                            #       while self.vna.avg_status() < self.vna.get_averages():
-                            #            qkit.flow.sleep(.2) #maybe one would like to adjust this at a later point
-
-                            """ measurement """
-                            if not self.landscape.xzlandscape_func:  # normal scan
-                                data_amp, data_pha = self.vna.get_tracedata()
+            with pipe:
+                """
+                loop: x_obj with parameters from x_vec
+                """
+                for ix, x in enumerate(self.x_vec):
+                    self.x_set_obj(x)
+                    sleep(self.tdx)
+
+                    # the log functions of different instruments are called concurrently, see qkit.core.lib.concurrent_io
+                    log_functions = (self.log_function or []) + (self.log_function_2D or [])
+                    log_values = call_concurrently(log_functions)
+                    if self.log_function != None:
+                        for i, value in enumerate(log_values[:len(self.log_function)]):
+                            pipe.put(self._log_value[i].append, float(value))
+
+                    if self.log_function_2D != None:
+                        for i, value in enumerate(log_values[len(self.log_function or []):]):
+                            pipe.put(self._log_value_2D[i].append, value)
+
+                    if self._scan_dim == 3:
+                        for iy, y in enumerate(self.y_vec):
+                            # loop: y_obj with parameters from y_vec (only 3D measurement)
+                            if self.landscape.xylandscapes and not self.landscape.perform_measurement_at_point(x, y, ix):
+                                # if point is not of interest (not close to one of the functions)
+                                if self._data_amp.indexed:
+                                    continue  # nothing is stored for skipped points
+                                data_amp = np.full(int(self._nop), np.NaN, dtype=np.float16)
+                                data_pha = np.full(int(self._nop), np.NaN, dtype=np.float16)  # fill with NaNs
+                                measured = False
                             else:
-                                data_amp, data_pha = self.landscape.get_tracedata_xz(x)
-                            if self.progress_bar:
-                                self._p.iterate()
-
-                        if self._nop == 0:  # this does not work yet.
-                            print(data_amp[0], data_amp, self._nop)
-                            self._data_amp.append(data_amp[0])
-                            self._data_pha.append(data_pha[0])
+                                self.y_set_obj(y)
+                                sleep(self.tdy)
+                                self._wait_for_vna(self.vna_poll_interval)
+                                """ measurement """
+                                if not self.landscape.xzlandscape_func:  # normal scan
+                                    data_amp, data_pha = self.vna.get_tracedata()
+                                else:
+                                    data_amp, data_pha = self.landscape.get_tracedata_xz(x)
+                                measured = True
+                            pipe.put(self._store_point, data_amp, data_pha, (ix, iy), measured)
+                            qkit.flow.sleep()
+                        """
+                        filling of value-box is done here.
+                        after every y-loop the data is stored the next 2d structure
+                        """
+                        pipe.put(self._data_amp.next_matrix)
+                        pipe.put(self._data_pha.next_matrix)
+
+                    if self._scan_dim == 2:
+                        self._wait_for_vna(.2)
+                        """ measurement """
+                        if not self.landscape.xzlandscape_func:  # normal scan
+                            data_amp, data_pha = self.vna.get_tracedata()
                         else:
-                            self._data_amp.append(data_amp)
-                            self._data_pha.append(data_pha)
-                        if self._fit_resonator:
-                            self._do_fit_resonator()
+                            data_amp, data_pha = self.landscape.get_tracedata_xz(x)
+                        pipe.put(self._store_point, data_amp, data_pha)
                         qkit.flow.sleep()
-                    """
-                    filling of value-box is done here.
-                    after every y-loop the data is stored the next 2d structure
-                    """
-                    self._data_amp.next_matrix()
-                    self._data_pha.next_matrix()
-
-                if self._scan_dim == 2:
-                    if self.averaging_start_ready:
-                        self.vna.start_measurement()
-                        if self.vna.ready():
-                            logging.debug("VNA STILL ready... Adding delay")
-                            qkit.flow.sleep(.2)  # just to make sure, the ready command does not *still* show ready
-
-                        while not self.vna.ready():
-                            qkit.flow.sleep(min(self.vna.get_sweeptime_averages(query=False) / 11., .2))
-                    else:
-                        self.vna.avg_clear()
-                        qkit.flow.sleep(self._sweeptime_averages)
-                    """ measurement """
-                    if not self.landscape.xzlandscape_func:  # normal scan
-                        data_amp, data_pha = self.vna.get_tracedata()
-                    else:
-                        data_amp, data_pha = self.landscape.get_tracedata_xz(x)
-                    self._data_amp.append(data_amp)
-                    self._data_pha.append(data_pha)
-
-                    if self._fit_resonator:
-                        self._do_fit_resonator()
-                    if self.progress_bar:
-                        self._p.iterate()
-                    qkit.flow.sleep()
         finally:
             self._end_measurement()
             qkit.flow.end()
 
+    def _wait_for_vna(self, poll_interval):
+        '''
+        starts a measurement on the VNA and waits until it is finished
+        '''
+        if self.averaging_start_ready:
+            self.vna.start_measurement()
+            if self.vna_event_driven:
+                wait_for_completion(self.vna)
+                return
+            # Check if the VNA is STILL in ready state, then add some delay.
+            # If you manually decrease the poll_inveral, I guess you know what you are doing and will disable this safety query.
+            if poll_interval >= 0.1 and self.vna.ready():
+                logging.debug("VNA STILL ready... Adding delay")
+                qkit.flow.sleep(.2)  # just to make sure, the ready command does not *still* show ready
+
+            while not self.vna.ready():
+                qkit.flow.sleep(min(self.vna.get_sweeptime_averages(query=False) / 11., poll_interval))
+        else:
+            self.vna.avg_clear()
+            qkit.flow.sleep(self._sweeptime_averages)
+
+    def _store_point(self, data_amp, data_pha, index=None, measured=True):
+        '''
+        appends a trace to the data file, fits it and iterates the progress bar.
+        Runs on the consumer thread in pipelined mode.
+        index: (ix, iy) of the point in 3D measurements
+        measured: False for points skipped by the landscape (filled with NaNs)
+        '''
+        if self._nop == 0:  # this does not work yet.
+            print(data_amp[0], data_amp, self._nop)
+            self._data_amp.append(data_amp[0])
+            self._data_pha.append(data_pha[0])
+        elif index is not None and self._data_amp.indexed:
+            self._data_amp.write_at(data_amp, index)
+            self._data_pha.write_at(data_pha, index)
+        else:
+            self._data_amp.append(data_amp)
+            self._data_pha.append(data_pha)
+        if self._fit_resonator:
+            self._do_fit_resonator()
+        if self.progress_bar and measured:
+            self._p.iterate()
+
     def _end_measurement(self):
         '''
         the data file is closed and filepath is printed
         '''
         print(self._data_file.get_filepath())
         # qviewkit.save_plots(self._data_file.get_filepath(),comment=self._plot_comment) #old version where we have to wait for the plots
-        t = threading.Thread(target=qviewkit.save_plots, args=[self._data_file.get_filepath(), self._plot_comment])
-        t.start()
         self._data_file.close_file()
+        qviewkit.save_plots_background(self._data_file.get_filepath(), self._plot_comment)
         waf.close_log_file(self._log)
         self.dirname = None
         if self.averaging_start_ready: self.vna.post_measurement()
@@ -725,6 +740,18 @@ class spectrum(object):
         else:
             logging.error("Fit function set in spectrum.set_resonator_fit is not supported. Must be either \'lorentzian\', \'skewed_lorentzian\', \'circle_fit_reflection\', \'circle_fit_notch\', \'fano\', or \'all_fits\'.")
 
+    def set_pipelined(self, status=True, depth=None):
+        '''
+        In pipelined mode, 2D and 3D measurements store the traces, fit the resonator and iterate the
+        progress bar on a background thread, while the next point is already set and measured.
+        The traces are passed through a queue holding at most 'depth' points.
+
+        status (bool): True = pipelined, False = serial (default qkit.cfg['spectroscopy_pipelined'])
+        depth (int): queue length, default qkit.cfg['measure_pipeline_depth'] or 4
+        '''
+        self.pipelined = bool(status)
+        self.pipeline_depth = depth
+
     def set_tdx(self, tdx):
         self.tdx = tdx
 
@@ -23,14 +23,11 @@ import numpy as np
 
 import qkit
 
-if qkit.module_available("matplotlib"):
-    import matplotlib.pylab as plt
-if qkit.module_available("scipy"):
-    from scipy.optimize import curve_fit
-    from scipy.interpolate import interp1d, UnivariateSpline
-from qkit.analysis.resonator import Resonator as resonator
-from qkit.gui.notebook.Progress_Bar import Progress_Bar
+# matplotlib, scipy, the resonator fits and the progress bar (IPython) are imported
+# where they are used, so importing this module stays fast
 from qkit.measure.measurement_base import MeasureBase
+from qkit.measure.utils.pipeline import Pipeline, Immediate
+from qkit.drivers.AbstractVNA import read_trace, wait_for_completion
 
 
 ##################################################################
@@ -58,12 +55,15 @@ class spectrum(MeasureBase):
         if not self.averaging_start_ready: logging.warning(
                 __name__ + ': With your VNA instrument driver (' + self.vna.get_type() + '), I can not see when a measurement is complete. So I only wait for a specific time and hope the VNA has finished. Please consider implemeting the necessary functions into your driver.')
         
+        # wait for the completion event of the driver instead of polling ready(), if it offers one
+        self.vna_event_driven = self.averaging_start_ready and "wait_for_completion" in self.vna.get_function_names()
         self.landscape = Landscape(vna=vna, spec=self)
         self._fit_resonator = False
         self._measurement_object.measurement_type = 'SpectroscopyMeasurement'
         self._views = []
         self._scan_time = False
         self._segments = [] # bool([]) == False
+        self.set_pipelined(qkit.cfg.get('spectroscopy_pipelined', False))
     
     def set_x_parameters(self, vec, coordname, set_obj, unit, dt=None):
         """
@@ -189,6 +189,7 @@ class spectrum(MeasureBase):
         
         qkit.flow.start()
         if rescan:
+            from qkit.gui.notebook.Progress_Bar import Progress_Bar
             self._pb = Progress_Bar(self.vna.get_averages(), self.measurement_name, self.vna.get_sweeptime(), dummy=not self.progress_bar)
             if self.averaging_start_ready:
                 self.vna.start_measurement()
@@ -217,10 +218,9 @@ class spectrum(MeasureBase):
                             qkit.flow.sleep(self.vna.get_sweeptime())  # wait single sweep time
                             self._pb.iterate()
         
-        data_amp, data_pha = self.vna.get_tracedata()
-        data_real, data_imag = self.vna.get_tracedata('RealImag')
+        trace = read_trace(self.vna)  # a single transfer, if the driver supports it
         
-        self._append(data_amp,data_pha,data_real,data_imag)
+        self._append(trace.amp, trace.pha, trace.real, trace.imag)
         if self._fit_resonator:
             self._do_fit_resonator()
         self._end_measurement()
@@ -249,6 +249,7 @@ class spectrum(MeasureBase):
             self._prepare_measurement_file(
                     [self.Data("amplitude", [self._x_parameter, f], "arb. unit", save_timestamp=True), self.Data("phase", [self._x_parameter, f], "rad")])
        
+        from qkit.gui.notebook.Progress_Bar import Progress_Bar
         self._pb = Progress_Bar(len(self._x_parameter.values), '2D VNA sweep ' + self.measurement_name, self.vna.get_sweeptime_averages(),
                                 dummy=not self.progress_bar)
         
@@ -264,6 +265,7 @@ class spectrum(MeasureBase):
             self._open_qviewkit(datasets=[] if len(self._segments)>4 else None)
         
         if self._fit_resonator:
+            from qkit.analysis.resonator import Resonator as resonator
             self._resonator = resonator(self._data_file.get_filepath())
         self._measure()
     
@@ -295,8 +297,10 @@ class spectrum(MeasureBase):
         self._open_qviewkit(datasets=[] if len(self._segments)>4 else None)
         
         if self._fit_resonator:
+            from qkit.analysis.resonator import Resonator as resonator
             self._resonator = resonator(self._data_file.get_filepath())
         
+        from qkit.gui.notebook.Progress_Bar import Progress_Bar
         if self.progress_bar:
             if self.landscape.xylandscapes:  # ToDo: This part could be part of the Landscape class
                 truth = np.full((len(self._y_parameter.values), len(self._x_parameter.values)), False)  # first, nothing is selected:
@@ -344,6 +348,7 @@ class spectrum(MeasureBase):
         self._prepare_measurement_file([self.Data("amplitude", [iteration, t], "arb. unit", save_timestamp=True), self.Data("phase", [iteration, t], "rad")],
                 coords=f)
 
+        from qkit.gui.notebook.Progress_Bar import Progress_Bar
         self._pb = Progress_Bar(self.number_of_timetraces, 'VNA timetrace ' + self.measurement_name, self.vna.get_sweeptime_averages(),
                                 dummy=not self.progress_bar)
         
@@ -371,14 +376,17 @@ class spectrum(MeasureBase):
     def _acquire_vna_data(self):
         if self.averaging_start_ready:
             self.vna.start_measurement()
-            if self._scan_time:
-                qkit.flow.sleep(self.vna.get_sweeptime(query=False))  # to prevent timeouts in time scan
-            elif self.vna.ready():
-                logging.debug("VNA STILL ready... Adding delay")
-                qkit.flow.sleep(.2)  # just to make sure, the ready command does not *still* show ready
-            
-            while not self.vna.ready():
-                qkit.flow.sleep(min(self.vna.get_sweeptime_averages(query=False) / 11., .2))
+            if self.vna_event_driven:
+                wait_for_completion(self.vna)
+            else:
+                if self._scan_time:
+                    qkit.flow.sleep(self.vna.get_sweeptime(query=False))  # to prevent timeouts in time scan
+                elif self.vna.ready():
+                    logging.debug("VNA STILL ready... Adding delay")
+                    qkit.flow.sleep(.2)  # just to make sure, the ready command does not *still* show ready
+                
+                while not self.vna.ready():
+                    qkit.flow.sleep(min(self.vna.get_sweeptime_averages(query=False) / 11., .2))
         else:
             self.vna.avg_clear()
             qkit.flow.sleep(self._sweeptime_averages)
@@ -405,53 +413,80 @@ class spectrum(MeasureBase):
         """
         measures and plots the data depending on the measurement type.
         the measurement loops feature the setting of the objects and saving the data in the .h5 file.
+        In pipelined mode (see set_pipelined), storing, fitting and the progress bar run on a
+        consumer thread, while the next point is already set and measured.
         """
         qkit.flow.start()
+        pipe = Pipeline(self.pipeline_depth) if self.pipelined else Immediate()
         try:
-            """
-            loop: x_obj with parameters from x_vec
-            """
-            for ix, x in enumerate(self._x_parameter.values):
-                self._x_parameter.set_function(x)
-                qkit.flow.sleep(self._x_parameter.wait_time)
-                
-                self._acquire_log_functions()
-    
-                if self._dim == 3:
-                    for y in self._y_parameter.values:
-                        # loop: y_obj with parameters from y_vec (only 3D measurement)
-                        if self.landscape.xylandscapes and not self.landscape.perform_measurement_at_point(x, y, ix):
-                            # if point is not of interest (not close to one of the functions)
-                            data_amp = np.full(int(self._nop), np.NaN, dtype=np.float16)
-                            data_pha = np.full(int(self._nop), np.NaN, dtype=np.float16)  # fill with NaNs
-                        else:
-                            self._y_parameter.set_function(y)
-                            qkit.flow.sleep(self._y_parameter.wait_time)
-                            if not self.landscape.xzlandscape_func:  # normal scan
-                                data_amp, data_pha = self._acquire_vna_data()
+            with pipe:
+                """
+                loop: x_obj with parameters from x_vec
+                """
+                for ix, x in enumerate(self._x_parameter.values):
+                    self._x_parameter.set_function(x)
+                    qkit.flow.sleep(self._x_parameter.wait_time)
+                    
+                    self._acquire_log_functions(pipe)
+        
+                    if self._dim == 3:
+                        for y in self._y_parameter.values:
+                            # loop: y_obj with parameters from y_vec (only 3D measurement)
+                            if self.landscape.xylandscapes and not self.landscape.perform_measurement_at_point(x, y, ix):
+                                # if point is not of interest (not close to one of the functions)
+                                data_amp = np.full(int(self._nop), np.NaN, dtype=np.float16)
+                                data_pha = np.full(int(self._nop), np.NaN, dtype=np.float16)  # fill with NaNs
+                                measured = False
                             else:
-                                data_amp, data_pha = self.landscape.get_tracedata_xz(x)
-                            self._pb.iterate()
-                        self._append(data_amp,data_pha)
-                        if self._fit_resonator:
-                            self._do_fit_resonator()
+                                self._y_parameter.set_function(y)
+                                qkit.flow.sleep(self._y_parameter.wait_time)
+                                if not self.landscape.xzlandscape_func:  # normal scan
+                                    data_amp, data_pha = self._acquire_vna_data()
+                                else:
+                                    data_amp, data_pha = self.landscape.get_tracedata_xz(x)
+                                measured = True
+                            pipe.put(self._store_point, data_amp, data_pha, measured)
+                            qkit.flow.sleep()
+                        """
+                        filling of value-box is done here.
+                        after every y-loop the data is stored the next 2d structure
+                        """
+                        pipe.put(self._next_matrix)
+        
+                    if self._dim == 2:
+                        data_amp, data_pha = self._acquire_vna_data()
+                        pipe.put(self._store_point, data_amp, data_pha)
                         qkit.flow.sleep()
-                    """
-                    filling of value-box is done here.
-                    after every y-loop the data is stored the next 2d structure
-                    """
-                    [d.next_matrix() for d in self._datasets.values()]
-    
-                if self._dim == 2:
-                    data_amp, data_pha = self._acquire_vna_data()
-                    self._append(data_amp, data_pha)
-                    
-                    if self._fit_resonator:
-                        self._do_fit_resonator()
-                    self._pb.iterate()
-                    qkit.flow.sleep()
         finally:
             self._end_measurement()
+
+    def _store_point(self, data_amp, data_pha, measured=True):
+        """
+        appends a trace to the data file, fits it and iterates the progress bar.
+        Runs on the consumer thread in pipelined mode.
+        measured: False for points skipped by the landscape (filled with NaNs)
+        """
+        self._append(data_amp, data_pha)
+        if self._fit_resonator:
+            self._do_fit_resonator()
+        if measured:
+            self._pb.iterate()
+
+    def _next_matrix(self):
+        for d in self._datasets.values():
+            d.next_matrix()
+
+    def set_pipelined(self, status=True, depth=None):
+        """
+        In pipelined mode, 2D and 3D measurements store the traces, fit the resonator and iterate the
+        progress bar on a background thread, while the next point is already set and measured.
+        The traces are passed through a queue holding at most 'depth' points.
+
+        status (bool): True = pipelined, False = serial (default qkit.cfg['spectroscopy_pipelined'])
+        depth (int): queue length, default qkit.cfg['measure_pipeline_depth'] or 4
+        """
+        self.pipelined = bool(status)
+        self.pipeline_depth = depth
     
     def _end_measurement(self):
         super(spectrum, self)._end_measurement()
@@ -585,6 +620,8 @@ class Landscape:
         """
         if not qkit.module_available("scipy"):
             raise ImportError('scipy not available.')
+        from scipy.optimize import curve_fit
+        from scipy.interpolate import interp1d, UnivariateSpline
         
         if units == 'Hz':
             multiplier = 1e9
@@ -639,6 +676,8 @@ class Landscape:
         """
         if not qkit.module_available("scipy"):
             raise ImportError('scipy not available.')
+        from scipy.optimize import curve_fit
+        from scipy.interpolate import interp1d, UnivariateSpline
         
         if curve_p[1][-1] > 1e6:  # test if z_values are given in Hz or GHz
             multiplier = 1e9
@@ -700,6 +739,7 @@ class Landscape:
         """
         if not qkit.module_available("matplotlib"):
             raise ImportError("matplotlib not found.")
+        import matplotlib.pylab as plt
         
         if self.xylandscapes:
             for i in self.xylandscapes:
@@ -728,6 +768,7 @@ class Landscape:
         """
         if not qkit.module_available("matplotlib"):
             raise ImportError("matplotlib not found.")
+        import matplotlib.pylab as plt
         
         if self.xzlandscape_func:
             y_values = self.xzlandscape_func(self.spec.x_vec)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the dead time of waiting for VNA sweeps in spectroscopy.
+
+Runs the wait of spectrum._measure against the simulated DummyVNA, once
+polling ready() and once waiting for the completion event of the driver
+(see AbstractVNA.wait_for_completion). Every ready() query costs 'latency'
+seconds, like a VISA round trip. Reports the time spent per sweep beyond
+the sweep time itself.
+
+Usage:
+    python -m qkit.measure.spectroscopy.vna_wait_benchmark --points 50 --sweeptime 0.05
+"""
+import argparse
+import time
+
+import qkit
+
+
+def run_case(event_driven, points, sweeptime, latency):
+    """Waits for 'points' simulated sweeps.
+
+    Returns:
+        dict with the total time (s) and the dead time per sweep (ms and % of the sweep time).
+    """
+    from qkit.drivers.DummyVNA import DummyVNA
+    from qkit.measure.spectroscopy.spectroscopy import spectrum
+    vna = DummyVNA('benchmark_vna_%s' % ('event' if event_driven else 'poll'), event_driven=event_driven, latency=latency,
+                   simulate_sweeps=True)
+    vna.set_sweeptime_averages(sweeptime)
+    m = spectrum(vna=vna)
+    start = time.time()
+    for _ in range(points):
+        m._wait_for_vna(m.vna_poll_interval)
+    total = time.time() - start
+    dead = total / points - sweeptime
+    return {'total': total, 'dead_ms': 1e3 * dead, 'dead_percent': 100. * dead / sweeptime}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--points", type=int, default=50, help="number of sweeps")
+    parser.add_argument("--sweeptime", type=float, default=0.05, help="duration of a sweep in s")
+    parser.add_argument("--latency", type=float, default=0.002, help="duration of a ready() query in s")
+    args = parser.parse_args(argv)
+
+    qkit.cfg['save_png'] = False
+    qkit.start(silent=True)
+    print("{:>8} {:>10} {:>14} {:>10}".format("wait", "total [s]", "dead [ms/pt]", "dead [%]"))
+    for event_driven in (False, True):
+        r = run_case(event_driven, args.points, args.sweeptime, args.latency)
+        print("{:>8} {:>10.2f} {:>14.1f} {:>10.1f}".format("event" if event_driven else "poll", r['total'],
+                                                         r['dead_ms'], r['dead_percent']))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,6 @@
 
 import numpy as np
 import logging
-import threading
 
 import qkit
 from qkit.gui.notebook.Progress_Bar import Progress_Bar
@@ -503,9 +502,8 @@ class Measure_td(object):
             self.readout.cleanup()
         except AttributeError:
             pass
-        t = threading.Thread(target=qviewkit.save_plots, args=[self._hdf.get_filepath(), self._plot_comment])
-        t.start()
         self._hdf.close_file()
+        qviewkit.save_plots_background(self._hdf.get_filepath(), self._plot_comment)
         waf.close_log_file(self._log)
         qkit.flow.end()
     
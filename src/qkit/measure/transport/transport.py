@@ -22,7 +22,6 @@ from scipy import signal
 import logging
 import time
 import sys
-import threading
 
 import qkit
 from qkit.storage import store as hdf
@@ -30,6 +29,7 @@ from qkit.gui.plot import plot as qviewkit
 from qkit.gui.notebook.Progress_Bar import Progress_Bar
 from qkit.measure.measurement_class import Measurement 
 import qkit.measure.write_additional_files as waf
+from qkit.core.lib.concurrent_io import call_concurrently
 
 
 class transport(object):
@@ -1198,15 +1198,16 @@ class transport(object):
                         time.sleep(self._tdy)
                         # log function
                         if self.log_function != [None]:
-                            for j, f in enumerate(self.log_function):
+                            # the log functions of different instruments are called concurrently, see qkit.core.lib.concurrent_io
+                            for j, value in enumerate(call_concurrently(self.log_function)):
                                 if self._scan_dim == 1:
-                                    self._data_log[j] = np.array([float(f())])  # np.asarray(f(), dtype=float)
+                                    self._data_log[j] = np.array([float(value)])  # np.asarray(f(), dtype=float)
                                     self._hdf_log[j].append(self._data_log[j])
                                 elif self._scan_dim == 2:
-                                    self._data_log[j][self.ix] = float(f())
+                                    self._data_log[j][self.ix] = float(value)
                                     self._hdf_log[j].append(self._data_log[j], reset=True)
                                 elif self._scan_dim == 3:
-                                    self._data_log[j][self.ix, self.iy] = float(f())
+                                    self._data_log[j][self.ix, self.iy] = float(value)
                                     self._hdf_log[j].append(self._data_log[j][self.ix], reset=_rst_log_hdf_appnd)
                             if self._scan_dim == 3: # reset needs to be updated for all log-functions simultaneously and thus outside of the loop 
                                 _rst_log_hdf_appnd = not bool(self.iy+1 == len(self._y_vec))
@@ -1220,9 +1221,8 @@ class transport(object):
         finally:
             ''' end measurement '''
             qkit.flow.end()
-            t = threading.Thread(target=qviewkit.save_plots, args=[self._data_file.get_filepath(), self._plot_comment])
-            t.start()
             self._data_file.close_file()
+            qviewkit.save_plots_background(self._data_file.get_filepath(), self._plot_comment)
             waf.close_log_file(self._log_file)
             self._set_IVD_status(False)
             print('Measurement complete: {:s}'.format(self._data_file.get_filepath()))
@@ -1,5 +1,4 @@
 import logging
-import threading
 import time
 from dataclasses import dataclass, field
 from os import PathLike
@@ -8,11 +7,10 @@ import numpy as np
 from abc import ABC, abstractmethod
 from typing import Optional, Callable, Protocol, Literal, Iterable, Any, Union, Self
 
+import functools
 import textwrap
 import json
 
-from tqdm.auto import tqdm
-
 import qkit
 
 from qkit.storage import store as hdf  # Entrypoint for existing hdf infrastructure in qkit
@@ -23,7 +21,6 @@ from qkit.measure.samples_class import Sample
 from qkit.measure.measurement_class import Measurement
 import qkit.measure.write_additional_files as waf
 
-import qkit.gui.plot.plot as qviewkit  # Who names these things?
 
 """
 The unified measurement class infrastructure. Will attempt to unify all kinds of measurements into a common code base.
@@ -165,18 +162,35 @@ class ParentOfMeasurements(ABC):
             return 0
         return max(map(lambda m: m.dimension, self._measurements))
 
-    def create_datasets(self, data_file: hdf.Data, swept_axes: list[hdf_dataset]):
+    def create_datasets(self, data_file: hdf.Data, swept_axes: list[hdf_dataset], indexed: bool = False):
         """
         Based on the measurements and parent sweeps, create the datasets.
+
+        indexed: If True, a parent sweep is filtered. The datasets are then written at the sweep indices,
+            so the skipped points are not stored at all.
         """
         for measurement in self._measurements:
             measurement_log.debug(f"Creating dataset for {measurement.__str__()}")
-            measurement.create_datasets(data_file, swept_axes)
+            measurement.create_datasets(data_file, swept_axes, indexed)
 
     def run_measurements(self, data_file: hdf.Data, index_list: tuple[int, ...], do_measure: bool = True):
         """
         Run the measurements and handle the acquired data.
-        """
+
+        With qkit.cfg['instrument_io_concurrent'], the measurements declaring different instruments are performed
+        concurrently (see qkit.core.lib.concurrent_io), then stored in order. Measurements of unknown instruments
+        are performed one after the other before.
+        """
+        from qkit.core.lib import concurrent_io
+        known = [m for m in self._measurements if m.instrument is not None]
+        if do_measure and len(known) > 1 and concurrent_io.enabled():
+            results = {id(m): m.acquire(do_measure) for m in self._measurements if m.instrument is None}
+            data = concurrent_io.call_concurrently([functools.partial(m.acquire, do_measure) for m in known],
+                                                   instruments=[m.instrument for m in known])
+            results.update(zip(map(id, known), data))
+            for measurement_type in self._measurements:
+                measurement_type.commit(data_file, index_list, results[id(measurement_type)], do_measure)
+            return
         for measurement_type in self._measurements:
             measurement_type.record(data_file, index_list, do_measure)
 
@@ -237,6 +251,7 @@ class Sweep(ParentOfSweep, ParentOfMeasurements):
         parent_do_measure: If True, the sweep will be run, otherwise it will be skipped. The iterations will still be performed,
             but no settings will be set, and the 'recorded' data will be None. This is necessary to keep the shape of the data consistent.
         """
+        from tqdm.auto import tqdm  # slow to import (ipywidgets)
         sweep, size = self._generate_enumeration(data_file)
         try:
             for index, value, do_measure in tqdm(sweep, desc=self._axis.name, bar_format=bar_format(), total=size, leave=False):
@@ -261,12 +276,14 @@ class Sweep(ParentOfSweep, ParentOfMeasurements):
             # Reset the 'current value',
             self._current_value = None
 
-    def create_datasets(self, data_file: hdf.Data, swept_axes: list[hdf_dataset]):
+    def create_datasets(self, data_file: hdf.Data, swept_axes: list[hdf_dataset], indexed: bool = False):
         measurement_log.debug(f"Dataset creation passing sweep of {self._axis.name}")
         swept_axes.append(self._axis.get_data_axis(data_file))
-        super().create_datasets(data_file, swept_axes)
+        # Points filtered out here, or in a parent sweep, are skipped in all nested datasets.
+        indexed = indexed or self._filter is not None
+        super().create_datasets(data_file, swept_axes, indexed)
         if self._sweep_child is not None:
-            self._sweep_child.create_datasets(data_file, swept_axes)
+            self._sweep_child.create_datasets(data_file, swept_axes, indexed)
 
     def __str__(self):
         setter_name = self._setter.__qualname__
@@ -361,9 +378,13 @@ class DataGenerator(ABC):
     Handles storing data into datasets, and provides the structures for describing the data.
     """
 
-    def store(self, data_file: hdf.Data, data: tuple['MeasurementTypeAdapter.GeneratedData', ...], sweep_indices: tuple[int, ...]):
+    # True if all datasets (including those of the analyses) are indexed, so nothing has to be done for skipped points.
+    _skip_unmeasured: bool = False
+
+    def store(self, data_file: hdf.Data, data: tuple['MeasurementTypeAdapter.GeneratedData', ...], sweep_indices: tuple[int, ...], measured: bool = True):
         """
         Store the generated [data] in the [data_file], while selecting based on the current [sweep_indices].
+        [measured] is False for the placeholder data of points skipped by a filter.
 
         This handles the nuances of qkit store api.
         """
@@ -373,7 +394,7 @@ class DataGenerator(ABC):
             assert isinstance(datum, self.GeneratedData), "Measurement must return a tuple of MeasurementData!"
             # The data is validated on wrapper creation, see GeneratedData.__post_init__
             try:
-                datum.write_data(data_file, sweep_indices)
+                datum.write_data(data_file, sweep_indices, measured)
             except Exception as e:
                 measurement_log.error(f"Failed to store data: {e}", exc_info=e)
                 measurement_log.error(f"Data: {datum.data}")
@@ -382,7 +403,6 @@ class DataGenerator(ABC):
                 measurement_log.error(f"Data file: {data_file}")
                 measurement_log.error(f"")
                 raise e
-        data_file.flush()
 
     @dataclass(frozen=True)
     class DataDescriptor:
@@ -408,25 +428,30 @@ class DataGenerator(ABC):
             """
             return MeasurementTypeAdapter.GeneratedData(self, data=np.asarray(data))
 
-        def create_dataset(self, file: hdf.Data, axes: list[hdf_dataset]) -> hdf_dataset:
+        def create_dataset(self, file: hdf.Data, axes: list[hdf_dataset], indexed: bool = False) -> hdf_dataset:
             """
             Use qkit facility to write to file.
             Axes contains a list of a swept axis.
+            If indexed, the dataset is written at the indices of the swept axes (if all axis lengths are known).
 
             This is the central method for wrapping the discrepancies in the qkit API.
             """
             all_axes: list[hdf_dataset] = axes + list(map(lambda ax: ax.get_data_axis(file), list(self.axes)))
             measurement_log.debug(f"Creating dataset {self.name} with axes {all_axes}")
+            # If all axes are known, the file can allocate the dataset up front.
+            axis_shapes = [ax.get_logical_shape() for ax in all_axes]
+            expected_shape = tuple(s[0] for s in axis_shapes) if None not in axis_shapes else None
+            indexed = len(axes) if indexed and len(axes) > 0 and expected_shape is not None else None
             # The API has different methods, depending on dimensionality, which it then unifies again to a generic case.
             # For political reasons, we have to live with this.
             if len(all_axes) == 0:
                 return file.add_coordinate(name=self.name, unit=self.unit, folder=self.category)
             elif len(all_axes) == 1:
-                return file.add_value_vector(name=self.name,x = all_axes[0], unit=self.unit, folder=self.category)
+                return file.add_value_vector(name=self.name,x = all_axes[0], unit=self.unit, folder=self.category, expected_shape=expected_shape, indexed=indexed)
             elif len(all_axes) == 2:
-                return file.add_value_matrix(name=self.name, x = all_axes[0], y = all_axes[1], unit=self.unit, folder=self.category)
+                return file.add_value_matrix(name=self.name, x = all_axes[0], y = all_axes[1], unit=self.unit, folder=self.category, expected_shape=expected_shape, indexed=indexed)
             elif len(all_axes) == 3:
-                return file.add_value_box(name=self.name, x = all_axes[0], y = all_axes[1], z = all_axes[2], unit=self.unit, folder=self.category)
+                return file.add_value_box(name=self.name, x = all_axes[0], y = all_axes[1], z = all_axes[2], unit=self.unit, folder=self.category, expected_shape=expected_shape, indexed=indexed)
             else:
                 raise NotImplementedError("Qkit Store does not support more than 3 dimensions!")
 
@@ -462,9 +487,11 @@ class DataGenerator(ABC):
             for (i, axis) in enumerate(self.descriptor.axes):
                 assert self.data.shape[i] == len(axis.range), f"Axis {i} ({axis.name}) length ({len(axis.range)}) and data length ({self.data.shape[i]}) mismatch"
 
-        def write_data(self, file: hdf.Data, sweep_indices: tuple[int, ...]):
+        def write_data(self, file: hdf.Data, sweep_indices: tuple[int, ...], measured: bool = True):
             """
             Use qkit store api to actually store the data.
+
+            Indexed datasets only store measured data, at the sweep indices.
             """
             try:
                 ds: hdf_dataset = file.get_dataset(self.descriptor.ds_url)
@@ -472,6 +499,10 @@ class DataGenerator(ABC):
                 measurement_log.error(f"Dataset {self.descriptor.name} not found! (URL: {self.descriptor.ds_url})")
                 raise ke
             assert ds is not None, f"Dataset {self.descriptor.name} not found!"
+            if ds.indexed:
+                if measured:
+                    ds.write_at(self.data, sweep_indices)
+                return
             self._qkit_store_adapter(self.data, ds, sweep_indices)
 
         @staticmethod
@@ -507,11 +538,12 @@ class DataGenerator(ABC):
                     raise NotImplementedError("QKit does not higher than 3 dimensions!")
                 ds.append(data)
                 return
-            else:
-                # Recursively decompose high dimensional data.
-                for i in range(data.shape[0]):
-                    DataGenerator.GeneratedData._qkit_store_adapter(data[i], ds, sweep_indices + (i,))
+            elif len(sweep_indices) + len(data.shape) <= 3:
+                # Whole traces at once, the block starts at the current sweep point.
+                ds.write_slab(data, sweep_indices + (0,) * (len(data.shape) - 1))
                 return
+            else:
+                raise NotImplementedError("QKit does not higher than 3 dimensions!")
             raise NotImplementedError(f"Uncovered State sweep:{len(sweep_indices)}, data:{len(data.shape)}!")
 
 class AnalysisTypeAdapter(DataGenerator, ABC):
@@ -520,7 +552,7 @@ class AnalysisTypeAdapter(DataGenerator, ABC):
 
     Should implement a particular kind of analysis, such as Resonator fitting, numerical derivatives, ...
     """
-    def record(self, data_file: hdf.Data, sweep_indices: tuple[int, ...], measured_data: tuple['MeasurementTypeAdapter.GeneratedData', ...]):
+    def record(self, data_file: hdf.Data, sweep_indices: tuple[int, ...], measured_data: tuple['MeasurementTypeAdapter.GeneratedData', ...], measured: bool = True):
         """
         Perform the analysis and record the results.
         """
@@ -531,18 +563,20 @@ class AnalysisTypeAdapter(DataGenerator, ABC):
             measurement_log.error(f"Analysis failed for {self}: {e}", exc_info=e)
             raise e
         else:
-            self.store(data_file, data, sweep_indices)
+            self.store(data_file, data, sweep_indices, measured)
 
-    def create_datasets(self, data_file: hdf.Data, parent_schema: tuple['MeasurementTypeAdapter.DataDescriptor', ...], swept_axes: list[hdf_dataset]):
+    def create_datasets(self, data_file: hdf.Data, parent_schema: tuple['MeasurementTypeAdapter.DataDescriptor', ...], swept_axes: list[hdf_dataset], indexed: bool = False):
         """
         Create the datasets as described in the schema provided by the child class with [expected_structure].
         """
         descriptors = self.expected_structure(parent_schema)
         assert isinstance(descriptors, tuple), "Expected structure must be a tuple of DataDescriptors!"
+        datasets = []
         for descriptor in descriptors:
             assert isinstance(descriptor, self.DataDescriptor), "Each descriptor must be of type DataDescriptors!"
             measurement_log.debug(f"Creating dataset for Analysis from descriptor for {descriptor.name} with axes {swept_axes}")
-            descriptor.create_dataset(data_file, axes=swept_axes)
+            datasets.append(descriptor.create_dataset(data_file, axes=swept_axes, indexed=indexed))
+        self._skip_unmeasured = all(ds.indexed for ds in datasets)
 
         views = self.default_views(parent_schema)
         assert isinstance(views, dict), "Default views must be a dict of str to DataViews!"
@@ -591,19 +625,21 @@ class MeasurementTypeAdapter(DataGenerator, ABC):
         self._analyses = []
         self._config_hooks = []
 
-    def create_datasets(self, data_file: hdf.Data, swept_axes: list[hdf_dataset]):
+    def create_datasets(self, data_file: hdf.Data, swept_axes: list[hdf_dataset], indexed: bool = False):
         """
         Create the datasets for this kind of measurement. Takes into account
-        swept axes in the measurement tree.
+        swept axes in the measurement tree. If [indexed], points filtered out by
+        a sweep are not stored, see ParentOfMeasurements.create_datasets.
         """
         measurement_log.debug(f"Creating datasets for {type(self).__name__} with swept axes {swept_axes}.")
         self._run_config_hooks()
         exp_structure = self.expected_structure
         assert isinstance(exp_structure, tuple), "Expected structure must be a tuple of DataDescriptors!"
+        datasets = []
         for descriptor in exp_structure:
             assert isinstance(descriptor, self.DataDescriptor), "Each descriptor must be of type DataDescriptors!"
             measurement_log.debug(f"Creating dataset from descriptor for {descriptor.name} with axes {swept_axes}")
-            descriptor.create_dataset(data_file, axes=swept_axes)
+            datasets.append(descriptor.create_dataset(data_file, axes=swept_axes, indexed=indexed))
 
         views = self.default_views
         assert isinstance(views, dict), "Default views must be a dict of str to DataViews!"
@@ -615,7 +651,8 @@ class MeasurementTypeAdapter(DataGenerator, ABC):
 
         for analysis in self._analyses:
             measurement_log.debug(f"Creating analysis datasets for {analysis}.")
-            analysis.create_datasets(data_file, self.expected_structure, swept_axes)
+            analysis.create_datasets(data_file, self.expected_structure, swept_axes, indexed)
+        self._skip_unmeasured = all(ds.indexed for ds in datasets) and all(a._skip_unmeasured for a in self._analyses)
 
     def record(self, data_file: hdf.Data, sweep_indices: tuple[int, ...], do_measurement: bool = True):
         """
@@ -624,27 +661,51 @@ class MeasurementTypeAdapter(DataGenerator, ABC):
         do_measurement: Fs False, the measurement is not performed, and data filled with Nones is returned.
             The analysis is run normaly and must be robust against this.
         """
+        self.commit(data_file, sweep_indices, self.acquire(do_measurement), do_measurement)
+
+    def acquire(self, do_measurement: bool = True) -> Optional[tuple['MeasurementTypeAdapter.GeneratedData', ...]]:
+        """
+        Perform the measurement (the instrument part of record), returns the data or None if nothing is to be stored.
+        May run concurrently with other measurements, see ParentOfMeasurements.run_measurements.
+        """
+        if not do_measurement and self._skip_unmeasured:
+            # Nothing to store for skipped points, the datasets are written at the sweep indices.
+            return None
         if do_measurement:
             self._run_config_hooks()
         try:
             if do_measurement:
-                data = self.perform_measurement()
+                return self.perform_measurement()
             else:
                 # Create None-data for the h5 file.
-                data = tuple(expected.with_data(np.full(expected.shape, None)) for expected in self.expected_structure)
+                return tuple(expected.with_data(np.full(expected.shape, None)) for expected in self.expected_structure)
         except Exception as e:
             measurement_log.error(f"Measurement failed for {type(self).__name__}.", exc_info=e)
             raise e
-        else:
-            try:
-                self.store(data_file, data, sweep_indices)
-            except Exception as e:
-                measurement_log.error(f"Storing data failed for {type(self).__name__}.", exc_info=e)
-                measurement_log.error(f"Data: {data}")
-                measurement_log.error(f"Expected structure: {self.expected_structure}")
-                raise e
-            for analysis in self._analyses:
-                analysis.record(data_file, sweep_indices, data)
+
+    def commit(self, data_file: hdf.Data, sweep_indices: tuple[int, ...], data: Optional[tuple['MeasurementTypeAdapter.GeneratedData', ...]], do_measurement: bool = True):
+        """
+        Store the acquired data and run the analyses (the file part of record).
+        """
+        if data is None:
+            return
+        try:
+            self.store(data_file, data, sweep_indices, do_measurement)
+        except Exception as e:
+            measurement_log.error(f"Storing data failed for {type(self).__name__}.", exc_info=e)
+            measurement_log.error(f"Data: {data}")
+            measurement_log.error(f"Expected structure: {self.expected_structure}")
+            raise e
+        for analysis in self._analyses:
+            analysis.record(data_file, sweep_indices, data, do_measurement)
+
+    @property
+    def instrument(self):
+        """
+        The instrument this measurement talks to, if known. Only measurements declaring different
+        instruments are performed concurrently. None: unknown, performed in the measurement thread.
+        """
+        return None
 
     def _run_config_hooks(self):
         for hook in self._config_hooks:
@@ -734,6 +795,11 @@ class ScalarMeasurement(MeasurementTypeAdapter):
     def perform_measurement(self) -> tuple['MeasurementTypeAdapter.GeneratedData', ...]:
         return (self._descriptor.with_data(self._getter()),)
 
+    @property
+    def instrument(self):
+        from qkit.core.lib.concurrent_io import instrument_of
+        return instrument_of(self._getter)
+
 
 class Experiment(ParentOfSweep, ParentOfMeasurements):
     """
@@ -800,7 +866,7 @@ class Experiment(ParentOfSweep, ParentOfMeasurements):
         measurement_log.info(f"Starting measurement {self._filename} with {self._sample.name}")
         # HDF5 file initialization
         measurement_log.debug(f"Creating HDF5 file {self._filename}")
-        data_file = hdf.Data(name=self._filename, mode='a')
+        data_file = hdf.Data(name=self._filename, mode='a', swmr=qkit.cfg.get('hdf_swmr', False))
         # Create an additional log file:
         measurement_log.debug(f"Creating log file {self._filename}.log")
         log_handler = waf.open_log_file(data_file.get_filepath())
@@ -837,9 +903,9 @@ class Experiment(ParentOfSweep, ParentOfMeasurements):
             measurement_record = data_file.add_textlist(name='measurement', comment='Measurement description')
             measurement_record.append(measurement.get_JSON())
 
-            # All records are created, enter swmr mode
+            # All records are created, enter swmr mode once the measurement datasets exist
             measurement_log.debug("Entering SWMR mode")
-            data_file.swmr = True
+            data_file.start_swmr()
 
             # Open Qviewkit, if desired
             if open_qviewkit:
@@ -849,6 +915,7 @@ class Experiment(ParentOfSweep, ParentOfMeasurements):
                 else:
                     open_datasets: list[str] = [ref.ds_url for ref in open_datasets]
 
+                import qkit.gui.plot.plot as qviewkit  # Who names these things?
                 qviewkit.plot(data_file.get_filepath(), datasets=open_datasets)
 
             # Everything is prepared. Do the actual measurement.
@@ -860,12 +927,12 @@ class Experiment(ParentOfSweep, ParentOfMeasurements):
             traceback.print_exc()
             raise e # Tests must fail
         finally:
-            # Calling into existing plotting code in the background.
-            measurement_log.info("Creating plots...")
-            t = threading.Thread(target=qviewkit.save_plots, args=[data_file.get_filepath(), self._comment])
-            t.start()
             waf.close_log_file(log_handler)
             data_file.close()
+            # Calling into existing plotting code in the background.
+            measurement_log.info("Creating plots...")
+            import qkit.gui.plot.plot as qviewkit
+            qviewkit.save_plots_background(data_file.get_filepath(), self._comment)
             measurement_log.info("Measurement finalized")
             return data_file.get_filepath()
 
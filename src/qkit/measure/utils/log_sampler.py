@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Background sampling of slow log functions.
+
+A log function (e.g. a fridge thermometer) is called at every sweep point
+by default, so a slow readout throttles a fast measurement loop. A
+LogSampler calls it on its own schedule in a background thread instead,
+at most 'rate' times per second. The measurement thread only registers the
+time of each sweep point and collects the samples, it never waits for the
+instrument.
+
+The value of a sweep point is interpolated linearly between the samples
+before and after it, so it is known only once the next sample has been
+taken. Points without a sample within 'max_age' seconds are NaN. When the
+newest sample is older than max_age at a sweep point, the sampler is woken
+up to sample right away, so the values stay fresh also for slow rates.
+
+Usage:
+    sampler = LogSampler(ivd.get_T_MXC, rate=0.2, max_age=10)
+    sampler.start()
+    for x in x_vec:
+        ...
+        samples, values = sampler.update()  # new (time, value) samples and the values of resolved points
+    samples, values = sampler.finish()
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+
+
+class LogSampler(object):
+    """
+    Samples 'func' in a background thread and interpolates the samples onto sweep points.
+
+    Args:
+        func: log function returning a float.
+        rate: maximum number of samples per second.
+        max_age: maximum distance (s) of a sweep point to the samples used for its value, default 2 / rate.
+        name: name of the thread.
+    """
+
+    def __init__(self, func, rate, max_age=None, name=None):
+        if rate is None or rate <= 0:
+            logging.error("LogSampler: rate must be positive, got {!r}".format(rate))
+            raise ValueError
+        self.func = func
+        self.interval = 1. / rate
+        self.max_age = max_age if max_age is not None else 2. * self.interval
+        self.name = name or getattr(func, '__name__', 'log function')
+        self._new = []  # samples not collected by update() yet
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._failed = False
+        # only used by the measurement thread
+        self._times = []
+        self._values = []
+        self._pending = []
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log sampler " + self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.time()
+            try:
+                value = float(self.func())
+            except Exception as e:
+                if not self._failed:  # log only the first failure
+                    logging.error("LogSampler: {} failed: {!r}".format(self.name, e))
+                self._failed = True
+                value = np.nan
+            end = time.time()
+            with self._cond:
+                self._new.append((0.5 * (start + end), value))
+                self._cond.notify_all()
+            self._wake.wait(max(0., self.interval - (end - start)))
+            self._wake.clear()
+
+    def request(self):
+        """ wakes the sampler to sample right away """
+        self._wake.set()
+
+    def _collect(self):
+        with self._cond:
+            new, self._new = self._new, []
+        for t, value in new:
+            self._times.append(t)
+            self._values.append(value)
+        return new
+
+    def _value_at(self, t):
+        times = self._times
+        if times and times[0] <= t <= times[-1]:
+            return float(np.interp(t, times, self._values))
+        # outside of the sampled interval: the nearest sample, if it is recent enough
+        if times and min(abs(t - times[0]), abs(t - times[-1])) <= self.max_age:
+            return self._values[0] if t < times[0] else self._values[-1]
+        return np.nan
+
+    def _resolve(self, final=False):
+        values = []
+        while self._pending and (final or (self._times and self._pending[0] <= self._times[-1])):
+            values.append(self._value_at(self._pending.pop(0)))
+        return values
+
+    def update(self, t=None):
+        """
+        Registers a sweep point at time t (default: now) and collects the new samples.
+
+        Returns:
+            (samples, values): the new samples [(time, value)] and the interpolated values of the sweep
+            points which have a sample after them now, in the order of the points.
+        """
+        new = self._collect()
+        t = time.time() if t is None else t
+        self._pending.append(t)
+        if not self._times or t - self._times[-1] > self.max_age:
+            self.request()
+        return new, self._resolve()
+
+    def finish(self):
+        """
+        Waits (at most max_age) for a sample after the last sweep point, stops the thread and
+        returns the remaining samples and values, see update().
+        """
+        if self._pending:
+            deadline = time.time() + self.max_age
+            self.request()
+            with self._cond:
+                while not any(t >= self._pending[-1] for t, _ in self._new) and \
+                        not (self._times and self._times[-1] >= self._pending[-1]):
+                    remaining = deadline - time.time()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        break
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + self.max_age)
+        new = self._collect()
+        return new, self._resolve(final=True)
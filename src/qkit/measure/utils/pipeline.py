@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Background consumer for the bookkeeping of measurement loops.
+
+The measurement thread only drives the instruments (set, trigger, wait,
+fetch) and hands everything else, i.e. appending the data to the h5 file,
+live fits and progress bars, to a consumer thread through a bounded queue.
+The next point is set and triggered while the previous trace is still
+written. The queue bound keeps the consumer at most 'depth' points behind,
+so memory stays bounded and the file lags the instrument only slightly.
+
+The tasks are executed in the order they are put, so all writes of a file
+can go through the pipeline without locking. An exception in a task stops
+the consumer and is raised in the measurement thread by the next put() or
+by close().
+
+Usage:
+    with Pipeline(depth=4) as pipe:
+        for x in x_vec:
+            x_set_obj(x)
+            data = vna.get_tracedata()
+            pipe.put(ds.append, data)
+"""
+import logging
+import threading
+from queue import Queue, Full
+
+import qkit
+
+
+class Pipeline(object):
+    """
+    Executes tasks put by the measurement thread on a consumer thread, in order.
+
+    Args:
+        depth: maximum number of pending tasks, put() blocks when the queue is full.
+            Default qkit.cfg['measure_pipeline_depth'] or 4.
+        name: name of the consumer thread.
+    """
+
+    def __init__(self, depth=None, name="measurement pipeline"):
+        self.depth = depth or qkit.cfg.get('measure_pipeline_depth', 4)
+        self._queue = Queue(maxsize=self.depth)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._consume, name=name, daemon=True)
+        self._thread.start()
+
+    def _consume(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                if self._error is None:  # after an error, the remaining tasks are dropped
+                    func, args, kwargs = task
+                    func(*args, **kwargs)
+            except BaseException as e:
+                logging.error("pipeline: {} failed: {!r}".format(getattr(task[0], '__name__', task[0]), e))
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def put(self, func, *args, **kwargs):
+        """
+        Queues func(*args, **kwargs). Blocks while 'depth' tasks are pending.
+        Raises the exception of a previously failed task.
+        """
+        if self._closed:
+            logging.error("pipeline: put() after close()")
+            raise ValueError
+        self._raise()
+        while True:
+            try:
+                self._queue.put((func, args, kwargs), timeout=0.1)
+                return
+            except Full:
+                # the consumer may have failed while we were waiting
+                self._raise()
+
+    def pending(self):
+        """ number of tasks not executed yet """
+        return self._queue.unfinished_tasks
+
+    def join(self):
+        """ waits until all queued tasks are executed and raises the exception of a failed task """
+        self._queue.join()
+        self._raise()
+
+    def close(self):
+        """ executes the pending tasks, stops the consumer thread and raises the exception of a failed task """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+        self._raise()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # keep the original exception, but still write what has been measured
+            try:
+                self.close()
+            except Exception as e:
+                logging.error("pipeline: {!r} after {!r}".format(e, exc_value))
+        return False
+
+
+class Immediate(object):
+    """ Executes the tasks right away in the measurement thread, the serial counterpart of Pipeline. """
+
+    depth = 0
+
+    def put(self, func, *args, **kwargs):
+        func(*args, **kwargs)
+
+    def pending(self):
+        return 0
+
+    def join(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
@@ -908,10 +908,8 @@ class SputterMonitor(object):
         print(self._data_file.get_filepath())
         # qviewkit.save_plots(self._data_file.get_filepath(),comment=self._plot_comment)
         # #old version where we have to wait for the plots
-        t = threading.Thread(target=qviewkit.save_plots,
-                             args=[self._data_file.get_filepath(), self._plot_comment])
-        t.start()
         self._data_file.close_file()
+        qviewkit.save_plots_background(self._data_file.get_filepath(), self._plot_comment)
         waf.close_log_file(self._log)
         self.dirname = None
 
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the chunk layouts and compression filters of qkit datasets.
+
+Writes a matrix trace by trace through store.Data, like a measurement does,
+and reads single rows (traces) and columns (the y-trace view of qviewkit)
+back. For every combination of layout and filter it reports the write
+throughput, the mean row and column read latency and the file size.
+'legacy' is the former fixed chunk shape (5, tracelength).
+
+Usage:
+    python -m qkit.storage.hdf_benchmark --rows 2000 --tracelength 1001
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import h5py
+import numpy as np
+
+from qkit.storage.store import Data
+from qkit.storage.hdf_chunking import hdf5plugin
+from qkit.storage.hdf_file import file_kwargs
+
+
+def _signal(rows, tracelength):
+    """Smooth resonance-like traces with noise, as float32."""
+    f = np.linspace(-1, 1, tracelength)
+    x = np.linspace(0, 1, rows)[:, None]
+    trace = 1. / (1 + ((f - 0.5 * np.sin(6 * x)) / 0.05) ** 2)
+    return (trace + 0.01 * np.random.randn(rows, tracelength)).astype(np.float32)
+
+
+def run_case(path, data, chunks, compression, reads=50):
+    """Writes 'data' with the given chunk layout and filter to 'path' and reads it back.
+
+    Returns:
+        dict with the write throughput (MB/s), mean row and column read latency (ms) and the file size (MB).
+    """
+    rows, tracelength = data.shape
+    t0 = time.perf_counter()
+    datafile = Data(path, mode="w")
+    x = datafile.add_coordinate("x")
+    x.add(np.arange(rows))
+    y = datafile.add_coordinate("y")
+    y.add(np.arange(tracelength))
+    matrix = datafile.add_value_matrix("matrix", x, y, chunks=chunks, compression=compression,
+                                       expected_shape=(rows, tracelength))
+    for row in data:
+        matrix.append(row)
+    datafile.close()
+    write = time.perf_counter() - t0
+
+    rng = np.random.default_rng(0)
+    with h5py.File(path, "r", **file_kwargs) as f:
+        ds = f["/entry/data0/matrix"]
+        t0 = time.perf_counter()
+        for i in rng.integers(0, rows, reads):
+            ds[i, :]
+        row_read = (time.perf_counter() - t0) / reads
+        t0 = time.perf_counter()
+        for j in rng.integers(0, tracelength, reads):
+            ds[:, j]
+        column_read = (time.perf_counter() - t0) / reads
+    return {'write_MBps': data.nbytes / 2. ** 20 / write,
+            'row_ms': 1e3 * row_read,
+            'column_ms': 1e3 * column_read,
+            'size_MB': os.path.getsize(path) / 2. ** 20}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=2000, help="number of appended traces")
+    parser.add_argument("--tracelength", type=int, default=1001, help="points per trace")
+    parser.add_argument("--reads", type=int, default=50, help="number of row and column reads")
+    args = parser.parse_args(argv)
+
+    data = _signal(args.rows, args.tracelength)
+    layouts = [("legacy", (5, args.tracelength)), ("rows", "rows"), ("balanced", "balanced")]
+    filters = [None, "gzip", "lzf"] + (["blosc"] if hdf5plugin is not None else [])
+    print("%d traces of %d points (%.1f MB)" % (args.rows, args.tracelength, data.nbytes / 2. ** 20))
+    print("%-10s %-6s %8s %12s %10s %12s %9s" % ("layout", "filter", "chunks", "write MB/s", "row ms", "column ms", "size MB"))
+    tmp = tempfile.mkdtemp()
+    try:
+        for name, chunks in layouts:
+            for compression in filters:
+                path = os.path.join(tmp, "%s_%s.h5" % (name, compression))
+                result = run_case(path, data, chunks, compression, args.reads)
+                with h5py.File(path, "r", **file_kwargs) as f:
+                    shape = "x".join(str(c) for c in f["/entry/data0/matrix"].chunks)
+                print("%-10s %-6s %8s %12.1f %10.3f %12.3f %9.2f" % (name, compression or "-", shape, result['write_MBps'],
+                                                                     result['row_ms'], result['column_ms'], result['size_MB']))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Chunk shapes and compression filters of the qkit datasets.
+
+All datasets grow and are therefore chunked. The chunk shape is derived from
+a target chunk size in bytes and the (expected) lengths of the axes:
+    'rows': whole traces, as many as fit into the target size. Appends and
+        trace (row) reads touch a single chunk, column reads touch every
+        chunk of the dataset.
+    'balanced': the chunk has the aspect ratio of the expected shape, so
+        row and column reads (e.g. the y-trace view of qviewkit) touch about
+        the same number of chunks. A trace append touches several chunks.
+    tuple: the chunk shape itself.
+The chunks never exceed the expected length of an axis. Axes whose length
+is not known in advance (no 'expected_shape') get chunks of at most
+UNKNOWN_LENGTH, 1D datasets of unknown length the h5py default. Datasets
+filled point by point (tracelength 1) use 'balanced' chunks.
+
+The lossless filters 'gzip' (optionally with a level, e.g. 'gzip:6') and
+'lzf' are used together with the shuffle filter. 'blosc' requires the
+package hdf5plugin, which also has to be installed for reading such files.
+
+Used qkit.cfg entries (defaults for all datasets, can be set per dataset
+with the 'chunks' and 'compression' keyword arguments of add_value_...):
+    hdf_chunking: 'rows' (default) or 'balanced'
+    hdf_chunk_bytes: target chunk size in bytes, default: 64 KiB
+    hdf_compression: None (default), 'gzip', 'gzip:<level>', 'lzf' or 'blosc'
+"""
+import logging
+
+import numpy as np
+
+import qkit
+
+try:
+    # registers the blosc filter with h5py, also for reading
+    import hdf5plugin
+except ImportError:
+    hdf5plugin = None
+
+LAYOUTS = ('rows', 'balanced')
+UNKNOWN_LENGTH = 64  # chunk length of the axes without an expected length
+COMPRESSIONS = ('gzip', 'lzf', 'blosc')
+
+
+def chunk_shape(tracelength, dim, itemsize=4, expected_shape=None, layout=None, target_bytes=None):
+    """Returns the chunk shape of a dataset with 'dim' dimensions.
+
+    Args:
+        tracelength: length of the innermost axis (the appended traces) of 2D and 3D datasets.
+        dim: number of dimensions.
+        itemsize: bytes per value.
+        expected_shape: Optional tuple with the final shape, if known.
+        layout: 'rows', 'balanced' or a tuple, default: qkit.cfg['hdf_chunking'] or 'rows'.
+        target_bytes: chunk size, default: qkit.cfg['hdf_chunk_bytes'] or 64 KiB.
+    Returns:
+        Tuple with the chunk shape, or True (h5py auto-chunking) for 1D datasets of unknown length.
+    """
+    if layout is None:
+        layout = qkit.cfg.get('hdf_chunking', 'rows')
+    if target_bytes is None:
+        target_bytes = qkit.cfg.get('hdf_chunk_bytes', 2 ** 16)
+    if isinstance(layout, (tuple, list)):
+        if len(layout) != dim:
+            logging.error("Chunking: chunk shape %s does not match %d dimensions." % (layout, dim))
+            raise ValueError
+        return tuple(int(c) for c in layout)
+    if layout not in LAYOUTS:
+        logging.error("Chunking: unknown layout '%s', use one of %s or a tuple." % (layout, LAYOUTS))
+        raise ValueError
+
+    elements = max(1, int(target_bytes) // max(1, int(itemsize)))
+    if expected_shape is None or len(expected_shape) != dim:
+        expected_shape = (None,) * dim
+    if dim == 1:
+        if not expected_shape[0]:
+            return True  # length unknown, h5py chooses a small chunk
+        return (max(1, min(elements, int(expected_shape[0]))),)
+
+    if not expected_shape[-1] and tracelength <= 1:
+        # appended point by point, the trace grows as well
+        layout = 'balanced'
+        tracelength = UNKNOWN_LENGTH
+    tracelength = max(1, int(expected_shape[-1] or tracelength))
+    if layout == 'rows':
+        chunks = [min(tracelength, elements)]
+        rest = max(1, elements // chunks[0])
+        # fill the axes from the inside out, the traces are appended along the second last axis
+        for n in reversed(expected_shape[:-1]):
+            chunks.insert(0, max(1, min(n or UNKNOWN_LENGTH, rest)))
+            rest = max(1, rest // chunks[0])
+        return tuple(chunks)
+
+    # 'balanced': shrink all axes by the same factor, axes reaching length 1 are taken out
+    lengths = [int(n) if n else min(tracelength, UNKNOWN_LENGTH) for n in expected_shape[:-1]] + [tracelength]
+    chunks = [None] * dim
+    free = list(range(dim))
+    while free:
+        scale = (elements / float(np.prod([lengths[i] for i in free]))) ** (1. / len(free))
+        if scale >= 1:
+            for i in free:
+                chunks[i] = lengths[i]
+            break
+        short = [i for i in free if lengths[i] * scale < 1]
+        if not short:
+            for i in free:
+                chunks[i] = max(1, int(lengths[i] * scale))
+            break
+        for i in short:
+            chunks[i] = 1
+            free.remove(i)
+    return tuple(chunks)
+
+
+def filter_kwargs(compression=None):
+    """Returns the h5py create_dataset() keyword arguments of a compression filter.
+
+    Args:
+        compression: None, 'gzip', 'gzip:<level>', 'lzf' or 'blosc',
+            default: qkit.cfg['hdf_compression'] or None (no compression).
+    """
+    if compression is None:
+        compression = qkit.cfg.get('hdf_compression', None)
+    if not compression:
+        return {}
+    name, _, opts = str(compression).partition(':')
+    if name == 'gzip':
+        return dict(compression='gzip', compression_opts=int(opts) if opts else 4, shuffle=True)
+    if name == 'lzf':
+        return dict(compression='lzf', shuffle=True)
+    if name == 'blosc':
+        if hdf5plugin is None:
+            logging.warning("Compression: blosc requires the package hdf5plugin, using gzip instead.")
+            return filter_kwargs('gzip')
+        return dict(hdf5plugin.Blosc(cname=opts or 'lz4', clevel=5, shuffle=hdf5plugin.Blosc.SHUFFLE))
+    logging.error("Compression: unknown filter '%s', use one of %s." % (compression, COMPRESSIONS))
+    raise ValueError
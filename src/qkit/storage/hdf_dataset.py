@@ -47,6 +47,9 @@ class hdf_dataset(object):
         self.meta = meta
         self.dim = self.meta.pop('dim', None)
         self.dtype = self.meta.pop('dtype','f')
+        self.expected_shape = self.meta.pop('expected_shape', None)
+        # number of leading axes written at arbitrary indices with write_at(), see there
+        self.indexed = self.meta.pop('indexed', None)
         self.ds_type = ds_type
         self._next_matrix = False
         self._save_timestamp = save_timestamp
@@ -69,6 +72,7 @@ class hdf_dataset(object):
         self.comment = comment
         # the first dataset is used to extract a few attributes
         self.first = True
+        self.hf.announce_dataset(self.ds_url)
 
     def _read_ds_from_hdf(self,ds_url):
         self.ds = self.hf[str(ds_url)]
@@ -76,6 +80,8 @@ class hdf_dataset(object):
         for attr in self.ds.attrs.keys():
             val = self.ds.attrs.get(attr)
             setattr(self,attr,val)
+        if self.indexed:
+            self.ds_mask = self.hf[self.ds.attrs['mask_ds_url']]
         
         self.ds_url =  ds_url
         
@@ -104,6 +110,8 @@ class hdf_dataset(object):
         Data is added one datapoint (vector) or one dataline (matrix, box) at a
         time. The data is cast to numpy arrays if possible and appended to the
         existing dataset. A timestamp-dataset is also recorded here.
+        If the file has a write buffer, the data is staged in memory and 
+        written according to the file's FlushPolicy.
 
         Args:
             data: any data to be appended to the dataset
@@ -121,30 +129,142 @@ class hdf_dataset(object):
             data = numpy.atleast_1d(numpy.array(data,dtype=self.dtype))
         # at this point the reference data should be around
         if self.first:
-            self.first = False
             if self.ds_type == ds_types['txt']:
-                tracelength = 0
+                self._create_ds(0)
             else:
-                tracelength = len(data)
-            ## tracelength is used so far only for multi-dimensional datasets to chunk needed memory
-            self.ds = self.hf.create_dataset(self.name,tracelength,
-                                             folder=self.folder,
-                                             dim = self.dim,
-                                             ds_type = self.ds_type,
-                                             dtype = self.dtype,
-                                             **self.meta)
-            self._setup_metadata()
-            if self._save_timestamp:
-                self._create_timestamp_ds()
+                self._create_ds(len(data))
 
         self.hf.append(self.ds, data, next_matrix=self._next_matrix, reset=reset, pointwise=pointwise)
         if self._save_timestamp:
-            self.hf.append(self.ds_ts, numpy.array([time.time()]), next_matrix=self._next_matrix, reset=reset)
+            # the timestamps of a box form a (x, y) matrix, filled point by point
+            self.hf.append(self.ds_ts, numpy.array([time.time()]), next_matrix=self._next_matrix, reset=reset,
+                           pointwise=self.ds_type == ds_types['box'])
         if self._next_matrix:
             self._next_matrix = False
-
-        self.hf.flush()
             
+    def _create_ds(self, tracelength):
+        """Creates the dataset in the file, which is postponed until the first data arrives."""
+        self.first = False
+        ## tracelength is used so far only for multi-dimensional datasets to chunk needed memory
+        self.ds = self.hf.create_dataset(self.name,tracelength,
+                                         folder=self.folder,
+                                         dim = self.dim,
+                                         ds_type = self.ds_type,
+                                         dtype = self.dtype,
+                                         expected_shape = self.expected_shape,
+                                         indexed = bool(self.indexed),
+                                         **self.meta)
+        self._setup_metadata()
+        if self._save_timestamp:
+            self._create_timestamp_ds()
+        if self.indexed:
+            self._create_mask_ds()
+        self.hf.dataset_created(self.ds_url)
+
+    def write_slab(self, data, index):
+        """Writes a block of traces to a matrix or box dataset with a single write.
+
+        The block 'data' holds whole traces and covers the innermost axes of
+        the dataset, e.g. a (n, tracelength) block in a box fills n traces of
+        one matrix. 'index' gives the position of its first trace along the
+        outer axes, e.g. (x, y) for a box. The dataset grows as needed, the
+        fill attribute and the timestamps (if saved) are updated as if the
+        traces had been appended one by one. Like write_at, the file is
+        flushed according to the FlushPolicy of the write buffer.
+
+        Args:
+            data: array-like block with 1 to dim dimensions.
+            index: tuple with the position of the first trace, one entry per outer axis.
+        """
+        if self.ds_type not in (ds_types['matrix'], ds_types['box']):
+            logging.error("write_slab is only for matrix and box datasets, please use append.")
+            raise ValueError
+        data = numpy.asarray(data, dtype=self.dtype)
+        index = tuple(int(i) for i in index)
+        if len(index) != self.dim - 1 or not 1 <= data.ndim <= self.dim:
+            logging.error("write_slab: block of shape %s at index %s does not fit into a %d dim dataset." % (data.shape, index, self.dim))
+            raise ValueError
+        block = data.reshape((1,) * (self.dim - data.ndim) + data.shape)
+        if self.first:
+            self._create_ds(block.shape[-1])
+        self.hf.write_slab(self.ds, block, index + (0,))
+        if self._save_timestamp:
+            self.hf.write_slab(self.ds_ts, numpy.full(block.shape[:-1], time.time()), index)
+        self._next_matrix = False
+
+    def write_at(self, data, index):
+        """Writes the data of a single sweep point at arbitrary indices.
+
+        Requires a dataset created with 'indexed' (the number of swept axes)
+        and an 'expected_shape'. It is allocated at its full shape and filled
+        with NaN, only the points written here are stored in the file. The
+        mask dataset ('<name>_mask', uint8 over the swept axes) marks the
+        written points, so skipped points are told apart from measured NaNs
+        and cost neither I/O nor CPU. The attribute 'written' counts the
+        calls, for viewers polling the file for changes. The file is flushed
+        according to the FlushPolicy of the write buffer, if any, otherwise on
+        the next append, flush or close.
+
+        Args:
+            data: scalar or array with the shape of the remaining axes.
+            index: tuple with one index per swept axis.
+        """
+        if not self.indexed:
+            logging.error("write_at needs a dataset created with 'indexed' and 'expected_shape', please use append.")
+            raise ValueError
+        data = numpy.asarray(data, dtype=self.dtype)
+        index = tuple(int(i) for i in index)
+        dim = self.dim if self.first else len(self.ds.shape)
+        if len(index) != self.indexed or len(index) + data.ndim != dim:
+            logging.error("write_at: data of shape %s at index %s does not fit into a %d dim dataset with %d swept axes."
+                          % (data.shape, index, dim, self.indexed))
+            raise ValueError
+        if self.first:
+            self._create_ds(data.shape[-1] if data.ndim else 1)
+        self.hf.write_slab(self.ds, data.reshape((1,) * len(index) + data.shape), index + (0,) * data.ndim)
+        self.hf.write_slab(self.ds_mask, numpy.ones((1,) * len(index), dtype=numpy.uint8), index)
+        if self._save_timestamp:
+            ts_index = index[:len(self.ds_ts.shape)]
+            self.hf.write_slab(self.ds_ts, numpy.full((1,) * len(ts_index), time.time()), ts_index)
+        # the shape does not change, the count tells viewers that the dataset did
+        self.ds.attrs.modify('written', self.ds.attrs['written'] + 1)
+
+    def append_block(self, data):
+        """Appends a block of traces at once, as if each trace was given to append().
+
+        For a matrix, the rows of the 2dim 'data' are appended. For a box, a
+        2dim block is appended to the current matrix (or the next one after
+        next_matrix()), a 3dim block adds new matrices. Vectors take the data
+        as it is, see append().
+        """
+        if self.ds_type not in (ds_types['matrix'], ds_types['box']):
+            return self.append(data)
+        data = numpy.asarray(data, dtype=self.dtype)
+        if self.first:
+            fill = [0, 0, 0]
+        else:
+            # writes the staged appends of the dataset, so its fill is up to date
+            self.hf.logical_shape(self.ds)
+            fill = self.ds.attrs.get('fill')
+        if self.ds_type == ds_types['matrix']:
+            index = (fill[0],)
+        elif data.ndim == 3 or self._next_matrix:
+            index = (fill[0], 0)
+        else:
+            index = (max(fill[0] - 1, 0), fill[1])
+        self.write_slab(data, index)
+
+    def get_logical_shape(self):
+        """Returns the shape of the valid data in the dataset.
+        
+        This excludes capacity pre-allocated by the H5_file and includes data
+        still staged in its write buffer. None, if the dataset has not been
+        created in the file yet.
+        """
+        if self.first:
+            return None
+        return self.hf.logical_shape(self.ds)
+
     def add(self,data):
         """Function to save a 1dim dataset once.
         
@@ -169,7 +289,10 @@ class hdf_dataset(object):
             ds_types['matrix']: ds_types['vector'],
             ds_types['box']: ds_types['matrix']
         }[self.ds_type]
-        self.ds_ts = self.hf.create_dataset(self.name + '_ts', tracelength=1, folder=self.folder, dim=max(self.dim - 1, 1), dtype='float64', ds_type=ds_type)
+        dim = max(self.dim - 1, 1)
+        expected_shape = self.expected_shape[:dim] if self.expected_shape is not None else None
+        self.ds_ts = self.hf.create_dataset(self.name + '_ts', tracelength=1, folder=self.folder, dim=dim, dtype='float64', ds_type=ds_type,
+                                            expected_shape=expected_shape, indexed=bool(self.indexed))
         self.ds_ts.attrs.create('name', 'measurement_time'.encode())       
         self.ds_ts.attrs.create('unit', 's'.encode())
         if self.ds_type == ds_types['matrix']:
@@ -177,6 +300,19 @@ class hdf_dataset(object):
         if self.ds_type == ds_types['box']:
             self.ds_ts.attrs.create("x_ds_url",self.ds.attrs.get('x_ds_url', ''))
             self.ds_ts.attrs.create("y_ds_url",self.ds.attrs.get('y_ds_url', ''))
+
+    def _create_mask_ds(self):
+        """Creates the mask of the points written with write_at() (1: written, 0: skipped)."""
+        ds_type = {1: ds_types['vector'], 2: ds_types['matrix'], 3: ds_types['box']}[self.indexed]
+        self.ds_mask = self.hf.create_dataset(self.name + '_mask', tracelength=1, folder=self.folder, dim=self.indexed, dtype='uint8',
+                                              ds_type=ds_type, expected_shape=self.expected_shape[:self.indexed], indexed=True,
+                                              fillvalue=0, chunks='balanced')
+        self.ds_mask.attrs.create('name', 'written'.encode())
+        for axis in ("x_ds_url", "y_ds_url", "z_ds_url")[:self.indexed]:
+            self.ds_mask.attrs.create(axis, self.ds.attrs.get(axis, b''))
+        self.ds.attrs.create('mask_ds_url', self.ds_mask.name.encode())
+        self.ds.attrs.create('indexed', self.indexed)
+        self.ds.attrs.create('written', 0)
     """
     def __getitem__(self, name):
         return self.hf[name]
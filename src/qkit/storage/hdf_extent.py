@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Reader side of pre-allocated datasets.
+
+If a file is written with a growth factor (see H5_file), datasets can be
+larger than the data written so far. The valid extent is then stored in the
+'logical_shape' attribute of the dataset. Readers should not access the raw
+h5py dataset but use valid_view(), which behaves like the dataset clipped to
+its logical shape.
+Datasets of files opened as SWMR reader are refreshed by valid_view(), so
+readers can keep such files open and still see appended data.
+"""
+import numpy as np
+
+
+def logical_shape(ds):
+    """Returns the shape of the valid data in the h5py dataset 'ds'."""
+    shape = ds.attrs.get('logical_shape', None)
+    if shape is None:
+        return ds.shape
+    return tuple(int(n) for n in shape)
+
+
+def refresh(ds):
+    """Updates the shape and attributes of 'ds' if it is read from a file in SWMR mode."""
+    f = getattr(ds, 'file', None)
+    if f is not None and f.mode == 'r' and f.swmr_mode:
+        ds.refresh()
+
+
+def valid_view(ds):
+    """Returns 'ds' clipped to its logical shape.
+
+    For datasets without over-allocation (the default), 'ds' is returned as
+    it is, so this is cheap to call for every dataset.
+    """
+    if ds is None or not hasattr(ds, 'shape'):
+        return ds
+    refresh(ds)
+    shape = logical_shape(ds)
+    if shape == ds.shape:
+        return ds
+    return LogicalView(ds, shape)
+
+
+class LogicalView(object):
+    """Read-only h5py dataset look-alike restricted to the logical shape.
+
+    Indexing with integers, slices and Ellipsis is translated into a
+    selection of the underlying dataset, so only the requested part is read
+    from the file. All other attributes are forwarded to the dataset.
+    """
+
+    def __init__(self, ds, shape):
+        self._ds = ds
+        self.shape = shape
+
+    def __getattr__(self, name):
+        return getattr(self._ds, name)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[()]
+        return data if dtype is None else data.astype(dtype)
+
+    # properties like in h5py, so attributes set on the instance can not shadow them
+    @property
+    def name(self):
+        return self._ds.name
+
+    @property
+    def attrs(self):
+        return self._ds.attrs
+
+    @property
+    def file(self):
+        return self._ds.file
+
+    @property
+    def dtype(self):
+        return self._ds.dtype
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        selection = _clip_key(key, self.shape)
+        if selection is None:
+            # fancy indexing or negative steps are not supported by h5py, select in numpy
+            return self._ds[tuple(slice(0, n) for n in self.shape)][key]
+        return self._ds[selection]
+
+    def __repr__(self):
+        return "<LogicalView %s of %r>" % (self.shape, self._ds)
+
+
+def _clip_key(key, shape):
+    """Translates an index 'key' on the logical shape into a selection of the dataset.
+
+    Returns None if the key can not be expressed as a h5py hyperslab.
+    """
+    if any(k is Ellipsis for k in key):
+        i = [k is Ellipsis for k in key].index(True)
+        key = key[:i] + (slice(None),) * (len(shape) - len(key) + 1) + key[i + 1:]
+    if len(key) > len(shape):
+        raise IndexError("too many indices for dataset of shape %s" % (shape,))
+    selection = []
+    for k, n in zip(key, shape):
+        if isinstance(k, slice):
+            start, stop, step = k.indices(n)
+            if step < 0:
+                return None
+            selection.append(slice(start, max(start, stop), step))
+        elif isinstance(k, (int, np.integer)):
+            i = k + n if k < 0 else k
+            if not 0 <= i < n:
+                raise IndexError("index %d is out of bounds for axis with size %d" % (k, n))
+            selection.append(int(i))
+        else:
+            return None
+    selection += [slice(0, n) for n in shape[len(key):]]
+    return tuple(selection)
@@ -11,6 +11,8 @@ import h5py
 import numpy as np
 import qkit
 from qkit.storage.hdf_constants import ds_types
+from qkit.storage.hdf_chunking import chunk_shape, filter_kwargs
+from qkit.storage.hdf_write_buffer import WriteBuffer
 from packaging.version import Version
 
 file_kwargs = dict()
@@ -32,12 +34,29 @@ class H5_file(object):
     trick of placing added data in the correct position in the dataset.
     """    
     
-    def __init__(self,output_file, mode,**kw):
+    def __init__(self,output_file, mode, flush_policy=None, growth_factor=None, swmr=False, **kw):
         """Inits the H5_file at the path 'output_file' with the access mode
         'mode'
+
+        If a FlushPolicy is given as 'flush_policy', appends are staged in a
+        write-behind buffer and written in bulk according to the policy.
+        If a 'growth_factor' is given, datasets are not resized for every
+        append but their capacity is over-allocated by this factor. The valid
+        extent is stored in the 'logical_shape' attribute of the dataset and
+        the datasets are trimmed to it in close_file().
+        With 'swmr', the file is created in the latest file format, which is
+        required to switch to single-writer/multiple-reader mode with
+        start_swmr().
         """
-        self.create_file(output_file, mode)
+        self.create_file(output_file, mode, swmr=swmr)
         self.newfile = False
+        self.write_buffer = WriteBuffer(self, flush_policy) if flush_policy is not None else None
+        self.growth_factor = growth_factor
+        # logical shape of the datasets by h5 path, None for datasets without over-allocation
+        self._logical_shapes = {}
+        # datasets announced by hdf_dataset but not yet created, see start_swmr()
+        self._pending_datasets = set()
+        self._swmr_requested = False
         
         if self.hf.attrs.get("qt-file",None) or self.hf.attrs.get("qkit",None):
             "File existed before and was created by qkit."
@@ -50,9 +69,15 @@ class H5_file(object):
             # set all standard attributes
             for k in kw:
                 self.grp.attrs[k] = kw[k]
+            if swmr:
+                # tells readers when they can keep the file open, see start_swmr()
+                self.entry.attrs.create("swmr", False)
         
-    def create_file(self,output_file, mode):
-        self.hf = h5py.File(output_file, mode,**file_kwargs )
+    def create_file(self,output_file, mode, swmr=False):
+        if swmr and mode != 'r':
+            self.hf = h5py.File(output_file, mode, libver='latest', **file_kwargs)
+        else:
+            self.hf = h5py.File(output_file, mode,**file_kwargs )
 
     def set_base_attributes(self):
         "stores some attributes and creates the default data group"
@@ -86,7 +111,7 @@ class H5_file(object):
         self.vgrp = self.entry.require_group("views")
         
     def create_dataset(self,name, tracelength, ds_type = ds_types['vector'],
-                       folder = "data", dim = 1, **kwargs):
+                       folder = "data", dim = 1, expected_shape = None, indexed = False, **kwargs):
         """Dataset for one, two, and three dimensional data
         
             Args:
@@ -100,27 +125,30 @@ class H5_file(object):
                     and are simply appended to the trace array
             
                 'folder' is a optional group relative to the default group
+
+                'expected_shape' is the final shape of the dataset, if known.
+                    With a growth_factor set, this capacity is allocated up front.
+                    It is also used to choose the chunk shape.
+
+                'chunks' is the chunk layout ('rows', 'balanced' or a tuple) and
+                'compression' the lossless filter (None, 'gzip', 'lzf' or 'blosc'),
+                    default: qkit.cfg['hdf_chunking'] and qkit.cfg['hdf_compression'],
+                    see hdf_chunking.
+
+                'indexed' creates the dataset at its full 'expected_shape' right
+                    away, to be written at arbitrary indices with write_slab().
+                    Points never written are not stored and read as the fill value.
+
+                'fillvalue' of the non-text datasets, default: NaN
             
                 'kwargs' are appended as attributes to the dataset
         """
 
         self.ds_type = ds_type
         
-        if dim == 1:
-            shape    = (0,)
-            maxshape = (None,)
-            chunks=True
-            
-        elif dim == 2:
-            shape    = (0,0)
-            maxshape = (None,None)
-            chunks=(5, tracelength)
-            
-        elif dim == 3:
-            shape    = (0,0,0)
-            maxshape = (None,None,None)
-            chunks=(5, 5, tracelength)
-            
+        if dim in (1, 2, 3):
+            shape    = (0,)*dim
+            maxshape = (None,)*dim
         else:
             logging.error("Create datasets: '%s' is wrong number of dims." %(dim))
             raise ValueError
@@ -136,6 +164,9 @@ class H5_file(object):
             logging.error("please specify either: folder = 'data' , folder = 'analysis' or folder ='view' ")
             raise ValueError
             
+        if self.swmr:
+            logging.error("Create datasets: '%s' can not be created, HDF5 does not support new objects in SWMR mode." % (name))
+            raise ValueError
         if name in self.grp.keys():
             logging.info("Item '%s' already exists in data set." % (name))
             #return False        
@@ -163,23 +194,43 @@ class H5_file(object):
         # 'scaleoffset' is an optional parameter for lossy compression of floating-point data,  retaining a specified number of bits post-decimal. 
         # It is used to compress dataset elements by reducing the precision of the data. Defaults to None, implying no compression.
         scaleoffset = kwargs.get('scaleoffset',None)
+        layout = kwargs.pop('chunks', None)
+        compression = kwargs.pop('compression', None)
+        fillvalue = kwargs.pop('fillvalue', np.nan)
+
+        logical_shape = None
+        if indexed:
+            if expected_shape is None or len(expected_shape) != dim:
+                logging.error("Create datasets: indexed dataset '%s' needs an expected_shape with %d dims." % (name, dim))
+                raise ValueError
+            shape = tuple(expected_shape)
+        elif self.growth_factor is not None and ds_type != ds_types['txt']:
+            logical_shape = shape
+            if expected_shape is not None and len(expected_shape) == dim:
+                shape = tuple(expected_shape)
 
         if ds_type == ds_types['txt']:
-            ds = self.grp.create_dataset(name, shape, maxshape=maxshape, chunks = chunks, dtype=dtype, scaleoffset = scaleoffset)
+            ds = self.grp.create_dataset(name, shape, maxshape=maxshape, chunks = True, dtype=dtype, scaleoffset = scaleoffset)
         else:
-            ds = self.grp.create_dataset(name, shape, maxshape=maxshape, chunks = chunks, dtype=dtype, fillvalue = np.nan, scaleoffset = scaleoffset)
+            chunks = chunk_shape(tracelength, dim, np.dtype(dtype).itemsize, expected_shape, layout)
+            ds = self.grp.create_dataset(name, shape, maxshape=maxshape, chunks = chunks, dtype=dtype, fillvalue = fillvalue,
+                                         scaleoffset = scaleoffset, **filter_kwargs(compression))
+        self._logical_shapes[ds.name] = logical_shape
+        if logical_shape is not None:
+            ds.attrs.create("logical_shape", logical_shape)
         
         ds.attrs.create("name",name.encode())
         ds.attrs.create("ds_type", ds_type)
         if ds_type == ds_types['matrix'] or ds_type == ds_types['box']:
             ## fill value only needed for >1D datasets
-            ds.attrs.create("fill", [0,0,0])
+            ds.attrs.create("fill", [shape[0], shape[1], 0] if indexed else [0,0,0])
         # add attibutes
         for a in kwargs:
             if not a == "scaleoffset":
                 ds.attrs.create(a,(kwargs[a]).encode())
              
-        self.flush()
+        # only the new dataset, staged appends stay in the write buffer
+        self.hf.flush()
         return ds
         
     def append(self,ds,data, next_matrix=False, reset=False, pointwise=False):
@@ -198,14 +249,22 @@ class H5_file(object):
         Returns:
             The function operates on the given variables.
         """
+        if self.write_buffer is not None:
+            self.write_buffer.stage(ds, (data, next_matrix, reset, pointwise), getattr(data, 'nbytes', len(data)))
+            return
+        self._append(ds, data, next_matrix=next_matrix, reset=reset, pointwise=pointwise)
+        self.flush()
+
+    def _append(self, ds, data, next_matrix=False, reset=False, pointwise=False):
+        """Writes a single append to the hdf5 dataset 'ds', see append()."""
         # it gets a little ugly with all the different user-cases here ...
         if len(ds.shape) == 1:
             ## 1dim dataset (text, coordinate, vector)
             ## multiple inputs: text, scalar (not needed?), list/np.array with one or multiple entries
-            if self.ds_type == ds_types['txt']:
+            if h5py.check_string_dtype(ds.dtype) is not None:
                 ## text
-                dim1 = ds.shape[0]+1
-                ds.resize((dim1,))
+                dim1 = self._shape(ds)[0]+1
+                self._resize(ds, (dim1,))
                 ds[dim1-1] = data
                 """
                 ## This should not be needed anymore as there are non-user typecasts to np arrays before calling this fct.
@@ -221,28 +280,29 @@ class H5_file(object):
                 ## np array (or list)
                 if len(data) == 1:                  
                     ## single entry
-                    dim1 = ds.shape[0]+1
-                    ds.resize((dim1,))
+                    dim1 = self._shape(ds)[0]+1
+                    self._resize(ds, (dim1,))
                     ds[dim1-1] = data
                 else:                               
                     ## list of entries               
                     if reset:
                         ## here the data gets not appended but overwritten!
-                        ds.resize((len(data),))
-                        ds[:] = data
+                        self._resize(ds, (len(data),))
+                        ds[:len(data)] = data
                     else:
                         ## data append
-                        dim1 = ds.shape[0] 
-                        ds.resize((dim1+len(data),))
-                        ds[dim1:] = data
+                        dim1 = self._shape(ds)[0] 
+                        self._resize(ds, (dim1+len(data),))
+                        ds[dim1:dim1+len(data)] = data
 
         if len(ds.shape) == 2:       
             ## 2 dim dataset: matrix
             ## multiple inputs: list/np.array with one or multiple entries
             fill = ds.attrs.get('fill')
-            dim1 = ds.shape[1]
+            shape = self._shape(ds)
+            dim1 = shape[1]
             if len(data) == 1 and pointwise:
-                dim0 = max(1, ds.shape[0])
+                dim0 = max(1, shape[0])
                 ## single entry; sorting like in the 'len(ds.shape) == 3' case
                 if next_matrix:
                     dim0 += 1
@@ -251,26 +311,27 @@ class H5_file(object):
                 if dim0 == 1: # very first slice
                     fill[0] = 1
                     dim1 += 1
-                ds.resize((dim0,dim1))
+                self._resize(ds, (dim0,dim1))
                 fill[1] += 1
                 ds[fill[0]-1,fill[1]-1] = data
             else: 
                 ## list of entries, sort the data 'slice by slice'
-                dim0 = ds.shape[0]
+                dim0 = shape[0]
                 fill[1] = len(data)
                 if reset:
-                    ds[dim0-1,:] = data  # reset overwrites last data series (last row matrix)
+                    ds[dim0-1,:len(data)] = data  # reset overwrites last data series (last row matrix)
                 else:  # standard reset = False
                     fill[0] += 1
-                    ds.resize((dim0+1,len(data)))
-                    ds[dim0,:] = data
+                    self._resize(ds, (dim0+1,len(data)))
+                    ds[dim0,:len(data)] = data
             ds.attrs.modify('fill', fill)
 
         if len(ds.shape) == 3:      
             ## 3 dim dataset: box
             ## input: np.array with multiple entries
-            dim0 = max(1, ds.shape[0])
-            dim1 = ds.shape[1]
+            shape = self._shape(ds)
+            dim0 = max(1, shape[0])
+            dim1 = shape[1]
             fill = ds.attrs.get('fill')
             if next_matrix:
                 dim0 += 1
@@ -280,20 +341,231 @@ class H5_file(object):
                 fill[0] = 1
                 dim1 += 1
             if not reset:  # standard reset = False
-                ds.resize((dim0,dim1,len(data))) # Update array size
+                self._resize(ds, (dim0,dim1,len(data))) # Update array size
                 fill[1] += 1 # Update write position
-            ds[fill[0]-1,fill[1]-1] = data # Our indices start with one.
+            ds[fill[0]-1,fill[1]-1,:len(data)] = data # Our indices start with one.
             ds.attrs.modify("fill", fill)
 
+    def write_slab(self, ds, block, start, flush=False):
+        """Writes the numpy array 'block' into the hdf5 dataset 'ds' with a single write.
+
+        'block' has the dimensions of 'ds' and is placed with its first element
+        at the index tuple 'start'. The dataset is resized as needed. Matrices
+        and boxes get their fill attribute advanced to the end of the block, if
+        it lies beyond the current fill in sweep order. Staged appends of 'ds'
+        are written before the block. With 'flush', the file is flushed afterwards,
+        otherwise the block counts towards the FlushPolicy of the write buffer.
+        """
+        if self.write_buffer is not None:
+            with self.write_buffer.lock:
+                self.write_buffer.drain(ds.name)
+                self._write_slab(ds, block, start)
+                if not flush:
+                    self.write_buffer.written(block.nbytes)
+        else:
+            self._write_slab(ds, block, start)
+        if flush:
+            self.flush()
+
+    def _write_slab(self, ds, block, start):
+        """Writes a single slab to the hdf5 dataset 'ds', see write_slab()."""
+        end = tuple(s + n for s, n in zip(start, block.shape))
+        shape = self._shape(ds)
+        if any(e > n for e, n in zip(end, shape)):
+            self._resize(ds, tuple(max(e, n) for e, n in zip(end, shape)))
+        ds[tuple(slice(s, e) for s, e in zip(start, end))] = block
+        if len(ds.shape) > 1:
+            fill = ds.attrs.get('fill')
+            if (end[0], end[1]) >= (fill[0], fill[1]):
+                fill[0], fill[1] = end[0], end[1]
+                ds.attrs.modify('fill', fill)
+
+    def _write_staged(self, ds, ops):
+        """Writes the staged appends 'ops' of the write buffer to the hdf5 dataset 'ds'.
+
+        Consecutive appends that only extend the dataset are merged into one
+        resize and one write. Everything else (resets, text) is written one
+        by one with _append(), keeping the order of the appends.
+        """
+        i = 0
+        while i < len(ops):
+            data, next_matrix, reset, pointwise = ops[i]
+            j = i + 1
+            if not reset and h5py.check_string_dtype(ds.dtype) is None:
+                while j < len(ops) and self._mergeable(ds, ops[i], ops[j]):
+                    j += 1
+            if j - i == 1:
+                self._append(ds, data, next_matrix=next_matrix, reset=reset, pointwise=pointwise)
+            elif len(ds.shape) == 1:
+                self._append(ds, np.concatenate([op[0] for op in ops[i:j]]))
+            elif len(ds.shape) == 2 and not pointwise:
+                self._append_rows(ds, np.stack([op[0] for op in ops[i:j]]))
+            elif len(ds.shape) == 2:
+                self._append_innermost(ds, np.concatenate([op[0] for op in ops[i:j]]), next_matrix)
+            else:
+                self._append_innermost(ds, np.stack([op[0] for op in ops[i:j]]), next_matrix)
+            i = j
+
+    @staticmethod
+    def _mergeable(ds, first, op):
+        """Checks whether the append 'op' can be merged into the block of appends starting with 'first'."""
+        data, next_matrix, reset, pointwise = op
+        if reset:
+            return False
+        if len(ds.shape) == 1:
+            return True
+        if len(ds.shape) == 2 and not first[3]:
+            return not pointwise and data.shape == first[0].shape
+        if next_matrix:
+            return False
+        if len(ds.shape) == 2:
+            return pointwise and len(data) == 1 and len(first[0]) == 1
+        return data.shape == first[0].shape
+
+    def _append_rows(self, ds, block):
+        """Appends the rows of the 2dim 'block' to the matrix 'ds' with a single resize."""
+        fill = ds.attrs.get('fill')
+        dim0 = self._shape(ds)[0]
+        self._resize(ds, (dim0 + block.shape[0], block.shape[1]))
+        ds[dim0:dim0+block.shape[0], :block.shape[1]] = block
+        fill[0] += block.shape[0]
+        fill[1] = block.shape[1]
+        ds.attrs.modify('fill', fill)
+
+    def _append_innermost(self, ds, block, next_matrix):
+        """Appends 'block' along the second axis of the latest matrix (pointwise matrix) or box slice.
+
+        This is the merged version of the pointwise matrix and the box case in _append().
+        """
+        n = block.shape[0]
+        fill = ds.attrs.get('fill')
+        shape = self._shape(ds)
+        dim0 = max(1, shape[0])
+        dim1 = shape[1]
+        if next_matrix:
+            dim0 += 1
+            fill[0] += 1
+            fill[1] = 0
+        if dim0 == 1:  # very first slice
+            fill[0] = 1
+            dim1 += n
+        if len(ds.shape) == 2:
+            self._resize(ds, (dim0, dim1))
+            ds[fill[0]-1, fill[1]:fill[1]+n] = block
+        else:
+            self._resize(ds, (dim0, dim1, block.shape[1]))
+            ds[fill[0]-1, fill[1]:fill[1]+n, :block.shape[1]] = block
+        fill[1] += n
+        ds.attrs.modify('fill', fill)
+
+    def logical_shape(self, ds):
+        """Returns the shape of the valid data in the hdf5 dataset 'ds', including staged appends."""
+        if self.write_buffer is not None:
+            self.write_buffer.drain(ds.name)
+        return self._shape(ds)
+
+    def _shape(self, ds):
+        """Logical shape of 'ds' as seen by the writer, i.e. without over-allocated capacity."""
+        if ds.name not in self._logical_shapes:
+            shape = ds.attrs.get('logical_shape', None)
+            self._logical_shapes[ds.name] = tuple(int(n) for n in shape) if shape is not None else None
+        shape = self._logical_shapes[ds.name]
+        return ds.shape if shape is None else shape
+
+    def _resize(self, ds, shape):
+        """Resizes 'ds' to the logical 'shape'.
+
+        Without a growth_factor this is a plain resize. Otherwise the capacity
+        of each axis that is too small is increased at least by the growth
+        factor, which keeps the number of resizes logarithmic in the number of
+        appends.
+        """
+        shape = tuple(shape)
+        if self.growth_factor is None and self._logical_shapes.get(ds.name) is None:
+            ds.resize(shape)
+            return
+        if self.growth_factor is None:
+            capacity = shape
+        else:
+            capacity = tuple(c if n <= c else max(n, int(np.ceil(c * self.growth_factor))) for n, c in zip(shape, ds.shape))
+        if capacity != ds.shape:
+            ds.resize(capacity)
+        if self._logical_shapes.get(ds.name) != shape:
+            self._logical_shapes[ds.name] = shape
+            # modified in place, new attributes are not allowed in SWMR mode
+            ds.attrs.modify("logical_shape", shape)
+
+    def _trim(self):
+        """Shrinks all over-allocated datasets to their logical shape."""
+        for name, shape in self._logical_shapes.items():
+            if shape is not None and name in self.hf and self.hf[name].shape != shape:
+                self.hf[name].resize(shape)
+
+    @property
+    def swmr(self):
+        """True if the file is in single-writer/multiple-reader mode."""
+        return self.hf.swmr_mode
+
+    def start_swmr(self):
+        """Switches the file to single-writer/multiple-reader (SWMR) mode.
+
+        In SWMR mode, readers can keep the file open and see appended data by
+        refreshing the datasets, while the writer can only append to existing
+        datasets. As hdf_dataset creates its dataset only on the first append,
+        the switch is postponed until all announced datasets exist. A dataset
+        which is never written keeps the file in normal mode, readers then
+        reopen the file to see new data. Datasets can not be added once the
+        file is in SWMR mode, so readers never miss a dataset.
+
+        Returns:
+            True if the file is in SWMR mode, False if the switch is postponed
+            or not possible (file not opened with 'swmr').
+        """
+        self._swmr_requested = True
+        if self.swmr:
+            return True
+        if self._pending_datasets:
+            return False
+        if self.hf.libver[0] in ('earliest', 'v108'):
+            logging.warning("HDF5 file '%s' was not opened with 'swmr', SWMR mode not available." % (self.hf.filename))
+            self._swmr_requested = False
+            return False
+        if "swmr" in self.entry.attrs:
+            self.entry.attrs.modify("swmr", True)
         self.flush()
-        
+        self.hf.swmr_mode = True
+        return True
+
+    def announce_dataset(self, ds_url):
+        """Registers a dataset that is created later, on its first append."""
+        if self.swmr:
+            logging.error("Create datasets: '%s' can not be added, HDF5 does not support new objects in SWMR mode." % (ds_url))
+            raise ValueError
+        self._pending_datasets.add(ds_url)
+
+    def dataset_created(self, ds_url):
+        """Called by hdf_dataset once an announced dataset and its metadata are created."""
+        self._pending_datasets.discard(ds_url)
+        if self._swmr_requested and not self._pending_datasets:
+            self.start_swmr()
+
     def flush(self):
-        self.hf.flush()
+        """Writes all staged appends (if buffered) and flushes the hdf5 file."""
+        if self.write_buffer is not None:
+            with self.write_buffer.lock:
+                self.write_buffer.drain()
+                self.hf.flush()
+        else:
+            self.hf.flush()
         
     def close_file(self):
         # delegate close
+        if self.write_buffer is not None:
+            self.write_buffer.close()
+        if self.hf.mode != 'r':
+            self._trim()
         if self.newfile:
-            self.entry.attrs["updating"] = False
+            self.entry.attrs.modify("updating", False)
         self.hf.close()
         
     def __getitem__(self,s):
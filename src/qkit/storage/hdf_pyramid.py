@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-resolution (min/max/mean) pyramids of large matrix and box datasets.
+
+Plotting a 20000x8001 matrix pushes far more points to the screen than it
+has pixels. A pyramid stores block-reduced copies ('levels') of a dataset,
+so viewers can read a level matching their resolution instead.
+
+The levels are kept in a sidecar file next to the measurement file
+('<name>.pyramid', hdf5 format), as the measurement file can not get new
+objects while it is written in SWMR mode. For each dataset there is a group
+with its ds_url, containing the groups 'level1', 'level2', ... with the
+datasets 'min', 'max' and 'mean' and the attribute 'steps' (number of
+original points per level point along each axis).
+A pyramid is only used as long as the shape and fill of the dataset did not
+change since it was built.
+"""
+import logging
+import os
+import warnings
+
+import h5py
+import numpy as np
+
+import qkit
+from qkit.storage.hdf_constants import ds_types
+from qkit.storage.hdf_extent import logical_shape, valid_view
+from qkit.storage.hdf_file import file_kwargs
+
+STATS = ('min', 'max', 'mean')
+
+
+def pyramid_path(h5_path):
+    """Returns the path of the pyramid sidecar file of the measurement file 'h5_path'."""
+    return os.path.splitext(h5_path)[0] + ".pyramid"
+
+
+def level_steps(shape, factor=4, min_size=None):
+    """Returns the steps of all levels for a dataset of the given shape.
+
+    Each level reduces every axis still longer than 'min_size' by another
+    'factor'. Without any such axis, the dataset gets no pyramid.
+    """
+    if min_size is None:
+        min_size = qkit.cfg.get('hdf_pyramid_min_size', 1024)
+    levels = []
+    steps = (1,) * len(shape)
+    while True:
+        steps = tuple(s * factor if -(-n // s) > min_size else s for n, s in zip(shape, steps))
+        if levels and steps == levels[-1] or not levels and steps == (1,) * len(shape):
+            return levels
+        levels.append(steps)
+
+
+def reduce_block(block, steps):
+    """Block-reduces 'block' by 'steps' along each axis. Returns a dict of min, max and mean."""
+    block = np.asarray(block, dtype=np.float64)
+    pad = [(0, (-n) % s) for n, s in zip(block.shape, steps)]
+    if any(p[1] for p in pad):
+        block = np.pad(block, pad, constant_values=np.nan)
+    shape = []
+    for n, s in zip(block.shape, steps):
+        shape += [n // s, s]
+    block = block.reshape(shape)
+    axes = tuple(range(1, 2 * len(steps), 2))
+    with warnings.catch_warnings():
+        # blocks which are not measured yet are all NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return {'min': np.nanmin(block, axis=axes), 'max': np.nanmax(block, axis=axes), 'mean': np.nanmean(block, axis=axes)}
+
+
+def _reduce_level(level, steps):
+    """Reduces an already reduced level (dict of min, max and mean) further by 'steps'."""
+    return {'min': reduce_block(level['min'], steps)['min'],
+            'max': reduce_block(level['max'], steps)['max'],
+            'mean': reduce_block(level['mean'], steps)['mean']}
+
+
+def build_pyramid(ds, factor=4, min_size=None, rows=None):
+    """Builds the pyramid of the h5py dataset 'ds' (or its logical view) and stores it in the sidecar file.
+
+    The first level is built from blocks of rows, so the dataset is never
+    read into memory as a whole. Further levels are built from the previous one.
+
+    Args:
+        ds: matrix or box dataset.
+        factor: reduction factor between two levels.
+        min_size: axes are reduced until they are shorter than this, default: qkit.cfg['hdf_pyramid_min_size'] or 1024.
+        rows: number of rows read at once, default: as many as fit into about 64 MB.
+    Returns:
+        Number of levels built.
+    """
+    ds = valid_view(ds)
+    shape = ds.shape
+    levels = level_steps(shape, factor, min_size)
+    if not levels:
+        return 0
+    first = levels[0]
+    if rows is None:
+        rows = max(1, (2 ** 23 // max(1, int(np.prod(shape[1:])))))
+    rows = max(first[0], rows - rows % first[0])
+    blocks = [reduce_block(ds[i:min(i + rows, shape[0])], first) for i in range(0, shape[0], rows)]
+    level = {stat: np.concatenate([b[stat] for b in blocks]) for stat in STATS}
+    reduced = [level]
+    for previous, steps in zip(levels, levels[1:]):
+        level = _reduce_level(level, tuple(s // p for s, p in zip(steps, previous)))
+        reduced.append(level)
+
+    with h5py.File(pyramid_path(ds.file.filename), 'a', **file_kwargs) as f:
+        if ds.name in f:
+            del f[ds.name]
+        grp = f.create_group(ds.name)
+        grp.attrs['source_shape'] = shape
+        grp.attrs['source_fill'] = ds.attrs.get('fill', [0, 0, 0])
+        for i, (steps, level) in enumerate(zip(levels, reduced)):
+            lgrp = grp.create_group("level%d" % (i + 1))
+            lgrp.attrs['steps'] = steps
+            for stat in STATS:
+                lgrp.create_dataset(stat, data=level[stat].astype(np.float32), chunks=True)
+    return len(levels)
+
+
+def build_pyramids(h5_path, ds_urls=None, factor=4, min_size=None):
+    """Builds the missing or outdated pyramids of the file 'h5_path'.
+
+    Args:
+        h5_path: path of the measurement file.
+        ds_urls: datasets to build the pyramid for, default: all matrix and
+            box datasets large enough to get one (see level_steps()).
+        factor, min_size: see build_pyramid().
+    Returns:
+        List of the ds_urls of the built pyramids.
+    """
+    built = []
+    with h5py.File(h5_path, 'r', **file_kwargs) as hf:
+        if ds_urls is None:
+            ds_urls = []
+            hf['entry'].visititems(lambda name, o: ds_urls.append(o.name) if isinstance(o, h5py.Dataset) and
+                                   o.attrs.get('ds_type', -1) in (ds_types['matrix'], ds_types['box']) else None)
+        for ds_url in ds_urls:
+            ds = valid_view(hf[ds_url])
+            if level_steps(ds.shape, factor, min_size) and not has_pyramid(ds):
+                build_pyramid(ds, factor, min_size)
+                built.append(ds_url)
+    return built
+
+
+def _fresh_group(f, ds):
+    """Returns the pyramid group of 'ds' in the open sidecar 'f', None if missing or outdated."""
+    grp = f.get(ds.name)
+    if grp is None:
+        return None
+    if tuple(grp.attrs['source_shape']) != tuple(logical_shape(ds)):
+        return None
+    if not np.array_equal(grp.attrs['source_fill'], ds.attrs.get('fill', [0, 0, 0])):
+        return None
+    return grp
+
+
+def has_pyramid(ds):
+    """Checks whether the dataset 'ds' has an up to date pyramid."""
+    try:
+        with h5py.File(pyramid_path(ds.file.filename), 'r', **file_kwargs) as f:
+            return _fresh_group(f, ds) is not None
+    except (IOError, OSError, KeyError):
+        return False
+
+
+def read_level(ds, key, target, stat='mean'):
+    """Reads the selection 'key' of 'ds' from the coarsest pyramid level that still resolves 'target'.
+
+    Args:
+        ds: matrix or box dataset.
+        key: tuple with an integer (selected index) or slice(None) (displayed axis) per axis.
+        target: tuple with the number of points needed along each displayed axis,
+            e.g. the pixels of the plot. None for an axis that is not to be reduced.
+        stat: 'min', 'max' or 'mean'.
+    Returns:
+        Tuple of the data and the steps along the displayed axes, or None if
+        there is no up to date pyramid or no level is coarse enough to be worth it.
+        Axes with a selected index are never reduced, so such a slice is
+        only read from levels where this axis has step 1.
+    """
+    path = pyramid_path(ds.file.filename)
+    if not os.path.exists(path):
+        return None
+    try:
+        f = h5py.File(path, 'r', **file_kwargs)
+    except (IOError, OSError):
+        return None
+    try:
+        grp = _fresh_group(f, ds)
+        if grp is None:
+            return None
+        best = None
+        for name in sorted(grp.keys(), key=lambda n: int(n[5:])):
+            steps = tuple(int(s) for s in grp[name].attrs['steps'])
+            if any(s != 1 for s, k in zip(steps, key) if not isinstance(k, slice)):
+                continue
+            shown = [s for s, k in zip(steps, key) if isinstance(k, slice)]
+            sizes = [-(-n // s) for n, s, k in zip(grp.attrs['source_shape'], steps, key) if isinstance(k, slice)]
+            if all(t is None and s == 1 or t is not None and n >= t for n, s, t in zip(sizes, shown, target)):
+                best = name, tuple(shown)
+        if best is None:
+            return None
+        name, shown = best
+        return grp[name][stat][key], shown
+    except (KeyError, ValueError) as e:
+        logging.warning("Could not read pyramid of '%s': %s" % (ds.name, e))
+        return None
+    finally:
+        f.close()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Compact summaries of the datasets of a measurement file for quick browsing.
+
+For every dataset in 'entry', a summary holds its ds_type, shape (the
+logical one, see hdf_extent), dtype, min, max, the fraction of NaN values
+(points not measured yet), the 'fill' attribute and a small thumbnail:
+the data block-averaged to at most 'size' points per axis. Box datasets
+are previewed by the x-y slice at the middle of z, like the midpoint views.
+
+The summaries are computed once, when a file is closed (see
+file_info_database.summarize()), and kept in the fid store, so viewers can
+show previews and statistics of many files without opening them.
+
+Usage:
+    summaries = summarize(h5_path)
+    summaries['/entry/data0/amplitude']['max']
+"""
+import logging
+import warnings
+
+import h5py
+import numpy as np
+
+from qkit.storage.hdf_extent import valid_view
+from qkit.storage.hdf_file import file_kwargs
+from qkit.storage.hdf_pyramid import reduce_block
+
+THUMBNAIL_SIZE = 64
+
+
+def _steps(shape, size):
+    """Block sizes reducing every axis of 'shape' to at most 'size' points."""
+    return tuple(max(1, -(-n // size)) for n in shape)
+
+
+def summarize_dataset(ds, size=THUMBNAIL_SIZE, rows=None):
+    """Summarizes the h5py dataset 'ds' (or its logical view).
+
+    The data is read in blocks of rows, never as a whole.
+
+    Args:
+        ds: dataset of a qkit file.
+        size: maximum number of thumbnail points per axis.
+        rows: number of rows read at once, default: as many as fit into about 64 MB.
+    Returns:
+        dict with 'ds_type', 'shape', 'dtype', 'fill', 'min', 'max', 'nan_fraction' and
+        'thumbnail' (float32 array or None for non numeric datasets).
+    """
+    ds = valid_view(ds)
+    shape = tuple(ds.shape)
+    fill = ds.attrs.get('fill', None)
+    summary = {'ds_type': int(ds.attrs.get('ds_type', -1)), 'shape': shape, 'dtype': str(ds.dtype),
+               'fill': None if fill is None else [int(f) for f in fill],
+               'min': None, 'max': None, 'nan_fraction': None, 'thumbnail': None}
+    if not np.issubdtype(ds.dtype, np.number) or np.issubdtype(ds.dtype, np.complexfloating) or not ds.size:
+        return summary
+
+    middle = shape[2] // 2 if len(shape) == 3 else None
+    thumb_shape = shape[:2] if middle is not None else shape
+    steps = _steps(thumb_shape, size)
+    if rows is None:
+        rows = max(1, 2 ** 23 // max(1, int(np.prod(shape[1:]))))
+    rows = max(steps[0], rows - rows % steps[0])
+
+    lo, hi, nans, blocks = np.inf, -np.inf, 0, []
+    for i in range(0, shape[0], rows):
+        block = np.asarray(ds[i:min(i + rows, shape[0])], dtype=np.float64)
+        finite = block[~np.isnan(block)]
+        nans += block.size - finite.size
+        if finite.size:
+            lo, hi = min(lo, finite.min()), max(hi, finite.max())
+        if middle is not None:
+            block = block[:, :, middle]
+        blocks.append(reduce_block(block, steps)['mean'])
+    if hi >= lo:
+        summary['min'], summary['max'] = float(lo), float(hi)
+    summary['nan_fraction'] = nans / float(np.prod(shape))
+    summary['thumbnail'] = np.concatenate(blocks).astype(np.float32)
+    return summary
+
+
+def summarize(h5_path, size=THUMBNAIL_SIZE):
+    """Summarizes all datasets in the 'entry' group of the file 'h5_path'.
+
+    Returns:
+        {ds_url: summary} (see summarize_dataset()), empty if the file can not be read.
+    """
+    summaries = {}
+    try:
+        with h5py.File(h5_path, 'r', **file_kwargs) as hf:
+            datasets = []
+            hf['entry'].visititems(lambda name, o: datasets.append(o) if isinstance(o, h5py.Dataset) else None)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                for ds in datasets:
+                    summaries[ds.name] = summarize_dataset(ds, size)
+    except (OSError, KeyError) as e:
+        logging.warning("hdf summary: Can not summarize {}: {}".format(h5_path, e))
+    return summaries
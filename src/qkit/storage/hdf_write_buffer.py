@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Write-behind buffering for qkit hdf5 files.
+
+Instead of touching the hdf5 file (resize, write, flush) for every single
+point or trace, appends are staged in memory and written in bulk once one of
+the thresholds of the FlushPolicy is reached. Pending data is always written
+on flush() and close_file() of the H5_file, and at the exit of the interpreter
+for files that were never closed, e.g. after an exception in a measurement loop.
+"""
+import atexit
+import logging
+import threading
+import time
+import weakref
+
+import qkit
+
+
+class FlushPolicy(object):
+    """Thresholds controlling when staged appends are written to disk.
+
+    Staged data is written as soon as any of the thresholds is exceeded.
+    The time threshold is also enforced while no appends arrive, so readers
+    like qviewkit see new data after at most 'interval' seconds.
+
+    Args:
+        interval: maximum time in seconds data is kept in memory (None: no limit).
+        max_bytes: maximum number of staged bytes (None: no limit).
+        max_rows: maximum number of staged appends (None: no limit).
+    """
+
+    def __init__(self, interval=1.0, max_bytes=4 * 2 ** 20, max_rows=None):
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+
+    @classmethod
+    def from_cfg(cls):
+        """Returns the FlushPolicy configured in qkit.cfg or None if write-behind buffering is disabled.
+
+        Used qkit.cfg entries:
+            hdf_write_buffer (bool): enable buffering, default: False
+            hdf_flush_interval (float): see 'interval'
+            hdf_flush_bytes (int): see 'max_bytes'
+            hdf_flush_rows (int): see 'max_rows'
+        """
+        if not qkit.cfg.get('hdf_write_buffer', False):
+            return None
+        return cls(interval=qkit.cfg.get('hdf_flush_interval', 1.0),
+                   max_bytes=qkit.cfg.get('hdf_flush_bytes', 4 * 2 ** 20),
+                   max_rows=qkit.cfg.get('hdf_flush_rows', None))
+
+    def due(self, age, nbytes, nrows):
+        """Checks whether staged data of the given age (s), size and number of appends has to be written."""
+        if self.interval is not None and age >= self.interval:
+            return True
+        if self.max_bytes is not None and nbytes >= self.max_bytes:
+            return True
+        if self.max_rows is not None and nrows >= self.max_rows:
+            return True
+        return False
+
+    def __repr__(self):
+        return "FlushPolicy(interval=%s, max_bytes=%s, max_rows=%s)" % (self.interval, self.max_bytes, self.max_rows)
+
+
+class WriteBuffer(object):
+    """In-memory staging area for the appends to one H5_file.
+
+    Appends are kept per hdf5 dataset in the order they arrived. On drain()
+    they are handed back to the H5_file, which merges consecutive appends
+    into single resize/write operations.
+    All access is guarded by 'lock', as a timer thread drains the buffer
+    when no further appends arrive within the flush interval.
+    """
+
+    def __init__(self, h5_file, policy):
+        self._h5 = h5_file
+        self.policy = policy
+        self.lock = threading.RLock()
+        self._pending = {}
+        self._nbytes = 0
+        self._nrows = 0
+        self._since = None
+        self._timer = None
+        _open_buffers.add(self)
+
+    def __len__(self):
+        return self._nrows
+
+    def stage(self, ds, op, nbytes):
+        """Stages one append operation 'op' for the h5py dataset 'ds' and writes everything if the policy says so."""
+        with self.lock:
+            self._pending.setdefault(ds.name, (ds, []))[1].append(op)
+            self._nbytes += nbytes
+            self._nrows += 1
+            if self._since is None:
+                self._since = time.time()
+                self._arm_timer()
+            if self.policy.due(time.time() - self._since, self._nbytes, self._nrows):
+                self._h5.flush()
+
+    def written(self, nbytes):
+        """Counts a block written directly to the file (see H5_file.write_slab), the file is flushed if the policy says so."""
+        with self.lock:
+            self._nbytes += nbytes
+            self._nrows += 1
+            if self._since is None:
+                self._since = time.time()
+                self._arm_timer()
+            if self.policy.due(time.time() - self._since, self._nbytes, self._nrows):
+                self._h5.flush()
+
+    def drain(self, name=None):
+        """Writes all staged appends to the file. Does not flush the hdf5 file itself.
+
+        If the h5 path 'name' of a dataset is given, only its appends are written.
+        """
+        with self.lock:
+            if name is not None:
+                if name in self._pending:
+                    ds, ops = self._pending.pop(name)
+                    self._nbytes -= sum(getattr(op[0], 'nbytes', len(op[0])) for op in ops)
+                    self._nrows -= len(ops)
+                    self._h5._write_staged(ds, ops)
+                return
+            pending, self._pending = self._pending, {}
+            self._nbytes = 0
+            self._nrows = 0
+            self._since = None
+            self._cancel_timer()
+            for ds, ops in pending.values():
+                self._h5._write_staged(ds, ops)
+
+    def close(self):
+        self.drain()
+        _open_buffers.discard(self)
+
+    def _arm_timer(self):
+        if self.policy.interval is None:
+            return
+        self._timer = threading.Timer(self.policy.interval, self._timed_flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+
+    def _timed_flush(self):
+        with self.lock:
+            if self._since is None:
+                return
+            try:
+                self._h5.flush()
+            except Exception as e:
+                logging.error("HDF write buffer: Timed flush of '%s' failed: %s" % (self._h5.hf.filename, e))
+
+
+# the buffers of the files not closed yet, written at the exit of the interpreter
+_open_buffers = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_buffers():
+    for buffer in list(_open_buffers):
+        if not buffer._pending:
+            continue
+        try:
+            buffer._h5.flush()
+        except Exception as e:
+            logging.error("HDF write buffer: Flush of '%s' at exit failed: %s" % (buffer._h5.hf.filename, e))
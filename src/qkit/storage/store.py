@@ -16,7 +16,9 @@ from qkit.storage.hdf_file import H5_file
 from qkit.storage.hdf_dataset import hdf_dataset
 from qkit.storage.hdf_constants import ds_types
 from qkit.storage.hdf_view import dataset_view
+from qkit.storage.hdf_extent import valid_view
 from qkit.storage.hdf_DateTimeGenerator import DateTimeGenerator
+from qkit.storage.hdf_write_buffer import FlushPolicy
 
 
 
@@ -29,7 +31,7 @@ class Data(object):
     mentioned classes.
     """
     # a types
-    def __init__(self, name = None, mode = 'r+', copy_file = False):
+    def __init__(self, name = None, mode = 'r+', copy_file = False, flush_policy = None, growth_factor = None, swmr = False):
         """Creates an empty data set including the file, for which the currently
         set file name generator is used or opens the h5 file at location 'name'.
 
@@ -37,6 +39,14 @@ class Data(object):
             name (string):  filename or absolute filepath
             mode (string):  access mode to the hdf5 file, default: 'r+' (read+write).
                 Other modes are 'a' (read, write, and create)
+            flush_policy (FlushPolicy): enables the write-behind buffer for appends
+                with the given thresholds. Default: FlushPolicy.from_cfg(), i.e.
+                unbuffered unless qkit.cfg['hdf_write_buffer'] is set.
+            growth_factor (float): over-allocates the capacity of growing datasets by
+                this factor instead of resizing them for every append. They are trimmed
+                on close. Default: qkit.cfg['hdf_growth_factor'] (None, i.e. off).
+            swmr (bool): opens the file in the latest hdf5 file format, so that it can
+                be switched to single-writer/multiple-reader mode with start_swmr().
         """
         self._name = name
         if os.path.isfile(self._name):
@@ -52,8 +62,12 @@ class Data(object):
             self._filepath = os.path.abspath(self._name)
             self._folder,self._filename = os.path.split(self._filepath)
         "setup the  file"
+        if flush_policy is None and mode != 'r':
+            flush_policy = FlushPolicy.from_cfg()
+        if growth_factor is None and mode != 'r':
+            growth_factor = qkit.cfg.get('hdf_growth_factor', None)
         try:
-            self.hf = H5_file(self._filepath, mode)
+            self.hf = H5_file(self._filepath, mode, flush_policy=flush_policy, growth_factor=growth_factor, swmr=swmr)
         except IOError:
             raise IOError(f'File "{self._filepath}" does not exist. Use argument \"mode=\'a\'\" to create a new h5 file.')
         if self.hf.newfile:
@@ -100,6 +114,7 @@ class Data(object):
         a = group()
         for n, o in self.hf.hf['/entry/analysis0'].items():
             n = n.replace(" ","_")
+            o = valid_view(o)
             a.__dict__[n] = o
             for nn, oo in o.attrs.items():
                 o.__dict__[nn] = oo
@@ -107,6 +122,7 @@ class Data(object):
         d = group()
         for n, o in self.hf.hf['/entry/data0'].items():
             n = n.replace(" ","_")
+            o = valid_view(o)
             d.__dict__[n] = o
             for nn, oo in o.attrs.items():
                 o.__dict__[nn] = oo
@@ -147,6 +163,16 @@ class Data(object):
         ret = "HDF5Data '%s', filename '%s'" % (self._name, self._filename)
         return ret
 
+    def start_swmr(self):
+        """Switches the file to single-writer/multiple-reader mode.
+
+        Readers like qviewkit can then keep the file open while data is
+        appended. No new datasets can be added in SWMR mode, so the switch
+        happens once all datasets added so far have received their first data.
+        See H5_file.start_swmr().
+        """
+        return self.hf.start_swmr()
+
     def get_filepath(self):
         return self._filepath
 
@@ -216,6 +242,7 @@ class Data(object):
             unit: Optional string.
             comment: Optional string to put in any comment.
             folder: Optional string ('data' or 'analysis').
+            expected_shape: Optional tuple with the final shape, used to pre-allocate the dataset.
         
         Returns:
             hdf_dataset object.
@@ -240,6 +267,7 @@ class Data(object):
             unit: Optional string.
             comment: Optional string to put in any comment.
             folder: Optional string ('data' or 'analysis').
+            expected_shape: Optional tuple with the final shape, used to pre-allocate the dataset.
         
         Returns:
             hdf_dataset object.
@@ -265,6 +293,7 @@ class Data(object):
             unit: Optional string.
             comment: Optional string to put in any comment.
             folder: Optional string ('data' or 'analysis').
+            expected_shape: Optional tuple with the final shape, used to pre-allocate the dataset.
         
         Returns:
             hdf_dataset object.
@@ -323,6 +352,12 @@ class Data(object):
         self.hf.flush()
 
     def close_file(self):
-        self.hf.close_file()
+        self.close()
     def close(self):
+        written = self.hf.hf.mode != 'r'
         self.hf.close_file()
+        if written and qkit.cfg.get('fid_summaries', False):
+            try:
+                qkit.fid.summarize(self._filepath)
+            except Exception as e:
+                logging.debug("Could not summarize h5 File '{}' in the qkit.fid database: {}".format(self._filepath, e))
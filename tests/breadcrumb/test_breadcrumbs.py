@@ -18,10 +18,8 @@ def test_multiple_writers():
         writer1 = BreadCrumbCreator()
         writer2 = BreadCrumbCreator()
     finally:
-        # Cleanup breadcrumb
-        if derive_breadcrumb_filename().exists():
-            import os
-            os.remove(derive_breadcrumb_filename())
+        # Cleanup breadcrumb and its index
+        BreadCrumbCreator().clear_file()
 
 def test_read_all_breadcrumbs():
     datadir_path =  Path(__file__).parent
@@ -37,10 +35,8 @@ def test_clear_breadcrumb():
         writer.clear_file()
         assert not writer._breadcrumb_path.exists()
     finally:
-        # Cleanup breadcrumb
-        if derive_breadcrumb_filename().exists():
-            import os
-            os.remove(derive_breadcrumb_filename())
+        # Cleanup breadcrumb and its index
+        BreadCrumbCreator().clear_file()
 
 @patch("os.getcwd", return_value=(str(Path(__file__).parent)))
 @patch("builtins.input", return_value="y")
@@ -56,8 +52,37 @@ def test_manual_index(*args, **kwargs):
     result = read_breadcrumbs(Path(__file__).parent)
     assert result['STUVWX'] == Path(__file__).parent / "STUVWX_dummy.h5"
 
-    # Cleanup breadcrumb
-    if derive_breadcrumb_filename().exists():
-        import os
-        os.remove(derive_breadcrumb_filename())
+    # Cleanup breadcrumb and its index
+    BreadCrumbCreator().clear_file()
 
+
+def test_compaction_and_lookup(tmp_path):
+    datadir = qkit.cfg['datadir']
+    qkit.cfg['datadir'] = tmp_path
+    try:
+        writer = BreadCrumbCreator()
+        writer.append_entries([("ABCDEF", tmp_path / "old.h5"), ("GHIJKL", tmp_path / "run" / "file2.h5")])
+        writer.append_entry("ABCDEF", tmp_path / "run" / "file1.h5")
+        # Without index, the journal is read
+        assert lookup_breadcrumbs(tmp_path, "ABCDEF") == tmp_path / "run" / "file1.h5"
+
+        writer.compact()
+        assert writer._index_path.exists()
+        assert len(writer._breadcrumb_path.read_text().splitlines()) == 2
+        assert lookup_breadcrumbs(tmp_path, "ABCDEF") == tmp_path / "run" / "file1.h5"
+        assert lookup_breadcrumbs(tmp_path, "GHIJKL") == tmp_path / "run" / "file2.h5"
+        assert lookup_breadcrumbs(tmp_path, "ZZZZZZ") is None
+
+        # Entries appended after the compaction are found, too, and win
+        writer.append_entry("GHIJKL", tmp_path / "moved.h5")
+        assert lookup_breadcrumbs(tmp_path, "GHIJKL") == tmp_path / "moved.h5"
+        assert read_breadcrumbs(tmp_path)["GHIJKL"] == tmp_path / "moved.h5"
+
+        # An index not matching the journal anymore is ignored
+        writer._breadcrumb_path.unlink()
+        writer.append_entry("CCCCCC", tmp_path / "new.h5")
+        assert lookup_breadcrumbs(tmp_path, "CCCCCC") == tmp_path / "new.h5"
+        assert lookup_breadcrumbs(tmp_path, "ABCDEF") is None
+        assert read_breadcrumbs(tmp_path) == {"CCCCCC": tmp_path / "new.h5"}
+    finally:
+        qkit.cfg['datadir'] = datadir
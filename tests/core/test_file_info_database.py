@@ -1,3 +1,4 @@
+import pytest
 from pytest import fixture
 from pathlib import Path
 from collections.abc import Iterable
@@ -77,4 +78,260 @@ def test_adding_file_to_index(fid: 'file_info_database.fid'):
         os.remove(path)
 
 def test_get_and__get__equal(fid: 'file_info_database.fid'):
-    assert fid.get("YZ0123") == fid["YZ0123"]
\ No newline at end of file
+    assert fid.get("YZ0123") == fid["YZ0123"]
+
+def test_incremental_rescan(fid: 'file_info_database.fid'):
+    import os
+    import shutil
+    datadir = Path(__file__).parent
+    newdir = datadir / "new_run" / "user"
+    newdir.mkdir(parents=True)
+    try:
+        path = newdir / "Z56789_new.h5"
+        with open(path, "w"):
+            pass
+        # Unchanged directories are taken from the cache, the new one is listed
+        fid.update_file_db()
+        assert Path(fid["Z56789"]) == path
+        assert Path(fid["STUVWX"]) == datadir / "STUVWX_dummy.h5"
+        assert str(datadir / "new_run") in fid._h5_dir_cache_db
+
+        # Entries of deleted files are removed
+        os.remove(path)
+        fid.update_file_db()
+        assert "Z56789" not in fid.h5_db
+        assert Path(fid["YZ0123"]) == datadir / 'subdir' / "YZ0123_dummy.h5"
+    finally:
+        shutil.rmtree(datadir / "new_run")
+
+def test_skip_old_directories(fid: 'file_info_database.fid'):
+    import os
+    import shutil
+    import qkit
+    datadir = Path(__file__).parent
+    newdir = datadir / "old_run" / "user"
+    newdir.mkdir(parents=True)
+    qkit.cfg['fid_scan_skip_age'] = 3600
+    try:
+        with open(newdir / "Z56780_old.h5", "w"):
+            pass
+        for d in (newdir, newdir.parent):
+            os.utime(d, (0, 0))
+        fid.update_file_db()
+        assert "Z56780" in fid.h5_db
+        # an old directory gets a new measurement: it is listed again
+        (newdir / "new_measurement").mkdir()
+        path = newdir / "new_measurement" / "Z56781_new.h5"
+        with open(path, "w"):
+            pass
+        fid.update_file_db()
+        assert Path(fid["Z56781"]) == path
+    finally:
+        qkit.cfg.pop('fid_scan_skip_age', None)
+        shutil.rmtree(datadir / "old_run")
+
+def test_store(fid: 'file_info_database.fid'):
+    from qkit.core.lib.file_service.fid_store import FidStore
+    datadir = Path(__file__).parent
+    # The scan results are persisted and can be queried
+    store = FidStore(fid._store.path)
+    try:
+        assert Path(store.files()["STUVWX", ".h5"][0]) == datadir / "STUVWX_dummy.h5"
+        assert store.infos()["YZ0123"]["name"] == "dummy"
+        assert sorted(store.query("name", expression="^dum")) == ["STUVWX", "YZ0123"]
+        # Attribute updates are single upserts
+        fid._store.put_infos({"STUVWX": dict(fid.h5_info_db["STUVWX"], rating=3)})
+        assert store.query("rating", bounds=(0, 5)) == ["STUVWX"]
+        fid._store.put_infos({"STUVWX": dict(fid.h5_info_db["STUVWX"], fit_q=1e4)})
+        assert store.query("fit_q", value=1e4) == ["STUVWX"]
+        assert store.has_column("fit_q") and not store.has_column("unknown")
+    finally:
+        store.close()
+
+@pytest.mark.parametrize("mode", ["inotify", "poll"])
+def test_watcher(fid: 'file_info_database.fid', mode):
+    import os
+    import shutil
+    import time
+    datadir = Path(__file__).parent
+    fid.start_watcher(mode)
+    newdir = datadir / "watched_run" / "user"
+    try:
+        newdir.mkdir(parents=True)
+        path = newdir / "Z67890_watched.h5"
+        with open(path, "w"):
+            pass
+        # New files of other processes are found within a second, without a rescan
+        for _ in range(40):
+            if "Z67890" in fid.h5_db:
+                break
+            time.sleep(0.05)
+        assert Path(fid.get("Z67890")) == path
+        os.remove(path)
+        for _ in range(40):
+            if "Z67890" not in fid.h5_db:
+                break
+            time.sleep(0.05)
+        assert "Z67890" not in fid.h5_db
+    finally:
+        fid.stop_watcher()
+        shutil.rmtree(datadir / "watched_run")
+
+def test_lazy_hdf_columns(fid: 'file_info_database.fid'):
+    import shutil
+    import h5py
+    import qkit
+    from qkit.storage.store import Data
+    datadir = Path(__file__).parent
+    newdir = datadir / "hdf_run" / "user" / "Z78901_hdf"
+    newdir.mkdir(parents=True)
+    path = newdir / "Z78901_hdf.h5"
+    data = Data(str(path), mode="w")
+    data.add_comment("lazy comment")
+    data.close()
+    with h5py.File(path, "r+") as f:
+        f.require_group("/entry/analysis0").attrs["fit_q"] = 1e4
+    cfg = {k: qkit.cfg[k] for k in ("fid_scan_hdf", "fid_hdf_columns", "fid_scan_processes") if k in qkit.cfg}
+    qkit.cfg.update(fid_scan_hdf=True, fid_hdf_columns=["comment"], fid_scan_processes=False)
+    try:
+        fid.update_file_db()
+        # Only the declared columns are read in the scan
+        assert fid.h5_info_db["Z78901"]["comment"] == "lazy comment"
+        assert "fit_q" not in fid.h5_info_db["Z78901"]
+        # Other columns are read on demand and cached
+        assert "Z78901" in fid.extract_columns(["fit_q"])
+        assert fid.h5_info_db["Z78901"]["fit_q"] == 1e4
+        assert "Z78901" not in fid.extract_columns(["fit_q"])
+        assert {"comment", "fit_q"} <= fid._store.columns()["Z78901"]
+        assert fid._store.query("fit_q", value=1e4) == ["Z78901"]
+    finally:
+        for k in ("fid_scan_hdf", "fid_hdf_columns", "fid_scan_processes"):
+            qkit.cfg.pop(k, None)
+        qkit.cfg.update(cfg)
+        shutil.rmtree(datadir / "hdf_run")
+
+def test_attribute_batch(fid: 'file_info_database.fid'):
+    import shutil
+    import h5py
+    import qkit
+    from qkit.storage.store import Data
+    datadir = Path(__file__).parent
+    newdir = datadir / "attr_run" / "user"
+    newdir.mkdir(parents=True)
+    uuids = ["Z89010", "Z89011"]
+    for uuid in uuids:
+        data = Data(str(newdir / (uuid + "_attr.h5")), mode="w")
+        data.close()
+    cfg = {k: qkit.cfg[k] for k in ("fid_attribute_defer_age",) if k in qkit.cfg}
+    qkit.cfg["fid_attribute_defer_age"] = 0
+    try:
+        fid.update_file_db()
+        # Edits are collected and written per file at the end of the batch
+        with fid.attribute_batch():
+            fid.set_rating(uuids, 5)
+            fid._set_hdf_attribute(uuids[0], "comment", "good")
+            assert fid.pending_attributes() == {uuids[0]: {"rating": 5, "comment": "good"}, uuids[1]: {"rating": 5}}
+        assert fid.pending_attributes() == {}
+        with h5py.File(fid[uuids[0]], "r") as f:
+            assert dict(f["/entry/analysis0"].attrs) == {"rating": 5, "comment": "good"}
+        assert sorted(fid._store.query("rating", value=5)) == uuids
+        # Files still written by a measurement are left alone until they are closed
+        data = Data(fid[uuids[1]], mode="a")
+        try:
+            fid.set_rating(uuids[1], 0)
+            assert fid.pending_attributes() == {uuids[1]: {"rating": 0}}
+            assert fid._store.query("rating", value=0) == []
+        finally:
+            data.close()
+        assert fid.flush_attributes() == []
+        with h5py.File(fid[uuids[1]], "r") as f:
+            assert f["/entry/analysis0"].attrs["rating"] == 0
+        assert fid._store.query("rating", value=0) == [uuids[1]]
+    finally:
+        if fid._attr_retry is not None:
+            fid._attr_retry.cancel()
+        qkit.cfg.pop("fid_attribute_defer_age", None)
+        qkit.cfg.update(cfg)
+        shutil.rmtree(datadir / "attr_run")
+
+def test_summaries(fid: 'file_info_database.fid'):
+    import shutil
+    import numpy as np
+    from qkit.storage.store import Data
+    from qkit.core.lib.file_service.file_info_database import summary_text
+    datadir = Path(__file__).parent
+    newdir = datadir / "summary_run" / "user"
+    newdir.mkdir(parents=True)
+    try:
+        uuids = ["Z90120", "Z90121"]
+        for uuid in uuids:
+            data = Data(str(newdir / (uuid + "_summary.h5")), mode="w")
+            x = data.add_coordinate("x")
+            x.add(np.arange(3))
+            vector = data.add_value_vector("amplitude", x)
+            vector.append(np.array([1., 2., np.nan]))
+            data.close()
+        fid.update_file_db()
+        # Summarized when closed, the other ones on demand
+        fid.summarize(fid[uuids[0]]).result()
+        assert list(fid.summaries(uuids)) == [uuids[0]]
+        assert fid.extract_summaries(uuids) == [uuids[1]]
+        summaries = fid.summaries(uuids)
+        assert sorted(summaries) == uuids
+        amplitude = summaries[uuids[1]]["/entry/data0/amplitude"]
+        assert amplitude["max"] == 2. and np.allclose(amplitude["thumbnail"], [1., 2., np.nan], equal_nan=True)
+        assert summary_text(summaries[uuids[1]]) == "amplitude 3 [1, 2] 33% NaN"
+        # Outdated summaries are not used
+        fid._h5_n_mtime[uuids[1]] += 1
+        assert list(fid.summaries(uuids)) == [uuids[0]]
+    finally:
+        shutil.rmtree(datadir / "summary_run")
+
+def test_query(fid: 'file_info_database.fid'):
+    import shutil
+    import numpy as np
+    import qkit
+    from qkit.storage.store import Data
+    from qkit.analysis import query
+    datadir = Path(__file__).parent
+    newdir = datadir / "query_run" / "user"
+    newdir.mkdir(parents=True)
+    processes = qkit.cfg.get("fid_scan_processes", None)
+    qkit.cfg["fid_scan_processes"] = False
+    try:
+        for i, (uuid, name) in enumerate([("Z91230", "IV"), ("Z91231", "IV"), ("Z91232", "spec")]):
+            data = Data(str(newdir / "{}_{}.h5".format(uuid, name)), mode="w")
+            x = data.add_coordinate("x")
+            x.add(np.arange(3 + i))
+            current = data.add_value_vector("current", x)
+            current.append(np.arange(3. + i) * (i + 1))
+            data.close()
+        # an aborted measurement with an empty dataset
+        data = Data(str(newdir / "Z91233_IV.h5"), mode="w")
+        x = data.add_coordinate("x")
+        x.add(np.arange(3))
+        data.add_value_vector("current", x).append(np.array([]))
+        data.close()
+        fid.update_file_db()
+        q = query.Query(fid).where("name", expression="^IV$")
+        assert q.uuids() == ["Z91230", "Z91231", "Z91233"]
+        aborted = q.extract({"last": ("/entry/data0/current", np.s_[-1])})
+        assert aborted["last"][2] is None and aborted["last"][1] == 6.
+        q = query.Query(fid, uuids=["Z91230", "Z91231"])
+        result = q.extract({"current": "/entry/data0/current", "last": ("/entry/data0/current", np.s_[-1]),
+                            "missing": "/entry/data0/nothing"})
+        assert result.info["name"] == ["IV", "IV"]
+        assert result["last"][0] == 2. and result["last"][1] == 6.
+        assert result["missing"] == [None, None]
+        assert np.allclose(result.stack("current"), [[0, 1, 2, np.nan], [0, 2, 4, 6]], equal_nan=True)
+        assert np.allclose(result.stack("last"), [2., 6.])
+        # repeated queries are served from the cache
+        hits = query.cache.hits
+        query.Query(fid, uuids=["Z91230", "Z91232"]).extract(["/entry/data0/current"])
+        assert query.cache.hits == hits + 1
+    finally:
+        query.cache.clear()
+        qkit.cfg.pop("fid_scan_processes", None)
+        if processes is not None:
+            qkit.cfg["fid_scan_processes"] = processes
+        shutil.rmtree(datadir / "query_run")
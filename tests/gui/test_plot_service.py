@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import qkit
+from qkit.gui.plot import plot_service
+
+
+@pytest.fixture
+def render(monkeypatch):
+    """ replaces the rendering by a job which waits for 'release' and fails for files named 'broken' """
+    calls = []
+    release = threading.Event()
+
+    def fake_render(h5_filepath, comment, save_pdf, cfg):
+        calls.append(h5_filepath)
+        release.wait(5)
+        if h5_filepath.endswith("broken"):
+            raise RuntimeError("rendering failed")
+        return h5_filepath
+
+    monkeypatch.setattr(plot_service, "_render", fake_render)
+    monkeypatch.setitem(qkit.cfg, "save_png", True)
+    return calls, release
+
+
+def test_deduplication(render):
+    calls, release = render
+    service = plot_service.PlotService(workers=2, processes=False)
+    try:
+        first = service.submit("/data/a.h5")
+        assert service.submit("/data/a.h5") is first
+        assert service.pending() == ["/data/a.h5"]
+        release.set()
+        assert first.result(5) == "/data/a.h5"
+        # done jobs are queued again
+        assert service.submit("/data/a.h5").result(5) == "/data/a.h5"
+        assert calls == ["/data/a.h5"] * 2
+    finally:
+        service.shutdown()
+    assert service.pending() == []
+
+
+def test_errors(render):
+    calls, release = render
+    release.set()
+    service = plot_service.PlotService(workers=1, processes=False)
+    try:
+        done = []
+        future = service.submit("/data/broken", callback=done.append)
+        with pytest.raises(RuntimeError):
+            future.result(5)
+        assert done == [future]
+        assert service.submit("/data/b.h5").result(5) == "/data/b.h5"
+    finally:
+        service.shutdown()
+
+
+def test_broken_pool(render):
+    calls, release = render
+    release.set()
+
+    class BrokenPool:
+        def submit(self, *args):
+            raise BrokenProcessPool("a worker died")
+
+        def shutdown(self, wait=True):
+            pass
+
+    service = plot_service.PlotService(workers=1, processes=False)
+    service._executor = BrokenPool()
+    try:
+        assert service.submit("/data/c.h5").result(5) == "/data/c.h5"
+    finally:
+        service.shutdown()
+
+
+def test_no_png(render, monkeypatch):
+    calls, release = render
+    monkeypatch.setitem(qkit.cfg, "save_png", False)
+    service = plot_service.PlotService(workers=1, processes=False)
+    done = []
+    assert service.submit("/data/d.h5", callback=done.append).done()
+    assert len(done) == 1 and calls == [] and service._executor is None
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pytest
+
+import qkit
+qkit.cfg['measurement.unified_measurements.enabled'] = True
+from qkit.measure.unified_measurements import Experiment, Axis, ScalarMeasurement
+from qkit.measure.samples_class import Sample
+
+
+@pytest.fixture
+def dummy_instruments_class():
+    class DummyInstruments:
+        @staticmethod
+        def get_instruments():
+            return []
+        @staticmethod
+        def get_instrument_names():
+            return []
+    qkit.instruments = DummyInstruments()
+
+
+def test_concurrent_instrument_io(dummy_instruments_class):
+    import threading
+    from qkit.core.instrument_base import Instrument
+    from qkit.core.lib.concurrent_io import call_concurrently, instrument_of
+
+    shared = {'running': 0, 'max': 0}
+    shared_lock = threading.Lock()
+
+    class SlowInstrument(Instrument):
+        def __init__(self, name):
+            Instrument.__init__(self, name)
+            self.active = 0
+            self.interleaved = False
+            self.lock = shared_lock
+            self.add_function('get_value')
+
+        def get_value(self):
+            with self.lock:
+                self.active += 1
+                self.interleaved |= self.active > 1
+                shared['running'] += 1
+                shared['max'] = max(shared['max'], shared['running'])
+            time.sleep(0.05)
+            with self.lock:
+                self.active -= 1
+                shared['running'] -= 1
+            return 1.0
+
+    a, b = SlowInstrument('slow_a'), SlowInstrument('slow_b')
+    assert instrument_of(a.get_value) is a
+
+    assert call_concurrently([a.get_value, b.get_value, a.get_value, b.get_value], concurrent=True) == [1.0] * 4
+    assert shared['max'] == 2  # two instruments in parallel, each serialized
+    assert not a.interleaved and not b.interleaved
+
+    # the instrument of these is unknown, they are called one after the other
+    shared['max'] = 0
+    instruments = {'a': a, 'b': b}
+    unknown = [lambda: instruments['a'].get_value(), lambda: instruments['b'].get_value()]
+    assert instrument_of(unknown[0]) is None
+    assert call_concurrently(unknown + [a.get_value], concurrent=True) == [1.0] * 3
+    assert shared['max'] == 2  # the unknown ones in a single group, next to the known instrument
+    shared['max'] = 0
+    assert call_concurrently(unknown, concurrent=True) == [1.0] * 2
+    assert shared['max'] == 1
+
+    shared['max'] = 0
+    qkit.cfg['instrument_io_concurrent'] = True
+    try:
+        e = Experiment('concurrent_test', Sample())
+        with e.sweep(lambda v: None, Axis("x", np.linspace(0, 1, 4))) as x_sweep:
+            x_sweep.measure(ScalarMeasurement('a', a.get_value))
+            x_sweep.measure(ScalarMeasurement('b', b.get_value))
+        e.run(open_qviewkit=False)
+        assert shared['max'] == 2
+    finally:
+        qkit.cfg['instrument_io_concurrent'] = False
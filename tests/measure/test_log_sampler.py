@@ -0,0 +1,29 @@
+import time
+
+import numpy as np
+
+
+def test_log_sampler():
+    from qkit.measure.utils.log_sampler import LogSampler
+
+    def slow_clock():
+        time.sleep(0.03)  # a slow readout of a quantity rising linearly in time
+        return time.time()
+
+    sampler = LogSampler(slow_clock, rate=20, max_age=0.2).start()
+    points, samples, values = [], [], []
+    for _ in range(10):
+        start = time.time()
+        points.append(start)
+        new, resolved = sampler.update(start)
+        assert time.time() - start < 0.02  # the loop does not wait for the readout
+        samples += new
+        values += resolved
+        time.sleep(0.01)
+    new, resolved = sampler.finish()
+    samples += new
+    values += resolved
+    assert len(values) == len(points) and len(samples) >= 2
+    assert np.all(np.diff([s[0] for s in samples]) > 0)
+    # interpolated onto the points of the sweep
+    assert np.allclose(values, points, atol=0.02)
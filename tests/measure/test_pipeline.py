@@ -0,0 +1,19 @@
+import pytest
+
+
+def test_pipeline():
+    from qkit.measure.utils.pipeline import Pipeline
+    done = []
+    with Pipeline(depth=2) as pipe:
+        for i in range(20):
+            pipe.put(done.append, i)
+            assert pipe.pending() <= 2 + 1  # the task being executed is not in the queue anymore
+    assert done == list(range(20))
+
+    pipe = Pipeline(depth=2)
+    pipe.put(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        pipe.join()
+    pipe.put(done.append, 'after')
+    pipe.close()
+    assert done[-1] == 'after'
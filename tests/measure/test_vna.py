@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+
+
+def test_complex_trace():
+    from qkit.drivers.AbstractVNA import ComplexTrace, read_trace
+    interleaved = np.array([3, 4, 0, -2, 1, 0], dtype=np.float32)
+    trace = ComplexTrace.from_interleaved(interleaved)
+    assert np.shares_memory(trace.real, interleaved) and np.shares_memory(trace.imag, interleaved)
+    assert np.allclose(trace.real, [3, 0, 1]) and np.allclose(trace.imag, [4, -2, 0])
+    assert np.allclose(trace.amp, [5, 2, 1]) and np.allclose(trace.pha, [np.arctan2(4, 3), -np.pi / 2, 0])
+
+    class LegacyVNA:
+        calls = 0
+        def get_function_names(self):
+            return ['get_tracedata']
+        def get_tracedata(self, format='AmpPha'):
+            self.calls += 1
+            return ([5.], [0.9]) if format == 'AmpPha' else ([3.], [4.])
+    vna = LegacyVNA()
+    trace = read_trace(vna)
+    assert vna.calls == 2 and trace.amp[0] == 5. and trace.pha[0] == 0.9 and trace.imag[0] == 4.
+
+
+def test_vna_wait_for_completion():
+    import threading
+    from qkit.drivers.AbstractVNA import wait_for_completion
+
+    class EventVNA:
+        def __init__(self, sweeptime):
+            self.done = threading.Event()
+            threading.Timer(sweeptime, self.done.set).start()
+        def wait_for_completion(self, timeout=None):
+            return self.done.wait(timeout)
+
+    start = time.time()
+    wait_for_completion(EventVNA(0.1), step=1.)
+    assert 0.1 <= time.time() - start < 0.9  # returns at the event, not after the step of 1 s
+
+    # the dummy VNA only takes its sweep time when asked to
+    from qkit.drivers.DummyVNA import DummyVNA
+    vna = DummyVNA('wait_test_vna')
+    start = time.time()
+    vna.start_measurement()
+    assert vna.wait_for_completion(timeout=0.5) and vna.ready() and time.time() - start < 0.5
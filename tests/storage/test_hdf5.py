@@ -1,5 +1,5 @@
 from pathlib import Path
-from pytest import fixture
+from pytest import fixture, raises
 import numpy as np
 from qkit.storage.store import Data
 import tempfile
@@ -55,4 +55,348 @@ def test_file_creation(testdata):
         datafile = Data(fname)
         assert np.array_equal(datafile.data.test1d[:], testdata[0, 0]), "Failed saving 1D data"
         assert np.array_equal(datafile.data.test2d[:], testdata[0]), "Failed saving 2D data"
-        assert np.array_equal(datafile.data.test3d[:], testdata), "Failed saving 3D data"
\ No newline at end of file
+        assert np.array_equal(datafile.data.test3d[:], testdata), "Failed saving 3D data"
+
+def _write_sweeps(datafile, testdata):
+    x_coord = datafile.add_coordinate("x")
+    x_coord.add([0, 1, 2])
+    y_coord = datafile.add_coordinate("y")
+    y_coord.add([3, 4, 5])
+    z_coord = datafile.add_coordinate("z")
+    z_coord.add([6, 7, 8])
+    dataset1D = datafile.add_value_vector("test1d", x_coord, save_timestamp=True)
+    dataset2D = datafile.add_value_matrix("test2d", x_coord, y_coord)
+    pointwise2D = datafile.add_value_matrix("pointwise2d", x_coord, y_coord)
+    dataset3D = datafile.add_value_box("test3d", x_coord, y_coord, z_coord, save_timestamp=True)
+    for x in range(testdata.shape[0]):
+        dataset1D.append(testdata[0, 0, x])
+        dataset2D.append(testdata[0, x])
+        if x > 0:
+            pointwise2D.next_matrix()
+            dataset3D.next_matrix()
+        for y in range(testdata.shape[1]):
+            pointwise2D.append([testdata[1, x, y]], pointwise=True)
+            dataset3D.append(testdata[x, y])
+
+
+def test_buffered_append(testdata):
+    from qkit.storage.hdf_write_buffer import FlushPolicy
+    with tempfile.TemporaryDirectory() as dir:
+        plain = Path(dir) / "plain.h5"
+        buffered = Path(dir) / "buffered.h5"
+        datafile = Data(plain, mode="w")
+        _write_sweeps(datafile, testdata)
+        datafile.close()
+
+        datafile = Data(buffered, mode="w", flush_policy=FlushPolicy(interval=None, max_bytes=None))
+        _write_sweeps(datafile, testdata)
+        assert len(datafile.hf.write_buffer) > 0, "Appends were not staged"
+        assert datafile["/entry/data0/test2d"].shape[0] == 0, "Staged data was written early"
+        datafile.close()
+
+        plain, buffered = Data(plain, mode="r"), Data(buffered, mode="r")
+        for name in ["test1d", "test2d", "pointwise2d", "test3d"]:
+            assert np.array_equal(plain.data.__dict__[name][()], buffered.data.__dict__[name][()]), name
+            if name != "test1d":
+                assert np.array_equal(plain.data.__dict__[name].attrs["fill"], buffered.data.__dict__[name].attrs["fill"]), name
+        assert buffered.data.test3d_ts.shape == plain.data.test3d_ts.shape
+        assert np.array_equal(buffered.data.test3d[:], testdata)
+        plain.close()
+        buffered.close()
+
+
+def test_buffered_flush_thresholds(testdata):
+    from qkit.storage.hdf_write_buffer import FlushPolicy
+    with tempfile.TemporaryDirectory() as dir:
+        datafile = Data(Path(dir) / "rows.h5", mode="w", flush_policy=FlushPolicy(interval=None, max_bytes=None, max_rows=3))
+        x_coord = datafile.add_coordinate("x")
+        x_coord.add([0, 1, 2])  # first staged append
+        vector = datafile.add_value_vector("vector", x_coord)
+        vector.append(1.)
+        assert datafile["/entry/data0/vector"].shape == (0,)
+        vector.append(2.)
+        assert datafile["/entry/data0/vector"].shape == (2,)
+        datafile.close()
+
+
+def test_buffered_flush_at_exit():
+    # a measurement script failing before close_file() keeps the staged appends
+    import subprocess
+    import sys
+    with tempfile.TemporaryDirectory() as dir:
+        fname = Path(dir) / "aborted.h5"
+        script = "\n".join([
+            "from qkit.storage.store import Data",
+            "from qkit.storage.hdf_write_buffer import FlushPolicy",
+            "datafile = Data(%r, mode='w', flush_policy=FlushPolicy(interval=None, max_bytes=None))" % str(fname),
+            "x = datafile.add_coordinate('x')",
+            "x.add([0, 1, 2])",
+            "vector = datafile.add_value_vector('vector', x)",
+            "for v in (1., 2., 3.):",
+            "    vector.append(v)",
+            "raise RuntimeError('measurement aborted')",
+        ])
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+        assert "measurement aborted" in result.stderr
+        datafile = Data(fname, mode="r")
+        assert np.array_equal(datafile.data.vector[:], [1., 2., 3.])
+        datafile.close()
+
+def test_preallocated_growth(testdata):
+    from qkit.storage.hdf_extent import logical_shape, valid_view
+    with tempfile.TemporaryDirectory() as dir:
+        fname = Path(dir) / "grow.h5"
+        datafile = Data(fname, mode="w", growth_factor=2)
+        _write_sweeps(datafile, testdata)
+        # the matrix was pre-allocated from the expected shape, the rest grew geometrically
+        known = datafile.add_value_matrix("known", datafile.get_dataset("/entry/data0/x"), datafile.get_dataset("/entry/data0/y"), expected_shape=(10, 3))
+        known.append(testdata[0, 0])
+        raw = datafile["/entry/data0/known"]
+        assert raw.shape == (10, 3)
+        assert logical_shape(raw) == (1, 3) == known.get_logical_shape()
+        assert np.array_equal(valid_view(raw)[-1], testdata[0, 0])
+        assert np.array_equal(np.array(valid_view(raw)), testdata[0, :1])
+        assert datafile["/entry/data0/test3d"].shape[1] > testdata.shape[1]
+        datafile.close()
+
+        datafile = Data(fname, mode="r")
+        assert datafile["/entry/data0/known"].shape == (1, 3), "Dataset was not trimmed on close"
+        assert np.array_equal(datafile.data.test2d[:], testdata[0])
+        assert np.array_equal(datafile.data.pointwise2d[:], testdata[1])
+        assert np.array_equal(datafile.data.test3d[:], testdata)
+        datafile.close()
+
+
+def test_swmr_reader(testdata):
+    import h5py
+    with tempfile.TemporaryDirectory() as dir:
+        fname = Path(dir) / "swmr.h5"
+        datafile = Data(fname, mode="w", swmr=True)
+        x_coord = datafile.add_coordinate("x")
+        x_coord.add([0, 1, 2])
+        vector = datafile.add_value_vector("vector", x_coord)
+        # postponed until 'vector' exists in the file
+        assert not datafile.start_swmr()
+        vector.append(testdata[0, 0, 0])
+        assert datafile.hf.swmr
+
+        reader = h5py.File(fname, "r", swmr=True, locking=False)
+        ds = reader["/entry/data0/vector"]
+        assert reader["/entry"].attrs["swmr"]
+        for value in testdata[0, 0, 1:]:
+            vector.append(value)
+        datafile.hf.flush()
+        ds.refresh()
+        assert np.array_equal(ds[:], testdata[0, 0])
+        # readers keep their list of datasets, no new ones may appear
+        with raises(ValueError):
+            datafile.add_value_vector("late", x_coord)
+        datafile.close()
+        reader.close()
+
+
+def test_write_slab(testdata):
+    with tempfile.TemporaryDirectory() as dir:
+        fname = Path(dir) / "slab.h5"
+        datafile = Data(fname, mode="w")
+        x_coord = datafile.add_coordinate("x")
+        x_coord.add([0, 1, 2])
+        y_coord = datafile.add_coordinate("y")
+        y_coord.add([3, 4, 5])
+        z_coord = datafile.add_coordinate("z")
+        z_coord.add([6, 7, 8])
+        matrix = datafile.add_value_matrix("matrix", x_coord, y_coord, save_timestamp=True)
+        matrix.append(testdata[0, 0])
+        matrix.append_block(testdata[0, 1:])
+        box = datafile.add_value_box("box", x_coord, y_coord, z_coord, save_timestamp=True)
+        box.append_block(testdata[0, :2])
+        box.append(testdata[0, 2])
+        box.append_block(testdata[1:])
+        slab = datafile.add_value_box("slab", x_coord, y_coord, z_coord)
+        slab.write_slab(testdata[2], (2, 0))
+        slab.write_slab(testdata[0, 1], (0, 1))
+        assert list(datafile["/entry/data0/slab"].attrs["fill"][:2]) == [3, 3]
+        datafile.close()
+
+        datafile = Data(fname, mode="r")
+        assert np.array_equal(datafile.data.matrix[:], testdata[0])
+        assert np.array_equal(datafile.data.box[:], testdata)
+        assert list(datafile["/entry/data0/box"].attrs["fill"][:2]) == [3, 3]
+        assert datafile.data.matrix_ts.shape == (3,) and datafile.data.box_ts.shape == (3, 3)
+        assert not np.isnan(datafile.data.box_ts[:]).any()
+        slab = datafile.data.slab[:]
+        assert np.array_equal(slab[2], testdata[2]) and np.array_equal(slab[0, 1], testdata[0, 1])
+        assert np.isnan(slab[1]).all() and np.isnan(slab[0, 0]).all()
+        datafile.close()
+
+
+def test_indexed_writes(testdata):
+    with tempfile.TemporaryDirectory() as dir:
+        fname = Path(dir) / "indexed.h5"
+        datafile = Data(fname, mode="w")
+        x_coord = datafile.add_coordinate("x")
+        x_coord.add([0, 1, 2])
+        y_coord = datafile.add_coordinate("y")
+        y_coord.add([3, 4, 5])
+        z_coord = datafile.add_coordinate("z")
+        z_coord.add([6, 7, 8])
+        box = datafile.add_value_box("box", x_coord, y_coord, z_coord, save_timestamp=True, expected_shape=(3, 3, 3), indexed=2)
+        box.write_at(testdata[2, 1], (2, 1))
+        # live plots of qviewkit see points written into earlier rows
+        from types import SimpleNamespace
+        from qkit.gui.qviewkit.PlotWindow_lib import _read_growing
+        window = SimpleNamespace()
+        assert np.isnan(_read_growing(window, datafile["/entry/data0/box"], (0, 0))[0])
+        # datasets read back from the file can still be written at indices
+        datafile.get_dataset("/entry/data0/box").write_at(testdata[0, 0], (0, 0))
+        assert _read_growing(window, datafile["/entry/data0/box"], (0, 0))[0] == testdata[0, 0, 0]
+        assert datafile["/entry/data0/box"].attrs["written"] == 2
+        datafile.close()
+
+        datafile = Data(fname, mode="r")
+        mask = np.zeros((3, 3), dtype=bool)
+        mask[2, 1] = mask[0, 0] = True
+        assert np.array_equal(datafile.data.box_mask[:], mask)
+        assert np.array_equal(datafile.data.box[:][mask], testdata[mask])
+        assert np.isnan(datafile.data.box[:][~mask]).all()
+        assert np.isnan(datafile.data.box_ts[:][~mask]).all() and not np.isnan(datafile.data.box_ts[2, 1])
+        assert list(datafile["/entry/data0/box"].attrs["fill"][:2]) == [3, 3]
+        datafile.close()
+
+
+def test_indexed_writes_flush_policy(testdata):
+    from qkit.storage.hdf_write_buffer import FlushPolicy
+    with tempfile.TemporaryDirectory() as dir:
+        datafile = Data(Path(dir) / "policy.h5", mode="w", flush_policy=FlushPolicy(interval=None, max_bytes=None, max_rows=6))
+        x_coord = datafile.add_coordinate("x")
+        x_coord.add([0, 1, 2])
+        y_coord = datafile.add_coordinate("y")
+        y_coord.add([3, 4, 5])
+        matrix = datafile.add_value_matrix("matrix", x_coord, y_coord, expected_shape=(3, 3), indexed=2)
+        flushes = []
+        flush = datafile.hf.flush
+        datafile.hf.flush = lambda: flushes.append(1) or flush()
+        for j in range(3):
+            matrix.write_at(testdata[0, 0, j], (0, j))
+        # the data and the mask of a point count as two writes
+        assert len(flushes) == 1
+        datafile.close()
+
+
+def test_chunking_and_compression(testdata):
+    from qkit.storage.hdf_chunking import chunk_shape
+    assert chunk_shape(100, 2, itemsize=4, target_bytes=2 ** 16) == (64, 100)
+    assert chunk_shape(1, 2, itemsize=8, target_bytes=2 ** 16) == (64, 64)
+    assert chunk_shape(1, 1, itemsize=8) is True
+    assert chunk_shape(1, 1, itemsize=8, expected_shape=(50,)) == (50,)
+    assert chunk_shape(100, 3, itemsize=4, expected_shape=(10, 50, 100), target_bytes=2 ** 16) == (3, 50, 100)
+    assert chunk_shape(8001, 2, itemsize=4, expected_shape=(20000, 8001), layout="balanced", target_bytes=2 ** 16) == (202, 80)
+    assert chunk_shape(3, 2, layout=(4, 3)) == (4, 3)
+    with tempfile.TemporaryDirectory() as dir:
+        fname = Path(dir) / "chunks.h5"
+        datafile = Data(fname, mode="w", swmr=True)
+        x_coord = datafile.add_coordinate("x")
+        x_coord.add([0, 1, 2])
+        y_coord = datafile.add_coordinate("y")
+        y_coord.add([3, 4, 5])
+        gzip = datafile.add_value_matrix("gzip", x_coord, y_coord, compression="gzip", chunks="balanced")
+        lzf = datafile.add_value_matrix("lzf", x_coord, y_coord, compression="lzf", chunks=(2, 3))
+        datafile.start_swmr()
+        for row in testdata[0]:
+            gzip.append(row)
+            lzf.append(row)
+        datafile.close()
+
+        datafile = Data(fname, mode="r")
+        ds = datafile["/entry/data0/gzip"]
+        assert ds.compression == "gzip" and ds.shuffle and ds.chunks == (3, 3)
+        assert "compression" not in ds.attrs and "chunks" not in ds.attrs
+        assert datafile["/entry/data0/lzf"].chunks == (2, 3)
+        assert np.array_equal(ds[:], testdata[0])
+        assert np.array_equal(datafile.data.lzf[:], testdata[0])
+        datafile.close()
+
+
+def test_pointwise_file_size():
+    # a typical 2D measurement of scalars: the chunks must not be much larger than the data
+    with tempfile.TemporaryDirectory() as dir:
+        fname = Path(dir) / "pointwise.h5"
+        datafile = Data(fname, mode="w")
+        x_coord = datafile.add_coordinate("x")
+        x_coord.add(np.arange(50))
+        y_coord = datafile.add_coordinate("y")
+        y_coord.add(np.arange(40))
+        vector = datafile.add_value_vector("vector", x_coord, save_timestamp=True)
+        matrix = datafile.add_value_matrix("matrix", x_coord, y_coord, save_timestamp=True)
+        for x in range(50):
+            if x > 0:
+                matrix.next_matrix()
+            vector.append([x])
+            for y in range(40):
+                matrix.append([x * y], pointwise=True)
+        datafile.close()
+        assert fname.stat().st_size < 200 * 1024
+
+        datafile = Data(fname, mode="r")
+        assert datafile["/entry/data0/matrix"].chunks == (64, 64)
+        assert datafile["/entry/data0/vector"].chunks[0] < 8192
+        datafile.close()
+
+
+def test_pyramid():
+    from qkit.storage import hdf_pyramid
+    data = np.random.rand(37, 50)
+    with tempfile.TemporaryDirectory() as dir:
+        fname = Path(dir) / "pyramid.h5"
+        datafile = Data(fname, mode="w")
+        x_coord = datafile.add_coordinate("x")
+        x_coord.add(np.arange(37))
+        y_coord = datafile.add_coordinate("y")
+        y_coord.add(np.arange(50))
+        matrix = datafile.add_value_matrix("matrix", x_coord, y_coord)
+        for row in data:
+            matrix.append(row)
+        datafile.close()
+
+        assert hdf_pyramid.level_steps((37, 50), factor=2, min_size=10) == [(2, 2), (4, 4), (4, 8)]
+        assert hdf_pyramid.build_pyramids(str(fname), factor=2, min_size=10) == ["/entry/data0/matrix"]
+        datafile = Data(fname, mode="r")
+        ds = datafile["/entry/data0/matrix"]
+        level, steps = hdf_pyramid.read_level(ds, (slice(None), slice(None)), (15, 15))
+        assert steps == (2, 2) and level.shape == (19, 25)
+        assert np.isclose(level[0, 0], data[:2, :2].mean())
+        level, steps = hdf_pyramid.read_level(ds, (slice(None), slice(None)), (5, 5), stat="max")
+        assert steps == (4, 8) and np.isclose(level[-1, -1], data[36:, 48:].max())
+        assert hdf_pyramid.read_level(ds, (slice(None), slice(None)), (30, 30)) is None
+        # selected indices are never reduced
+        assert hdf_pyramid.read_level(ds, (0, slice(None)), (5,)) is None
+        datafile.close()
+
+def test_summary():
+    from qkit.storage import hdf_summary
+    data = np.random.rand(37, 50)
+    data[30:] = np.nan  # not measured yet
+    with tempfile.TemporaryDirectory() as dir:
+        fname = Path(dir) / "summary.h5"
+        datafile = Data(fname, mode="w")
+        x_coord = datafile.add_coordinate("x")
+        x_coord.add(np.arange(37))
+        y_coord = datafile.add_coordinate("y")
+        y_coord.add(np.arange(50))
+        matrix = datafile.add_value_matrix("matrix", x_coord, y_coord)
+        for row in data:
+            matrix.append(row)
+        text = datafile.add_textlist("settings")
+        text.append("no numbers")
+        datafile.close()
+
+        summaries = hdf_summary.summarize(str(fname), size=10)
+        s = summaries["/entry/data0/matrix"]
+        assert s["shape"] == (37, 50) and s["fill"][0] == 37
+        assert np.isclose(s["min"], np.nanmin(data)) and np.isclose(s["max"], np.nanmax(data))
+        assert np.isclose(s["nan_fraction"], 7 / 37.)
+        assert s["thumbnail"].shape == (10, 10) and s["thumbnail"].dtype == np.float32
+        assert np.isclose(s["thumbnail"][0, 0], data[:4, :5].mean())
+        assert np.isnan(s["thumbnail"][-1, 0])
+        assert summaries["/entry/data0/x"]["thumbnail"].shape == (10,)
+        assert summaries["/entry/data0/settings"]["thumbnail"] is None
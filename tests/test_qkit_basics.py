@@ -34,4 +34,50 @@ def test_module_available():
     assert qkit.module_available('qkit')  # Detect self
     assert qkit.module_available('numpy')  # Detect 'Essential'
     assert qkit.module_available('IPython')  # Detect 'optional', which is a dependency
-    assert not qkit.module_available('django')  # Check the negative as well.
\ No newline at end of file
+    assert not qkit.module_available('django')  # Check the negative as well.
+
+def _import_times(module):
+    """
+    Imports numpy and h5py, then module in a fresh interpreter with -X importtime.
+    Returns {imported module: cumulative import time in seconds}. The time of module
+    does not include numpy and h5py, which are imported before.
+    """
+    import subprocess
+    import sys
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import numpy, h5py; import " + module],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+@pytest.mark.parametrize("module", ["qkit.storage.store", "qkit.measure.unified_measurements"])
+def test_import_time(module):
+    # Writing an h5 file must not pull in plotting, fitting or notebook libraries.
+    times = _import_times(module)
+    heavy = [m for m in ("pandas", "matplotlib", "scipy", "IPython", "qgrid", "tqdm.auto") if m in times]
+    assert not heavy, "%s imports %s" % (module, heavy)
+    # The budget is relative to the imports of numpy and h5py in the same interpreter, so it holds on slow machines
+    # as well. qkit itself takes about a tenth of it, a heavy library alone exceeds it.
+    budget = times["numpy"] + times["h5py"]
+    assert times[module] < budget, "import %s took %.3fs, numpy and h5py %.3fs" % (module, times[module], budget)
+
+def test_lazy_service():
+    import qkit
+    import qkit.core.startup
+    calls = []
+    def factory():
+        calls.append(1)
+        return object()
+    qkit.register_lazy_service('lazy_test_service', factory)
+    assert not calls
+    service = qkit.lazy_test_service
+    assert qkit.lazy_test_service is service
+    assert calls == [1]
+    assert qkit.core.startup.timings[-1][0] == "lazy_test_service (on first use)"
+    del qkit.lazy_test_service
+    with pytest.raises(AttributeError):
+        qkit.lazy_test_service